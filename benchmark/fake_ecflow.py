@@ -0,0 +1,347 @@
+"""In-process stand-in for the ecflow python module.
+
+Only the parts used by the scheduler package are implemented. Client calls are counted
+and can be slowed down with BENCH_ECF_LATENCY (seconds) to mimic the server round trip.
+Definitions are kept as plain python nodes and saved in the ecflow def-file format.
+"""
+import os
+import sys
+import time
+
+
+CALLS = {}
+
+
+class State(object):
+    """Node states."""
+
+    unknown = "unknown"
+    complete = "complete"
+    queued = "queued"
+    aborted = "aborted"
+    submitted = "submitted"
+    active = "active"
+
+
+class Client(object):
+    """Fake ecflow client."""
+
+    def __init__(self, host=None, port=None):
+        """Construct the client."""
+        self.host = host
+        self.port = port
+        self.latency = float(os.environ.get("BENCH_ECF_LATENCY", "0"))
+
+    def call(self, name):
+        """Count a call and wait for the configured latency."""
+        CALLS.update({name: CALLS.get(name, 0) + 1})
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def ping(self):
+        """Ping the server."""
+        self.call("ping")
+
+    def alter(self, *args):
+        """Alter a node."""
+        self.call("alter")
+
+    def force_state(self, paths, state):
+        """Force the state of nodes."""
+        self.call("force_state")
+
+    def begin_suite(self, suite_name):
+        """Begin a suite."""
+        self.call("begin_suite")
+
+    def replace(self, path, def_file, *args):
+        """Replace a suite."""
+        self.call("replace")
+
+    def delete(self, path, *args):
+        """Delete a suite."""
+        self.call("delete")
+
+    def sync_local(self):
+        """Synchronise the local definition."""
+        self.call("sync_local")
+
+    def get_defs(self):
+        """Get the definition."""
+        return None
+
+
+class Defstatus(object):
+    """Default status of a node."""
+
+    def __init__(self, state):
+        """Construct the default status.
+
+        Args:
+            state (str): State.
+
+        """
+        self.state = state
+
+    def __str__(self):
+        """State name."""
+        return str(self.state)
+
+
+class Variable(object):
+    """Fake variable."""
+
+    def __init__(self, name, value):
+        """Construct the variable."""
+        self.variable = (name, str(value))
+
+    def name(self):
+        """Get the name."""
+        return self.variable[0]
+
+    def value(self):
+        """Get the value."""
+        return self.variable[1]
+
+
+class Limit(object):
+    """Fake limit or inlimit."""
+
+    def __init__(self, name, value, path=""):
+        """Construct the limit."""
+        self.limit = (name, value, path)
+
+    def name(self):
+        """Get the name."""
+        return self.limit[0]
+
+
+class Expression(object):
+    """Fake trigger expression."""
+
+    def __init__(self, expression):
+        """Construct the expression."""
+        self.expression = expression
+
+    def get_expression(self):
+        """Get the expression string."""
+        return self.expression
+
+
+class Node(object):
+    """Fake suite, family or task node."""
+
+    keyword = None
+    limits = ()
+    inlimits = ()
+    times = ()
+
+    def __init__(self, name, parent=None):
+        """Construct the node.
+
+        Args:
+            name (str): Name.
+            parent (Node, optional): Parent node. Defaults to None.
+
+        """
+        self.node_name = name
+        self.parent = parent
+        self.children = []
+        self.variables = []
+        self.triggers = []
+        self.part_triggers = []
+        self.defstatus = None
+
+    def name(self):
+        """Get the name."""
+        return self.node_name
+
+    @property
+    def nodes(self):
+        """Get the children."""
+        return list(self.children)
+
+    def get_abs_node_path(self):
+        """Get the absolute node path."""
+        if self.parent is None:
+            return "/" + self.node_name
+        return self.parent.get_abs_node_path() + "/" + self.node_name
+
+    def get_trigger(self):
+        """Get the trigger expression. None if the node has no trigger."""
+        if len(self.triggers) == 0 and len(self.part_triggers) == 0:
+            return None
+        expression = " AND ".join(self.triggers)
+        for trigger, mode in self.part_triggers:
+            if expression == "":
+                expression = trigger
+            else:
+                expression = expression + (" AND " if mode else " OR ") + trigger
+        return Expression(expression)
+
+    def get_defstatus(self):
+        """Get the default status."""
+        if self.defstatus is None:
+            return "queued"
+        return str(self.defstatus)
+
+    def add_family(self, name):
+        """Add a family."""
+        family = Family(name, self)
+        self.children.append(family)
+        return family
+
+    def add_task(self, name):
+        """Add a task."""
+        task = Task(name, self)
+        self.children.append(task)
+        return task
+
+    def add_variable(self, name, value):
+        """Add a variable."""
+        self.variables = [variable for variable in self.variables if variable.name() != name]
+        self.variables.append(Variable(name, value))
+
+    def add_trigger(self, trigger):
+        """Add a trigger."""
+        self.triggers.append(trigger)
+
+    def delete_trigger(self):
+        """Delete the trigger."""
+        self.triggers = []
+        self.part_triggers = []
+
+    def add_part_trigger(self, trigger, mode=True):
+        """Add a part trigger."""
+        self.part_triggers.append((trigger, mode))
+
+    def add_defstatus(self, defstatus):
+        """Add the default status."""
+        self.defstatus = defstatus
+
+    def add_time(self, time):
+        """Add a time attribute, e.g. "10:00"."""
+        self.times = list(self.times) + ["time " + time]
+
+    def add_limit(self, name, limit):
+        """Add a limit."""
+        self.limits = list(self.limits) + [Limit(name, limit)]
+
+    def add_inlimit(self, name, path="", tokens=1):
+        """Add an inlimit."""
+        self.inlimits = list(self.inlimits) + [Limit(name, tokens, path)]
+
+    def lines(self, indent):
+        """Get the def-file lines of the node.
+
+        Args:
+            indent (str): Indentation.
+
+        Returns:
+            list: Lines.
+
+        """
+        lines = [f"{indent}{self.keyword} {self.node_name}\n"]
+        if self.defstatus is not None:
+            lines.append(f"{indent}  defstatus {self.defstatus}\n")
+        for trigger in self.triggers:
+            lines.append(f"{indent}  trigger {trigger}\n")
+        for trigger, mode in self.part_triggers:
+            lines.append(f"{indent}  trigger {'-a' if mode else '-o'} {trigger}\n")
+        for variable in self.variables:
+            lines.append(f"{indent}  edit {variable.name()} '{variable.value()}'\n")
+        for time in self.times:
+            lines.append(f"{indent}  {time}\n")
+        for limit in self.limits:
+            lines.append(f"{indent}  limit {limit.name()} {limit.limit[1]}\n")
+        for limit in self.inlimits:
+            name, tokens, path = limit.limit
+            if path != "":
+                name = path + ":" + name
+            lines.append(f"{indent}  inlimit {name} {tokens}\n")
+        for child in self.children:
+            lines.extend(child.lines(indent + "  "))
+        if self.keyword != "task":
+            lines.append(f"{indent}end{self.keyword}\n")
+        return lines
+
+
+class Suite(Node):
+    """Fake suite."""
+
+    keyword = "suite"
+
+
+class Family(Node):
+    """Fake family."""
+
+    keyword = "family"
+
+
+class Task(Node):
+    """Fake task."""
+
+    keyword = "task"
+
+
+class Defs(object):
+    """Fake definition."""
+
+    def __init__(self, *args):
+        """Construct the definition."""
+        self.suites = []
+
+    def add_suite(self, name):
+        """Add a suite."""
+        suite = Suite(name)
+        self.suites.append(suite)
+        return suite
+
+    def find_abs_node(self, path):
+        """Find a node.
+
+        Args:
+            path (str): Absolute node path.
+
+        Returns:
+            Node: The node. None if not found.
+
+        """
+        names = path.strip("/").split("/")
+        nodes = self.suites
+        node = None
+        for name in names:
+            node = None
+            for child in nodes:
+                if child.name() == name:
+                    node = child
+                    break
+            if node is None:
+                return None
+            nodes = node.children
+        return node
+
+    def save_as_defs(self, def_file):
+        """Save the definition in the def-file format.
+
+        Args:
+            def_file (str): Definition file.
+
+        """
+        lines = ["#5.8.0\n"]
+        for suite in self.suites:
+            lines.extend(suite.lines(""))
+        with open(def_file, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("".join(lines))
+
+
+def install():
+    """Make import ecflow return this module.
+
+    Returns:
+        module: This module.
+
+    """
+    module = sys.modules[__name__]
+    sys.modules.update({"ecflow": module})
+    return module
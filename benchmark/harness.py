@@ -0,0 +1,303 @@
+"""Benchmark harness.
+
+A benchmark is a function taking the number of tasks and returning the latencies of the
+individual operations in seconds. The harness runs it for each size tier, reports
+throughput and latency percentiles, and compares the results with stored baselines.
+Standard output of the benchmark is discarded while it runs. Tiers that finish quickly
+are repeated after a warm-up run and the best run is reported.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import contextlib
+from argparse import ArgumentParser
+
+
+def percentile(values, fraction):
+    """Get a percentile.
+
+    Args:
+        values (list): Values.
+        fraction (float): Fraction between 0 and 1.
+
+    Returns:
+        float: Percentile.
+
+    """
+    values = sorted(values)
+    if len(values) == 0:
+        return None
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_benchmark(name, function, tier, extra=None, min_seconds=0.5, max_runs=20):
+    """Run a benchmark for one size tier.
+
+    The benchmark is repeated until it has run for min_seconds in total or max_runs
+    times. If it ran more than once, the first run is a warm-up and is not reported.
+    The fastest of the remaining runs is reported.
+
+    Args:
+        name (str): Benchmark name.
+        function (callable): Benchmark taking the number of tasks. Returns latencies.
+        tier (int): Number of tasks.
+        extra (callable, optional): Returns extra numbers to store with the result.
+                                    Defaults to None.
+        min_seconds (float, optional): Minimum total run time. Defaults to 0.5.
+        max_runs (int, optional): Maximum number of runs. Defaults to 20.
+
+    Returns:
+        dict: Result.
+
+    """
+    runs = []
+    elapsed = 0.0
+    with open(os.devnull, mode="w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            while len(runs) == 0 or (elapsed < min_seconds and len(runs) < max_runs):
+                start = time.perf_counter()
+                latencies = function(tier)
+                total = time.perf_counter() - start
+                runs.append((total, latencies))
+                elapsed = elapsed + total
+    if len(runs) > 1:
+        runs = runs[1:]
+    total, latencies = min(runs, key=lambda run: run[0])
+    result = {
+        "benchmark": name,
+        "tasks": tier,
+        "runs": len(runs),
+        "seconds": total,
+        "throughput": tier / total if total > 0 else None,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "max": max(latencies) if len(latencies) > 0 else None
+    }
+    if extra is not None:
+        result.update(extra())
+    return result
+
+
+def result_key(result):
+    """Get the key of a result.
+
+    Args:
+        result (dict): Result.
+
+    Returns:
+        str: Key, e.g. write_job[100].
+
+    """
+    return f"{result['benchmark']}[{result['tasks']}]"
+
+
+def load_baseline(baseline_file, results_only=True):
+    """Load stored baselines.
+
+    Args:
+        baseline_file (str): Baseline file.
+        results_only (bool, optional): Return only the results. Defaults to True.
+
+    Returns:
+        dict: Results per key, or the stored data with the machine and Python version if
+              results_only is False. Empty if no baseline is stored.
+
+    """
+    if not os.path.exists(baseline_file):
+        return {}
+    with open(baseline_file, mode="r", encoding="utf-8") as file_handler:
+        data = json.load(file_handler)
+    if results_only:
+        return data["results"]
+    return data
+
+
+def python_release(version):
+    """Get the major and minor Python version.
+
+    Args:
+        version (str): Python version, e.g. 3.8.10.
+
+    Returns:
+        str: Major and minor version, e.g. 3.8.
+
+    """
+    return ".".join(version.split(".")[:2])
+
+
+def environment_differences(data):
+    """Find differences between the environment of a baseline and this one.
+
+    Args:
+        data (dict): Stored baseline data.
+
+    Returns:
+        list: Descriptions of the differences.
+
+    """
+    differences = []
+    machine = data.get("machine")
+    if machine is not None and machine != platform.machine():
+        differences.append(f"machine {machine} (this is {platform.machine()})")
+    python = data.get("python")
+    release = python_release(platform.python_version())
+    if python is not None and python_release(python) != release:
+        differences.append(f"Python {python} (this is {platform.python_version()})")
+    return differences
+
+
+def history_file(baseline_file):
+    """Get the history file of a baseline.
+
+    Args:
+        baseline_file (str): Baseline file.
+
+    Returns:
+        str: History file with one line per stored baseline.
+
+    """
+    return os.path.splitext(baseline_file)[0] + "_history.jsonl"
+
+
+def save_baseline(baseline_file, results):
+    """Store results as baseline and append them to the history of the baseline.
+
+    Stored results of other benchmarks and tiers are kept.
+
+    Args:
+        baseline_file (str): Baseline file.
+        results (list): Results.
+
+    """
+    import scheduler
+    stored = load_baseline(baseline_file)
+    stored.update({result_key(result): result for result in results})
+    data = {
+        "version": scheduler.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": stored
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(baseline_file)), exist_ok=True)
+    with open(baseline_file, mode="w", encoding="utf-8") as file_handler:
+        json.dump(data, file_handler, indent=2, sort_keys=True)
+        file_handler.write("\n")
+    data.update({"results": {result_key(result): result for result in results}})
+    with open(history_file(baseline_file), mode="a", encoding="utf-8") as file_handler:
+        file_handler.write(json.dumps(data, sort_keys=True) + "\n")
+
+
+def compare(results, baseline, tolerance, metrics):
+    """Find regressions compared to the baseline.
+
+    Args:
+        results (list): Results.
+        baseline (dict): Baseline results per key.
+        tolerance (float): Allowed relative change, e.g. 0.3 for 30 %.
+        metrics (dict): Metric name and True if higher is better.
+
+    Returns:
+        list: Descriptions of the regressions.
+
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(result_key(result))
+        if reference is None:
+            continue
+        for metric, higher_is_better in metrics.items():
+            value = result.get(metric)
+            expected = reference.get(metric)
+            if value is None or expected is None or expected == 0:
+                continue
+            change = (value - expected) / expected
+            if higher_is_better:
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{result_key(result)} {metric}: {value:.4g} "
+                                   f"(baseline {expected:.4g})")
+    return regressions
+
+
+def print_results(results, columns):
+    """Print a result table.
+
+    Args:
+        results (list): Results.
+        columns (list): Columns to print.
+
+    """
+    print(f"{'benchmark':32s}" + "".join(f"{column:>16s}" for column in columns))
+    for result in results:
+        line = f"{result_key(result):32s}"
+        for column in columns:
+            value = result.get(column)
+            if value is None:
+                line = line + f"{'-':>16s}"
+            else:
+                line = line + f"{value:16.4g}"
+        print(line)
+
+
+def get_parser(description, baseline_file, tiers):
+    """Get a parser with the common benchmark arguments.
+
+    Args:
+        description (str): Description.
+        baseline_file (str): Default baseline file.
+        tiers (str): Default comma separated size tiers.
+
+    Returns:
+        argparse.ArgumentParser: Parser.
+
+    """
+    parser = ArgumentParser(description)
+    parser.add_argument("--tiers", type=str, default=tiers, help="Comma separated sizes")
+    parser.add_argument("--baseline", type=str, default=baseline_file, help="Baseline file")
+    parser.add_argument("--save", action="store_true", help="Store the results as baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed relative regression")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as json")
+    parser.add_argument("--only", type=str, default=None,
+                        help="Comma separated benchmarks to run")
+    return parser
+
+
+def finish(args, results, metrics, columns):
+    """Print, store and compare the results.
+
+    Args:
+        args (argparse.Namespace): Arguments.
+        results (list): Results.
+        metrics (dict): Compared metrics and True if higher is better.
+        columns (list): Printed columns.
+
+    Returns:
+        int: Exit status. 1 if a regression was found. Results are not compared with a
+             baseline stored on another machine or Python version.
+
+    """
+    print_results(results, columns)
+    if args.output is not None:
+        with open(args.output, mode="w", encoding="utf-8") as file_handler:
+            json.dump(results, file_handler, indent=2)
+    if args.save:
+        save_baseline(args.baseline, results)
+        print("Baseline stored in " + args.baseline)
+        return 0
+    data = load_baseline(args.baseline, results_only=False)
+    differences = environment_differences(data)
+    if len(differences) > 0:
+        print("WARNING Baseline was stored on " + ", ".join(differences) +
+              ". Not compared. Store a baseline on this machine with --save.",
+              file=sys.stderr)
+        return 0
+    regressions = compare(results, data.get("results", {}), args.tolerance, metrics)
+    for regression in regressions:
+        print("REGRESSION " + regression, file=sys.stderr)
+    if len(regressions) > 0:
+        return 1
+    return 0
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Memory of scheduler objects.
+
+For each size tier, objects are created in a fresh process and the python memory
+allocated by the scheduler package while they are alive is measured with tracemalloc.
+Memory of the ecflow (or fake ecflow) nodes themselves is not counted.
+
+    tasks: EcflowTask objects with their job, output and log file names
+    suite: node, trigger and variable wrappers of a synthetic suite
+
+    python3 benchmark/memory_benchmarks.py --tiers 1000,100000
+    python3 benchmark/memory_benchmarks.py --save   # store new baselines
+"""
+import os
+import sys
+import tracemalloc
+import multiprocessing
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import fake_ecflow  # noqa: E402
+import harness  # noqa: E402
+
+
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baselines", "memory.json")
+SCHEDULER_FILES = os.path.join(os.path.dirname(BENCHMARK_DIR), "scheduler", "*")
+
+
+def scheduler_memory(snapshot):
+    """Sum the memory allocated by the scheduler package.
+
+    Args:
+        snapshot (tracemalloc.Snapshot): Snapshot.
+
+    Returns:
+        int: Bytes.
+
+    """
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(True, SCHEDULER_FILES)])
+    return sum(statistic.size for statistic in snapshot.statistics("filename"))
+
+
+def create_tasks(size):
+    """Create tasks and their file names.
+
+    Args:
+        size (int): Number of tasks.
+
+    Returns:
+        tuple: Tasks and the number of tasks.
+
+    """
+    import scheduler
+    tasks = []
+    for number in range(size):
+        task = scheduler.EcflowTask(f"/bench/Cycle{number % 4}/Mbr{number // 4 % 50:03d}/"
+                                    f"Family{number // 200}/Task{number % 25}", 1, "pass", 1)
+        task.create_ecf_job("/tmp/job")
+        task.create_ecf_jobout("/tmp/job")
+        task.create_submission_log("/tmp/job")
+        tasks.append(task)
+    return tasks, size
+
+
+def create_suite(size):
+    """Build a synthetic suite with about size tasks.
+
+    Args:
+        size (int): Number of tasks.
+
+    Returns:
+        tuple: Suite definition and the number of tasks.
+
+    """
+    import suite_generator
+    shape = suite_generator.SuiteShape(members=max(1, size // 400))
+    suite = suite_generator.generate_suite("bench", shape, "/tmp/bench_memory/job",
+                                           "/tmp/bench_memory/ecf")
+    return suite, shape.number_of_tasks()
+
+
+def measure(name, size):
+    """Measure the memory of the objects. Runs in a child process.
+
+    Args:
+        name (str): "tasks" or "suite".
+        size (int): Number of tasks.
+
+    Returns:
+        dict: Result.
+
+    """
+    fake_ecflow.install()
+    import scheduler.scheduler  # noqa: F401 Imported before measuring
+    import scheduler.suites  # noqa: F401
+    import suite_generator
+    suite_generator.write_ecf_files("/tmp/bench_memory/ecf")
+    with open(os.devnull, mode="w", encoding="utf-8") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        tracemalloc.start()
+        objects, count = {"tasks": create_tasks, "suite": create_suite}[name](size)
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        sys.stdout = stdout
+    memory = scheduler_memory(snapshot)
+    del objects
+    return {"benchmark": name, "tasks": size, "scheduler_mb": memory / 1e6,
+            "bytes_per_task": memory / count}
+
+
+def main(argv):
+    """Run the benchmarks.
+
+    Args:
+        argv (list): Command line arguments.
+
+    Returns:
+        int: Exit status.
+
+    """
+    parser = harness.get_parser("Benchmark the memory of scheduler objects", BASELINE_FILE,
+                                "1000,20000,100000")
+    args = parser.parse_args(argv)
+
+    names = ["tasks", "suite"]
+    if args.only is not None:
+        names = args.only.split(",")
+    results = []
+    context = multiprocessing.get_context("fork")
+    for size in [int(tier) for tier in args.tiers.split(",")]:
+        for name in names:
+            with context.Pool(1) as pool:
+                results.append(pool.apply(measure, (name, size)))
+    return harness.finish(args, results, {"bytes_per_task": False},
+                          ["scheduler_mb", "bytes_per_task"])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Benchmarks of the submission hot path.
+
+Runs without an ecflow server or a batch system. ecflow is replaced by the in-process
+fake in fake_ecflow.py and sbatch/squeue/scancel by the stubs in benchmark/bin.
+
+    python3 benchmark/submission_benchmarks.py --tiers 1,100 --latency 0.01
+    python3 benchmark/submission_benchmarks.py --save   # store new baselines
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import fake_ecflow  # noqa: E402
+import harness  # noqa: E402
+
+fake_ecflow.install()
+import scheduler  # noqa: E402
+
+
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baselines", "submission.json")
+ENV_SUBMIT = {
+    "submit_types": ["background", "parallel"],
+    "default_submit_type": "parallel",
+    "background": {
+        "HOST": "0",
+        "tasks": ["LogProgress"]
+    },
+    "parallel": {
+        "HOST": "0",
+        "SUBMIT_TYPE": "slurm",
+        "WRAPPER": "srun",
+        "NODES": "#SBATCH -N 1",
+        "TIME": "#SBATCH -t 00:30:00",
+        "OMP_NUM_THREADS": "import os\nos.environ.update({\"OMP_NUM_THREADS\": \"1\"})"
+    }
+}
+JOB = "# Job generated by ecflow\nhost = \"@HOST_TO_BE_SUBSTITUTED@\"\n" \
+      "wrapper = \"@WRAPPER_TO_BE_SUBSTITUTED@\"\n" + "print(\"Forecast step\")\n" * 50
+
+
+class SubmissionBenchmarks(object):
+    """Benchmarks with a work directory per run."""
+
+    def __init__(self, workdir):
+        """Construct the benchmarks.
+
+        Args:
+            workdir (str): Work directory.
+
+        """
+        self.workdir = workdir
+        self.joboutdir = os.path.join(workdir, "job")
+        self.joboutdirs = {"0": self.joboutdir}
+        self.env_submit = scheduler.TaskSettingsIndex(ENV_SUBMIT)
+        self.server_file = os.path.join(workdir, "server.json")
+        self.logfile = os.path.join(workdir, "server.log")
+        os.makedirs(self.joboutdir, exist_ok=True)
+        with open(self.server_file, mode="w", encoding="utf-8") as file_handler:
+            json.dump({"ECF_HOST": "localhost", "ECF_PORT": 1}, file_handler)
+        self.server = scheduler.EcflowServerFromFile(self.server_file, self.logfile)
+
+    @staticmethod
+    def get_task(number, submission_id=None):
+        """Get a task.
+
+        Args:
+            number (int): Task number.
+            submission_id (str, optional): Submission id. Defaults to None.
+
+        Returns:
+            scheduler.EcflowTask: Task.
+
+        """
+        return scheduler.EcflowTask(f"/bench/Family{number // 100}/Forecast{number}", 1,
+                                    "dummy_password", os.getpid(), submission_id=submission_id)
+
+    def write_ecflow_jobs(self, size):
+        """Write the job files ecflow would generate.
+
+        Args:
+            size (int): Number of tasks.
+
+        """
+        for number in range(size):
+            ecf_job = self.get_task(number).create_ecf_job(self.joboutdir)
+            os.makedirs(os.path.dirname(ecf_job), exist_ok=True)
+            with open(ecf_job, mode="w", encoding="utf-8") as file_handler:
+                file_handler.write(JOB)
+
+    def task_settings(self, size):
+        """Construct TaskSettings."""
+        latencies = []
+        for number in range(size):
+            task = self.get_task(number)
+            start = time.perf_counter()
+            scheduler.TaskSettings(task, self.env_submit, self.joboutdirs)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def write_job(self, size):
+        """Write job files with EcflowSubmitTask.write_job."""
+        self.write_ecflow_jobs(size)
+        latencies = []
+        for number in range(size):
+            submit_task = scheduler.EcflowSubmitTask(self.get_task(number), self.env_submit,
+                                                     self.server, self.joboutdirs)
+            start = time.perf_counter()
+            submit_task.write_job()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def submit(self, size):
+        """Full submission with EcflowSubmitTask.submit."""
+        self.write_ecflow_jobs(size)
+        latencies = []
+        for number in range(size):
+            start = time.perf_counter()
+            submit_task = scheduler.EcflowSubmitTask(self.get_task(number), self.env_submit,
+                                                     self.server, self.joboutdirs)
+            submit_task.submit()
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def get_kwargs(self, number):
+        """Get the command line arguments of status and kill.
+
+        Args:
+            number (int): Task number.
+
+        Returns:
+            dict: Arguments.
+
+        """
+        task = self.get_task(number)
+        return {
+            "env_submit": self.env_submit,
+            "joboutdir": self.joboutdir,
+            "env_server": self.server_file,
+            "logfile": self.logfile,
+            "ecf_name": task.ecf_name,
+            "ecf_tryno": task.ecf_tryno,
+            "ecf_pass": task.ecf_pass,
+            "ecf_rid": task.ecf_rid,
+            "submission_id": str(1000 + number),
+            "socket": ""
+        }
+
+    def status_cmd(self, size):
+        """Status with the ECF_status entry point."""
+        self.write_ecflow_jobs(size)
+        latencies = []
+        for number in range(size):
+            kwargs = self.get_kwargs(number)
+            start = time.perf_counter()
+            scheduler.status_cmd(**kwargs)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def kill_cmd(self, size):
+        """Kill with the ECF_kill entry point."""
+        self.write_ecflow_jobs(size)
+        latencies = []
+        for number in range(size):
+            kwargs = self.get_kwargs(number)
+            start = time.perf_counter()
+            scheduler.kill_cmd(**kwargs)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+
+def main(argv):
+    """Run the benchmarks.
+
+    Args:
+        argv (list): Command line arguments.
+
+    Returns:
+        int: Exit status.
+
+    """
+    parser = harness.get_parser("Benchmark the submission hot path", BASELINE_FILE,
+                                "1,100,10000")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Latency of the stub batch commands in seconds")
+    parser.add_argument("--ecf-latency", dest="ecf_latency", type=float, default=0.0,
+                        help="Latency of the fake ecflow client calls in seconds")
+    args = parser.parse_args(argv)
+
+    os.environ.update({
+        "PATH": os.path.join(BENCHMARK_DIR, "bin") + os.pathsep + os.environ["PATH"],
+        "BENCH_LATENCY": str(args.latency),
+        "BENCH_ECF_LATENCY": str(args.ecf_latency)
+    })
+    os.environ.pop("ECF_SUBMISSION_SOCKET", None)
+    logging.basicConfig(level=logging.WARNING)
+
+    names = ["task_settings", "write_job", "submit", "status_cmd", "kill_cmd"]
+    if args.only is not None:
+        names = args.only.split(",")
+    results = []
+    for tier in [int(tier) for tier in args.tiers.split(",")]:
+        for name in names:
+            workdir = f"/tmp/bench_submission_{os.getpid()}"
+            shutil.rmtree(workdir, ignore_errors=True)
+            benchmarks = SubmissionBenchmarks(workdir)
+            result = harness.run_benchmark(name, getattr(benchmarks, name), tier)
+            scheduler.get_log_writer(benchmarks.logfile).close()
+            shutil.rmtree(workdir, ignore_errors=True)
+            results.append(result)
+    return harness.finish(args, results, {"throughput": True},
+                          ["seconds", "throughput", "p50", "p95"])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
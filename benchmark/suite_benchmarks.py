@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Benchmarks of suite construction.
+
+For each ensemble size tier a synthetic suite is built in a fresh process. Reported are
+the build time, the save_as_defs time, the def-file size, the peak of python allocations
+(tracemalloc) and the peak resident memory. The real ecflow module is used when it is
+installed, otherwise the fake in fake_ecflow.py (or always with --fake). With --stream the
+suite is written to the def file while it is built, and with --processes the members are
+built in a process pool (scheduler.build_subtrees). The tracemalloc peak only covers the
+main process.
+
+    python3 benchmark/suite_benchmarks.py --tiers 1,10 --depth 3
+    python3 benchmark/suite_benchmarks.py --save   # store new baselines
+"""
+import os
+import sys
+import time
+import shutil
+import resource
+import contextlib
+import tracemalloc
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import fake_ecflow  # noqa: E402
+import harness  # noqa: E402
+
+
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baselines", "suites.json")
+
+
+def load_ecflow(fake):
+    """Load ecflow or install the fake.
+
+    Args:
+        fake (bool): Always use the fake.
+
+    Returns:
+        str: "ecflow" or "fake".
+
+    """
+    if not fake:
+        try:
+            importlib.import_module("ecflow")
+            return "ecflow"
+        except ImportError:
+            pass
+    fake_ecflow.install()
+    return "fake"
+
+
+def build_suite(shape, fake, stream, processes=None):
+    """Build and save a suite. Runs in a child process.
+
+    Args:
+        shape (suite_generator.SuiteShape): Suite shape.
+        fake (bool): Always use the fake ecflow.
+        stream (bool): Stream the suite to the def file while it is built.
+        processes (int, optional): Build the members in this many processes.
+                                   Defaults to None.
+
+    Returns:
+        dict: Result.
+
+    """
+    implementation = load_ecflow(fake)
+    import suite_generator
+
+    workdir = f"/tmp/bench_suite_{os.getpid()}"
+    shutil.rmtree(workdir, ignore_errors=True)
+    ecf_files = workdir + "/ecf"
+    suite_generator.write_ecf_files(ecf_files)
+    def_file = workdir + "/bench.def"
+
+    with open(os.devnull, mode="w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            tracemalloc.start()
+            start = time.perf_counter()
+            stream_file = None
+            if stream:
+                stream_file = def_file
+            defs = suite_generator.generate_suite("bench", shape, workdir + "/job", ecf_files,
+                                                  stream_file=stream_file, processes=processes)
+            build_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            defs.save_as_defs(def_file)
+            save_seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    tasks = shape.number_of_tasks()
+    benchmark = "stream" if stream else "suite"
+    if processes is not None:
+        benchmark = f"{benchmark}_p{processes}"
+    result = {
+        "benchmark": benchmark,
+        "tasks": tasks,
+        "ecflow": implementation,
+        "build_seconds": build_seconds,
+        "save_seconds": save_seconds,
+        "tasks_per_second": tasks / build_seconds,
+        "def_mb": os.path.getsize(def_file) / 1e6,
+        "tracemalloc_mb": peak / 1e6,
+        "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    }
+    result.update(shape.as_dict())
+    shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def main(argv):
+    """Run the benchmarks.
+
+    Args:
+        argv (list): Command line arguments.
+
+    Returns:
+        int: Exit status.
+
+    """
+    parser = harness.get_parser("Benchmark suite construction", BASELINE_FILE, "1,10,50")
+    parser.add_argument("--cycles", type=int, default=4, help="Cycles")
+    parser.add_argument("--fanout", type=int, default=2, help="Families per level")
+    parser.add_argument("--depth", type=int, default=2, help="Family levels below a member")
+    parser.add_argument("--tasks", type=int, default=25, help="Tasks per innermost family")
+    parser.add_argument("--trigger-density", dest="trigger_density", type=float, default=0.5,
+                        help="Probability that a task triggers on the previous task")
+    parser.add_argument("--fake", action="store_true", help="Use the fake ecflow module")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the suite to the def file while it is built")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Build the members in this many processes")
+    args = parser.parse_args(argv)
+
+    import suite_generator
+    results = []
+    context = multiprocessing.get_context("fork")
+    for members in [int(tier) for tier in args.tiers.split(",")]:
+        shape = suite_generator.SuiteShape(members=members, cycles=args.cycles,
+                                           fanout=args.fanout, depth=args.depth,
+                                           tasks=args.tasks,
+                                           trigger_density=args.trigger_density)
+        # A fresh process per tier keeps the resident memory peaks apart. Pool workers
+        # are daemonic and could not start the processes of --processes.
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results.append(executor.submit(build_suite, shape, args.fake, args.stream,
+                                           args.processes).result())
+    metrics = {"tasks_per_second": True, "save_seconds": False, "def_mb": False,
+               "tracemalloc_mb": False, "maxrss_mb": False}
+    return harness.finish(args, results, metrics,
+                          ["build_seconds", "save_seconds", "def_mb", "tracemalloc_mb",
+                           "maxrss_mb"])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
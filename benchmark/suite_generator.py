@@ -0,0 +1,153 @@
+"""Generate synthetic suites.
+
+A suite has one family per cycle and one family per ensemble member in each cycle. Below
+each member, families are nested depth levels deep with fanout families per level, and
+the innermost families hold the tasks. A task triggers on the previous task in its family
+with probability trigger_density, and each member of a later cycle triggers on the same
+member of the previous cycle. The members can be built in parallel with
+scheduler.build_subtrees.
+"""
+import os
+import random
+import scheduler
+
+
+class SuiteShape(object):
+    """Shape of a synthetic suite."""
+
+    def __init__(self, members=50, cycles=4, fanout=2, depth=2, tasks=25, trigger_density=0.5,
+                 seed=1):
+        """Construct the shape.
+
+        Args:
+            members (int, optional): Ensemble size. Defaults to 50.
+            cycles (int, optional): Number of cycles. Defaults to 4.
+            fanout (int, optional): Families per level. Defaults to 2.
+            depth (int, optional): Levels of families below a member. Defaults to 2.
+            tasks (int, optional): Tasks per innermost family. Defaults to 25.
+            trigger_density (float, optional): Probability that a task triggers on the
+                                               previous task. Defaults to 0.5.
+            seed (int, optional): Random seed of the triggers. Defaults to 1.
+
+        """
+        self.members = members
+        self.cycles = cycles
+        self.fanout = fanout
+        self.depth = depth
+        self.tasks = tasks
+        self.trigger_density = trigger_density
+        self.seed = seed
+
+    def number_of_tasks(self):
+        """Get the number of tasks in the suite.
+
+        Returns:
+            int: Number of tasks.
+
+        """
+        return self.cycles * self.members * self.fanout ** self.depth * self.tasks
+
+    def as_dict(self):
+        """Get the shape as a dict.
+
+        Returns:
+            dict: Shape.
+
+        """
+        return {"members": self.members, "cycles": self.cycles, "fanout": self.fanout,
+                "depth": self.depth, "tasks_per_family": self.tasks,
+                "trigger_density": self.trigger_density}
+
+
+def write_ecf_files(ecf_files):
+    """Write the default task script.
+
+    Args:
+        ecf_files (str): ECF_FILES directory.
+
+    """
+    os.makedirs(ecf_files, exist_ok=True)
+    with open(ecf_files + "/default.py", mode="w", encoding="utf-8") as file_handler:
+        file_handler.write("print(\"Default python task\")\n")
+
+
+def add_families(parent, shape, level, ecf_files, rng):
+    """Add the nested families and tasks of a member.
+
+    Args:
+        parent (scheduler.EcflowNodeContainer): Parent node.
+        shape (SuiteShape): Suite shape.
+        level (int): Remaining family levels.
+        ecf_files (str): ECF_FILES directory.
+        rng (random.Random): Random generator of the triggers.
+
+    """
+    if level == 0:
+        previous = None
+        for number in range(shape.tasks):
+            triggers = None
+            if previous is not None and rng.random() < shape.trigger_density:
+                triggers = scheduler.EcflowSuiteTriggers(scheduler.EcflowSuiteTrigger(previous))
+            previous = scheduler.EcflowSuiteTask(f"Task{number}", parent, ecf_files=ecf_files,
+                                                 triggers=triggers)
+        return
+    for number in range(shape.fanout):
+        family = scheduler.EcflowSuiteFamily(f"Level{level}Family{number}", parent)
+        add_families(family, shape, level - 1, ecf_files, rng)
+
+
+def add_member(parent, shape, cycle, member, ecf_files):
+    """Add the family of an ensemble member to a cycle.
+
+    The member triggers on the same member of the previous cycle by path, so members can
+    be built independently.
+
+    Args:
+        parent (scheduler.EcflowNode): Cycle family.
+        shape (SuiteShape): Suite shape.
+        cycle (int): Cycle number.
+        member (int): Member number.
+        ecf_files (str): ECF_FILES directory.
+
+    """
+    triggers = None
+    if cycle > 0:
+        previous = parent.path.rsplit("/", 1)[0] + f"/Cycle{cycle - 1}/Mbr{member:03d}"
+        triggers = scheduler.EcflowSuiteTriggers(scheduler.EcflowSuiteTrigger(previous))
+    member_family = scheduler.EcflowSuiteFamily(
+        f"Mbr{member:03d}", parent, triggers=triggers,
+        variables=[scheduler.EcflowSuiteVariable("ENSMBR", member)])
+    rng = random.Random(f"{shape.seed}-{cycle}-{member}")
+    add_families(member_family, shape, shape.depth, ecf_files, rng)
+
+
+def generate_suite(suite_name, shape, joboutdir, ecf_files, stream_file=None, processes=None):
+    """Build a synthetic suite definition.
+
+    Args:
+        suite_name (str): Suite name.
+        shape (SuiteShape): Suite shape.
+        joboutdir (str): Job output directory.
+        ecf_files (str): ECF_FILES directory. Must contain default.py.
+        stream_file (str, optional): Stream the suite to this def file. Defaults to None.
+        processes (int, optional): Build the members in this many processes. Defaults to
+                                   None, which builds them in this process.
+
+    Returns:
+        scheduler.SuiteDefinition: The definition.
+
+    """
+    defs = scheduler.SuiteDefinition(suite_name, joboutdir, ecf_files, "env_submit.json",
+                                     stream_file=stream_file)
+    for cycle in range(shape.cycles):
+        cycle_family = scheduler.EcflowSuiteFamily(
+            f"Cycle{cycle}", defs.suite,
+            variables=[scheduler.EcflowSuiteVariable("CYCLE", cycle * 6)])
+        if processes is None:
+            for member in range(shape.members):
+                add_member(cycle_family, shape, cycle, member, ecf_files)
+        else:
+            scheduler.build_subtrees(cycle_family, [
+                (add_member, (shape, cycle, member, ecf_files))
+                for member in range(shape.members)], processes=processes)
+    return defs
@@ -8,6 +8,22 @@ nosetests3 --with-timer --with-coverage --cover-erase --cover-html --cover-html-
 --cover-package=scheduler \
 test/test_submission.py \
 test/test_ecflow.py \
+test/test_daemon.py \
+test/test_status.py \
+test/test_remote.py \
+test/test_async_submission.py \
+test/test_backends.py \
+test/test_import_time.py \
+test/test_log_writer.py \
+test/test_database.py \
+test/test_timing.py \
+test/test_triggers.py \
+test/test_graph.py \
+test/test_suite_diff.py \
+test/test_def_writer.py \
+test/test_node_index.py \
+test/test_subtrees.py \
+test/test_ecf_files.py \
 || exit 1
 
 
@@ -1,22 +1,85 @@
-"""Scheduler module."""
+"""Scheduler module.
+
+Public names are imported from their modules on first use, so the command line tools
+only load the modules (and ecflow) they need.
+"""
+import sys
+import importlib
+
 __version__ = "0.0.1a4"
 
-from .scheduler import Server, EcflowServer, EcflowServerFromFile, EcflowLogServer, EcflowClient, \
-    EcflowTask
-from .submission import SlurmSubmission, BackgroundSubmission, BatchSubmission, \
-    GridEngineSubmission, PBSSubmission, SubmitException, TaskSettings, EcflowSubmitTask, \
-    KillException, StatusException, get_submission_object
-from .suites import EcflowSuite, EcflowSuiteFamily, EcflowSuiteTask, EcflowSuiteTrigger, \
-    EcflowSuiteTriggers, EcflowSuiteVariable, SuiteDefinition
-from .cli import parse_kill_cmd, parse_status_cmd, parse_submit_cmd, kill_cmd, status_cmd, \
-    submit_cmd
+_LAZY_NAMES = {
+    ".scheduler": ["Server", "EcflowServer", "EcflowServerFromFile", "EcflowLogServer",
+                   "EcflowClient", "EcflowTask"],
+    ".submission": ["SlurmSubmission", "BackgroundSubmission", "BatchSubmission",
+                    "GridEngineSubmission", "PBSSubmission", "SubmitException", "TaskSettings",
+                    "EcflowSubmitTask", "KillException", "StatusException",
+                    "get_submission_object", "TaskSettingsIndex", "SlurmArrayBatcher",
+                    "kill_tasks"],
+    ".suites": ["EcflowSuite", "EcflowSuiteFamily", "EcflowSuiteTask", "EcflowSuiteTrigger",
+                "EcflowSuiteTriggers", "EcflowSuiteVariable", "SuiteDefinition",
+                "TriggerExpression", "NodeState", "And", "Or", "Not", "combine_triggers",
+                "archive_definition", "wait_for_archives", "trigger_paths", "prepare_ecf_files"],
+    ".cli": ["parse_kill_cmd", "parse_status_cmd", "parse_submit_cmd", "kill_cmd", "status_cmd",
+             "submit_cmd", "parse_daemon_cmd", "daemon_cmd", "parse_bulk_kill_cmd",
+             "bulk_kill_cmd"],
+    ".daemon": ["SubmissionDaemon", "DaemonException"],
+    ".status": ["StatusCache"],
+    ".remote": ["SSHConnectionPool", "get_ssh_pool", "maintain_ssh_pools"],
+    ".async_submission": ["AsyncSubmissionBaseClass", "AsyncBackgroundSubmission",
+                          "AsyncSlurmSubmission", "AsyncPBSSubmission",
+                          "AsyncGridEngineSubmission", "AsyncSubmissionEngine",
+                          "get_async_submission_object"],
+    ".backends": ["SubmissionBackend", "register_backend", "get_backend", "backend_supports"],
+    ".log_writer": ["BufferedLogWriter", "get_log_writer"],
+    ".database": ["SubmissionDatabase", "get_database"],
+    ".timing": ["enable_timing", "span"],
+    ".graph": ["TriggerGraph", "historical_durations"],
+    ".def_writer": ["DefWriter"],
+    ".subtrees": ["build_subtrees"]
+}
+_LAZY_MODULES = {name: module for module, names in _LAZY_NAMES.items() for name in names}
+
+
+def __getattr__(name):
+    """Import a public name from its module on first use."""
+    module = _LAZY_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals().update({name: value})
+    return value
+
+
+def __dir__():
+    """List the module attributes including the lazy names."""
+    return sorted(list(globals().keys()) + list(_LAZY_MODULES.keys()))
+
+
+# Module __getattr__ needs python 3.7
+if sys.version_info < (3, 7):
+    for _name in _LAZY_MODULES:
+        __getattr__(_name)
 
 
 __all__ = ["Server", "EcflowServer", "EcflowServerFromFile", "EcflowLogServer", "EcflowClient",
            "EcflowTask", "SlurmSubmission", "BackgroundSubmission", "BatchSubmission",
            "GridEngineSubmission", "PBSSubmission", "SubmitException", "TaskSettings",
            "EcflowSubmitTask", "KillException", "StatusException", "get_submission_object",
+           "TaskSettingsIndex", "SlurmArrayBatcher",
            "EcflowSuite", "EcflowSuiteFamily", "EcflowSuiteTask", "EcflowSuiteTrigger",
            "EcflowSuiteTriggers", "EcflowSuiteVariable", "SuiteDefinition", "parse_kill_cmd",
-           "parse_status_cmd", "parse_submit_cmd", "kill_cmd", "status_cmd", "submit_cmd"
+           "parse_status_cmd", "parse_submit_cmd", "kill_cmd", "status_cmd", "submit_cmd",
+           "parse_daemon_cmd", "daemon_cmd", "SubmissionDaemon", "DaemonException",
+           "kill_tasks", "parse_bulk_kill_cmd", "bulk_kill_cmd",
+           "StatusCache", "SSHConnectionPool", "get_ssh_pool", "maintain_ssh_pools",
+           "AsyncSubmissionBaseClass",
+           "AsyncBackgroundSubmission", "AsyncSlurmSubmission", "AsyncPBSSubmission",
+           "AsyncGridEngineSubmission", "AsyncSubmissionEngine", "get_async_submission_object",
+           "SubmissionBackend", "register_backend", "get_backend", "backend_supports",
+           "BufferedLogWriter", "get_log_writer", "SubmissionDatabase", "get_database",
+           "enable_timing", "span", "TriggerExpression", "NodeState", "And", "Or", "Not",
+           "combine_triggers", "TriggerGraph", "historical_durations", "archive_definition",
+           "wait_for_archives", "DefWriter", "trigger_paths", "build_subtrees",
+           "prepare_ecf_files"
            ]
@@ -0,0 +1,357 @@
+"""Asynchronous job submission.
+
+The commands are started with asyncio.create_subprocess_exec from argument lists
+instead of a shell, so one process can drive many submissions, kills and status
+requests concurrently with a bound on the number of running commands.
+
+Before Python 3.8 the child watcher of asyncio is attached to the event loop of the main
+thread, so subprocesses can only be started from the main thread there.
+"""
+import os
+import sys
+import shlex
+import threading
+import asyncio
+import subprocess
+import logging
+from .submission import SubmissionBaseClass, BackgroundSubmission, SlurmSubmission, \
+    PBSSubmission, GridEngineSubmission
+from .backends import get_backend
+
+
+class AsyncSubmissionBaseClass(object):
+    """Asynchronous command execution for a submission class.
+
+    Used as a mixin in front of a submission class, which provides the commands.
+    """
+
+    timeout = 300
+
+    @staticmethod
+    def split_cmd(cmd):
+        """Split a command into an argument list.
+
+        Args:
+            cmd (str): Command.
+
+        Returns:
+            list: Arguments.
+
+        """
+        return shlex.split(str(cmd))
+
+    def submit_argv(self):
+        """Get the arguments of the submit command.
+
+        Returns:
+            list: Arguments.
+
+        """
+        return self.split_cmd(self.set_remote_cmd(self.submit_cmd, self.remote_submit_cmd))
+
+    def submit_env(self):
+        """Get the environment of the submit command.
+
+        Returns:
+            dict: Environment. None to inherit the environment.
+
+        """
+        return None
+
+    async def run_cmd(self, argv, timeout=None, env=None):
+        """Run a command and capture its output.
+
+        Args:
+            argv (list): Arguments.
+            timeout (float, optional): Timeout in seconds. Defaults to the class timeout.
+            env (dict, optional): Environment. Defaults to None.
+
+        Raises:
+            RuntimeError: If the command timed out.
+
+        Returns:
+            tuple: Return code and output.
+
+        """
+        if timeout is None:
+            timeout = self.timeout
+        logging.info(" ".join(argv))
+        process = await asyncio.create_subprocess_exec(*argv, stdout=subprocess.PIPE,
+                                                       stderr=subprocess.STDOUT,
+                                                       env=env)
+        try:
+            output, __ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError as error:
+            process.kill()
+            await process.wait()
+            raise RuntimeError(f"Command {argv[0]} timed out after {timeout} seconds") from error
+        return process.returncode, output.decode("utf-8", errors="replace")
+
+    async def submit_job_async(self, timeout=None):
+        """Submit job.
+
+        Jobs with a log file (background jobs) are started and left running. For the
+        other jobs the output of the submit command is captured and parsed.
+
+        Args:
+            timeout (float, optional): Timeout in seconds. Defaults to the class timeout.
+
+        Raises:
+            RuntimeError: If the submit command failed.
+
+        Returns:
+            str: Job id.
+
+        """
+        if self.submit_cmd is None:
+            return None
+        argv = self.submit_argv()
+        if self.server is not None:
+            self.server.update_log("ECF_JOB_CMD: " + " ".join(argv))
+        logfile = self.get_logfile()
+        if logfile is None:
+            ret, output = await self.run_cmd(argv, timeout=timeout, env=self.submit_env())
+            self.submit_output = output
+            subfile = self.task.create_submission_log(self.task_settings.joboutdir)
+            self.write_log(subfile, self.submit_output)
+            if ret != 0:
+                raise RuntimeError("Submit command failed with error code " + str(ret))
+        else:
+            # The job must outlive the event loop, so it is not an asyncio process
+            with open(logfile, mode="w", encoding="utf-8") as file_handler:
+                self.process = subprocess.Popen(argv, stdout=file_handler,
+                                                stderr=subprocess.STDOUT, env=self.submit_env())
+
+        self.job_id = self.set_jobid()
+        if self.db_file is not None:
+            SubmissionBaseClass.update_db(self, self.job_id)
+        return self.job_id
+
+    async def kill_job_async(self, timeout=None):
+        """Kill job.
+
+        Args:
+            timeout (float, optional): Timeout in seconds. Defaults to the class timeout.
+
+        Raises:
+            RuntimeError: If the kill command failed.
+
+        """
+        self.set_kill_cmd()
+        if self.kill_job_cmd is None:
+            raise RuntimeError("No kill command set for " + self.task_settings.submit_type)
+        cmd = self.set_remote_cmd(self.kill_job_cmd, self.remote_kill_cmd)
+        ret, output = await self.run_cmd(self.split_cmd(cmd), timeout=timeout)
+        killfile = self.task.create_kill_log(self.task_settings.joboutdir)
+        self.write_log(killfile, f"Kill job {self.task_settings.ecf_job_at_host} with "
+                                 f"command:\n{cmd}\n{output}")
+        if ret != 0:
+            raise RuntimeError("Kill command failed with error code " + str(ret))
+        with open(self.task_settings.ecf_jobout, mode="a", encoding="utf-8") as log_handler:
+            log_handler.write("\n\n*** KILLED BY ECF_kill ****")
+        self.update_db_state("killed")
+
+    async def job_status_async(self, timeout=None):
+        """Get the job status.
+
+        Args:
+            timeout (float, optional): Timeout in seconds. Defaults to the class timeout.
+
+        Raises:
+            RuntimeError: If the status command failed.
+
+        Returns:
+            str: Output of the status command.
+
+        """
+        self.set_job_status()
+        if self.job_status_cmd is None:
+            raise RuntimeError("No status command set for " + self.task_settings.submit_type)
+        cmd = self.set_remote_cmd(self.job_status_cmd, self.remote_status_cmd)
+        ret, output = await self.run_cmd(self.split_cmd(cmd), timeout=timeout)
+        statusfile = self.task.create_status_log(self.task_settings.joboutdir)
+        self.write_log(statusfile, output)
+        if ret != 0:
+            raise RuntimeError("Status command failed with error code " + str(ret))
+        return output
+
+
+class AsyncBackgroundSubmission(AsyncSubmissionBaseClass, BackgroundSubmission):
+    """Asynchronous background submission."""
+
+    def submit_argv(self):
+        """Run the job file directly. Submit variables are passed in the environment."""
+        return [self.task_settings.ecf_job]
+
+    def submit_env(self):
+        """Environment with the submit variables."""
+        if self.task_settings.submit_variables is None:
+            return None
+        env = dict(os.environ)
+        for key, val in self.task_settings.submit_variables.items():
+            env.update({str(key): str(val)})
+        return env
+
+
+class AsyncSlurmSubmission(AsyncSubmissionBaseClass, SlurmSubmission):
+    """Asynchronous slurm submission."""
+
+
+class AsyncPBSSubmission(AsyncSubmissionBaseClass, PBSSubmission):
+    """Asynchronous PBS submission."""
+
+
+class AsyncGridEngineSubmission(AsyncSubmissionBaseClass, GridEngineSubmission):
+    """Asynchronous Sun Grid Engine (SGE) submission."""
+
+
+def get_async_submission_object(task, task_settings, server, db_file=None):
+    """Get the asynchronous submission object constructed from a submit type.
+
+    Args:
+        task (scheduler.EcflowTask): Task.
+        task_settings (scheduler.TaskSettings): Task settings
+        server (scheduler.Server): Server.
+        db_file (str, optional): Data base for monitoring. Defaults to None.
+
+    Raises:
+        NotImplementedError: If the submit type has no asynchronous backend.
+
+    Returns:
+        AsyncSubmissionBaseClass: Return a submission object.
+
+    """
+    submit_type = task_settings.submit_type
+    logging.info("Submit type: %s", submit_type)
+    submission_class = get_backend(submit_type).load_async()
+    sub = submission_class(task, task_settings, server, db_file=db_file)
+    return sub
+
+
+def can_start_subprocesses():
+    """Check if asyncio can start subprocesses in this thread.
+
+    Returns:
+        bool: True for Python 3.8 or newer and in the main thread.
+
+    """
+    if sys.version_info >= (3, 8):
+        return True
+    return threading.current_thread() is threading.main_thread()
+
+
+class AsyncSubmissionEngine(object):
+    """Run submissions, kills and status requests concurrently.
+
+    The engine keeps one event loop for all its calls. Close it with close() or use the
+    engine as a context manager. Before Python 3.8 it must be used from the main thread.
+    """
+
+    def __init__(self, max_concurrency=16, timeout=300):
+        """Construct the engine.
+
+        Args:
+            max_concurrency (int, optional): Maximum number of running commands. Defaults to 16.
+            timeout (float, optional): Timeout per command in seconds. Defaults to 300.
+
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.loop = None
+
+    def __enter__(self):
+        """Enter the context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the event loop."""
+        self.close()
+
+    def close(self):
+        """Close the event loop."""
+        if self.loop is not None:
+            self.loop.close()
+            self.loop = None
+
+    async def gather(self, subs, method):
+        """Call an async method of all submissions with bounded concurrency.
+
+        Args:
+            subs (list): Asynchronous submission objects.
+            method (str): Name of the method.
+
+        Returns:
+            list: Results or exceptions in the order of the submissions.
+
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(sub):
+            async with semaphore:
+                try:
+                    return await getattr(sub, method)(timeout=self.timeout)
+                finally:
+                    sub.join_logs()
+
+        return await asyncio.gather(*[bounded(sub) for sub in subs], return_exceptions=True)
+
+    def run(self, subs, method):
+        """Run an async method of all submissions in the event loop of the engine.
+
+        Args:
+            subs (list): Asynchronous submission objects.
+            method (str): Name of the method.
+
+        Raises:
+            RuntimeError: If subprocesses can not be started from this thread.
+
+        Returns:
+            list: Results or exceptions in the order of the submissions.
+
+        """
+        if not can_start_subprocesses():
+            raise RuntimeError("Asynchronous submission needs Python 3.8 or newer outside of "
+                               "the main thread")
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            return self.loop.run_until_complete(self.gather(subs, method))
+        finally:
+            asyncio.set_event_loop(None)
+
+    def submit(self, subs):
+        """Submit jobs. The submit commands must be set.
+
+        Args:
+            subs (list): Asynchronous submission objects.
+
+        Returns:
+            list: Job ids or exceptions.
+
+        """
+        return self.run(subs, "submit_job_async")
+
+    def kill(self, subs):
+        """Kill jobs.
+
+        Args:
+            subs (list): Asynchronous submission objects with job ids.
+
+        Returns:
+            list: None or exceptions.
+
+        """
+        return self.run(subs, "kill_job_async")
+
+    def status(self, subs):
+        """Get the status of jobs.
+
+        Args:
+            subs (list): Asynchronous submission objects with job ids.
+
+        Returns:
+            list: Status output or exceptions.
+
+        """
+        return self.run(subs, "job_status_async")
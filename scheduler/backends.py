@@ -0,0 +1,236 @@
+"""Registry of submission backends.
+
+Backends are registered per submit type with the module and class implementing them and
+the capabilities of the batch system. Backend modules are imported when first used.
+
+Site specific backends are found from the scheduler.backends entry point group, e.g.
+
+    entry_points={"scheduler.backends": ["lsf = mysite.lsf:LSFSubmission"]}
+
+A class attribute capabilities (dict) on the backend class declares its capabilities:
+
+    arrays: Has submit_array and can be used with the SlurmArrayBatcher.
+    bulk_status: Has bulk_status_cmd and parse_bulk_status for the status cache.
+    bulk_kill: Has bulk_kill_cmd to kill several jobs with one command.
+    parsable_output: The submit command prints the job id only. It is then taken without
+                     parsing the verbose output formats.
+"""
+import importlib
+import threading
+import logging
+
+
+ENTRY_POINT_GROUP = "scheduler.backends"
+BACKENDS = {}
+BACKENDS_LOCK = threading.Lock()
+DISCOVERED = []
+
+
+def load_object(target):
+    """Import an object from a module:object string.
+
+    Args:
+        target (str): Target, e.g. scheduler.submission:SlurmSubmission.
+
+    Raises:
+        ValueError: If the target is not on the form module:object.
+
+    Returns:
+        object: The object.
+
+    """
+    if target.find(":") < 0:
+        raise ValueError("Expected module:object. Got " + target)
+    module_name, object_name = target.split(":", 1)
+    obj = importlib.import_module(module_name)
+    for attribute in object_name.split("."):
+        obj = getattr(obj, attribute)
+    return obj
+
+
+class SubmissionBackend(object):
+    """A submission backend."""
+
+    def __init__(self, name, target, async_target=None, capabilities=None):
+        """Construct the backend.
+
+        Args:
+            name (str): Submit type.
+            target (str): Submission class as module:class.
+            async_target (str, optional): Asynchronous submission class as module:class.
+                                          Defaults to None.
+            capabilities (dict, optional): Capabilities. None to read them from the
+                                           capabilities attribute of the class.
+                                           Defaults to None.
+
+        """
+        self.name = name
+        self.target = target
+        self.async_target = async_target
+        self.capabilities = capabilities
+        self.submission_class = None
+        self.async_submission_class = None
+
+    def load(self):
+        """Import the submission class.
+
+        Returns:
+            type: Submission class.
+
+        """
+        if self.submission_class is None:
+            logging.debug("Load submission backend %s from %s", self.name, self.target)
+            self.submission_class = load_object(self.target)
+        return self.submission_class
+
+    def load_async(self):
+        """Import the asynchronous submission class.
+
+        Raises:
+            NotImplementedError: If the backend has no asynchronous class.
+
+        Returns:
+            type: Asynchronous submission class.
+
+        """
+        if self.async_target is None:
+            raise NotImplementedError("No asynchronous submission for " + self.name)
+        if self.async_submission_class is None:
+            self.async_submission_class = load_object(self.async_target)
+        return self.async_submission_class
+
+    def supports(self, capability):
+        """Check if the backend has a capability.
+
+        Args:
+            capability (str): Capability, e.g. arrays, bulk_status, bulk_kill or
+                              parsable_output.
+
+        Returns:
+            bool: True if the backend has the capability.
+
+        """
+        if self.capabilities is None:
+            self.capabilities = dict(getattr(self.load(), "capabilities", {}))
+        return bool(self.capabilities.get(capability, False))
+
+
+def register_backend(name, target, async_target=None, capabilities=None):
+    """Register a submission backend.
+
+    Args:
+        name (str): Submit type.
+        target (str): Submission class as module:class.
+        async_target (str, optional): Asynchronous submission class as module:class.
+                                      Defaults to None.
+        capabilities (dict, optional): Capabilities. Defaults to None.
+
+    Returns:
+        SubmissionBackend: The backend.
+
+    """
+    backend = SubmissionBackend(name.lower(), target, async_target=async_target,
+                                capabilities=capabilities)
+    with BACKENDS_LOCK:
+        BACKENDS.update({backend.name: backend})
+    return backend
+
+
+def iter_entry_points(group):
+    """Get the entry points of a group.
+
+    Args:
+        group (str): Entry point group.
+
+    Returns:
+        list: Tuples of name and value.
+
+    """
+    try:
+        from importlib import metadata
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return []
+        return [(entry_point.name, f"{entry_point.module_name}:{'.'.join(entry_point.attrs)}")
+                for entry_point in pkg_resources.iter_entry_points(group)]
+
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        entry_points = entry_points.select(group=group)
+    else:
+        entry_points = entry_points.get(group, [])
+    return [(entry_point.name, entry_point.value) for entry_point in entry_points]
+
+
+def discover_backends():
+    """Register backends from the entry points once.
+
+    Built-in backends are not overridden.
+    """
+    with BACKENDS_LOCK:
+        if len(DISCOVERED) > 0:
+            return
+        DISCOVERED.append(True)
+    for name, target in iter_entry_points(ENTRY_POINT_GROUP):
+        if name.lower() in BACKENDS:
+            logging.warning("Submission backend %s is already registered", name)
+            continue
+        register_backend(name, target)
+
+
+def get_backend(submit_type):
+    """Get the backend of a submit type.
+
+    Entry points are only searched if the submit type is not registered.
+
+    Args:
+        submit_type (str): Submit type.
+
+    Raises:
+        NotImplementedError: If no backend is registered for the submit type.
+
+    Returns:
+        SubmissionBackend: The backend.
+
+    """
+    name = submit_type.lower()
+    backend = BACKENDS.get(name)
+    if backend is None:
+        discover_backends()
+        backend = BACKENDS.get(name)
+    if backend is None:
+        raise NotImplementedError("No submission backend for " + submit_type)
+    return backend
+
+
+def backend_supports(submit_type, capability):
+    """Check if the backend of a submit type has a capability.
+
+    Args:
+        submit_type (str): Submit type.
+        capability (str): Capability.
+
+    Returns:
+        bool: True if the backend has the capability.
+
+    """
+    return get_backend(submit_type).supports(capability)
+
+
+register_backend("background", "scheduler.submission:BackgroundSubmission",
+                 async_target="scheduler.async_submission:AsyncBackgroundSubmission",
+                 capabilities={"bulk_status": True, "bulk_kill": True})
+register_backend("slurm", "scheduler.submission:SlurmSubmission",
+                 async_target="scheduler.async_submission:AsyncSlurmSubmission",
+                 capabilities={"arrays": True, "bulk_status": True, "bulk_kill": True,
+                               "parsable_output": True})
+register_backend("pbs", "scheduler.submission:PBSSubmission",
+                 async_target="scheduler.async_submission:AsyncPBSSubmission",
+                 capabilities={"bulk_status": True, "bulk_kill": True,
+                               "parsable_output": True})
+register_backend("grid_engine", "scheduler.submission:GridEngineSubmission",
+                 async_target="scheduler.async_submission:AsyncGridEngineSubmission",
+                 capabilities={"bulk_status": True, "bulk_kill": True,
+                               "parsable_output": True})
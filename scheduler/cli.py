@@ -1,9 +1,9 @@
 """Scheduler module."""
 import sys
 from argparse import ArgumentParser
-import json
 import os
 import scheduler
+from . import daemon, timing
 
 
 def parse_submit_cmd(argv):
@@ -29,6 +29,11 @@ def parse_submit_cmd(argv):
                         default=None)
     parser.add_argument('--db', dest="dbfile", type=str, nargs="?", help="Database",
                         required=False, default=None)
+    parser.add_argument('--socket', dest="socket", type=str, nargs="?", required=False,
+                        default=None, help="Submission daemon socket")
+    parser.add_argument('--timing', dest="timing", type=str, nargs="?", required=False,
+                        default=None, help="Directory for stage timings. Defaults to $" +
+                        timing.TIMING_ENV)
     parser.add_argument('--version', action='version', version=scheduler.__version__)
 
     if len(argv) == 0:
@@ -43,7 +48,17 @@ def parse_submit_cmd(argv):
 
 
 def submit_cmd(**kwargs):
-    """Submit command."""
+    """Submit command.
+
+    Forwarded to the submission daemon if it is running.
+    """
+    timing.setup_timing(kwargs.get("timing"), "submit")
+    if not daemon.forward("submit", kwargs, socket_path=kwargs.get("socket")):
+        run_submit_cmd(**kwargs)
+
+
+def run_submit_cmd(**kwargs):
+    """Submit command in this process."""
     ecf_name = kwargs["ecf_name"]
     ensmbr = kwargs["ensmbr"]
     ecf_tryno = kwargs["ecf_tryno"]
@@ -54,13 +69,12 @@ def submit_cmd(**kwargs):
         joboutdir = {"0": joboutdir}
     env_submit = kwargs["env_submit"]
     if isinstance(env_submit, str):
-        with open(env_submit, mode="r", encoding="utf-8") as file_handler:
-            env_submit = json.load(file_handler)
+        env_submit = scheduler.TaskSettingsIndex.from_file(env_submit)
     env_server = kwargs["env_server"]
     logfile = kwargs["logfile"]
     if isinstance(env_server, str):
         env_server = scheduler.EcflowServerFromFile(env_server, logfile=logfile)
-    else:
+    elif isinstance(env_server, dict):
         env_server = scheduler.EcflowServer(env_server["ECF_HOST"], env_server["ECF_PORT"],
                                             logfile=logfile)
 
@@ -86,7 +100,8 @@ def submit_cmd(**kwargs):
         task = scheduler.EcflowTask(ecf_name, ecf_tryno, ecf_pass, ecf_rid, submission_id)
         sub = scheduler.EcflowSubmitTask(task, env_submit, env_server, joboutdir,
                                          env_file=env_file, ensmbr=ensmbr,
-                                         dbfile=dbfile, stream=stream, coldstart=coldstart)
+                                         dbfile=dbfile, stream=stream, coldstart=coldstart,
+                                         batcher=kwargs.get("batcher"))
         if not dry_run:
             sub.submit()
     except Exception as ex:
@@ -108,6 +123,13 @@ def parse_kill_cmd(argv):
     parser.add_argument('-ecf_rid', dest='ecf_rid', type=str, help="ECF_RID", required=False,
                         nargs="?", default=None)
     parser.add_argument('-submission_id', type=str, help="SUBMISSION_ID")
+    parser.add_argument('--dry-run', dest="dry_run", action="store_true", required=False,
+                        default=False, help="Set up the command without running it")
+    parser.add_argument('--socket', dest="socket", type=str, nargs="?", required=False,
+                        default=None, help="Submission daemon socket")
+    parser.add_argument('--timing', dest="timing", type=str, nargs="?", required=False,
+                        default=None, help="Directory for stage timings. Defaults to $" +
+                        timing.TIMING_ENV)
     parser.add_argument('--version', action='version', version=scheduler.__version__)
 
     if len(argv) == 0:
@@ -122,7 +144,17 @@ def parse_kill_cmd(argv):
 
 
 def kill_cmd(**kwargs):
-    """Kill cmmand."""
+    """Kill command.
+
+    Forwarded to the submission daemon if it is running.
+    """
+    timing.setup_timing(kwargs.get("timing"), "kill")
+    if not daemon.forward("kill", kwargs, socket_path=kwargs.get("socket")):
+        run_kill_cmd(**kwargs)
+
+
+def run_kill_cmd(**kwargs):
+    """Kill command in this process."""
     ecf_name = kwargs["ecf_name"]
     ecf_tryno = kwargs["ecf_tryno"]
     ecf_pass = kwargs["ecf_pass"]
@@ -134,8 +166,7 @@ def kill_cmd(**kwargs):
         submission_id = None
     env_submit = kwargs["env_submit"]
     if isinstance(env_submit, str):
-        with open(env_submit, mode="r", encoding="utf-8") as file_handler:
-            env_submit = json.load(file_handler)
+        env_submit = scheduler.TaskSettingsIndex.from_file(env_submit)
     jobout_dir = kwargs["joboutdir"]
     if isinstance(jobout_dir, str):
         jobout_dir = {"0": jobout_dir}
@@ -160,6 +191,85 @@ def kill_cmd(**kwargs):
         server.force_aborted(task)
 
 
+def parse_bulk_kill_cmd(argv):
+    """Parse the command line input arguments."""
+    parser = ArgumentParser("Kill all active and submitted EcFlow tasks below a node")
+    parser.add_argument("-sub", dest='env_submit', type=str, help="File with submission settings",
+                        required=True)
+    parser.add_argument('-dir', dest="joboutdir", type=str, help="Ecflow JOBOUTDIR", required=True)
+    parser.add_argument("-server", dest='env_server', type=str,
+                        help="File with Ecflow server settings", required=True)
+    parser.add_argument('--log', dest="logfile", type=str, help="Server logfile", required=True)
+    parser.add_argument("-node", dest='node', type=str, help="Path of suite, family or task",
+                        required=True)
+    parser.add_argument('--db', dest="dbfile", type=str, nargs="?", help="Database",
+                        required=False, default=None)
+    parser.add_argument('--socket', dest="socket", type=str, nargs="?", required=False,
+                        default=None, help="Submission daemon socket")
+    parser.add_argument('--timing', dest="timing", type=str, nargs="?", required=False,
+                        default=None, help="Directory for stage timings. Defaults to $" +
+                        timing.TIMING_ENV)
+    parser.add_argument('--version', action='version', version=scheduler.__version__)
+
+    if len(argv) == 0:
+        parser.print_help()
+        sys.exit()
+
+    args = parser.parse_args(argv)
+    kwargs = {}
+    for arg in vars(args):
+        kwargs.update({arg: getattr(args, arg)})
+    return kwargs
+
+
+def bulk_kill_cmd(**kwargs):
+    """Bulk kill command.
+
+    Forwarded to the submission daemon if it is running.
+    """
+    timing.setup_timing(kwargs.get("timing"), "bulk_kill")
+    response = daemon.forward("bulk_kill", kwargs, socket_path=kwargs.get("socket"))
+    if response:
+        result = response["result"]
+    else:
+        result = run_bulk_kill_cmd(**kwargs)
+    print(f"Killed {len(result['killed'])} tasks below {kwargs['node']}. "
+          f"{len(result['failed'])} failed.")
+    if len(result["failed"]) > 0:
+        sys.exit(1)
+
+
+def run_bulk_kill_cmd(**kwargs):
+    """Bulk kill command in this process.
+
+    Returns:
+        dict: Lists with the ECF_NAME of the "killed" and "failed" tasks.
+
+    """
+    node = kwargs["node"]
+    env_submit = kwargs["env_submit"]
+    if isinstance(env_submit, str):
+        env_submit = scheduler.TaskSettingsIndex.from_file(env_submit)
+    jobout_dir = kwargs["joboutdir"]
+    if isinstance(jobout_dir, str):
+        jobout_dir = {"0": jobout_dir}
+
+    server = kwargs["env_server"]
+    # If a server environment file, create a server
+    if isinstance(server, str):
+        logfile = kwargs["logfile"]
+        server = scheduler.EcflowServerFromFile(server, logfile)
+
+    dry_run = False
+    if "dry_run" in kwargs:
+        dry_run = kwargs["dry_run"]
+
+    tasks = server.get_submitted_tasks(node)
+    result = scheduler.kill_tasks(tasks, env_submit, jobout_dir, server, dry_run=dry_run,
+                                  db_file=kwargs.get("dbfile"))
+    return {key: [task.ecf_name for task in tasks] for key, tasks in result.items()}
+
+
 def parse_status_cmd(argv):
     """Parse the command line input arguments."""
     parser = ArgumentParser("Status of EcFlow task")
@@ -176,6 +286,13 @@ def parse_status_cmd(argv):
     parser.add_argument('-ecf_rid', type=str, help="ECF_RID", required=False, nargs="?",
                         default=None)
     parser.add_argument('-submission_id', type=str, help="SUBMISSION_ID")
+    parser.add_argument('--dry-run', dest="dry_run", action="store_true", required=False,
+                        default=False, help="Set up the command without running it")
+    parser.add_argument('--socket', dest="socket", type=str, nargs="?", required=False,
+                        default=None, help="Submission daemon socket")
+    parser.add_argument('--timing', dest="timing", type=str, nargs="?", required=False,
+                        default=None, help="Directory for stage timings. Defaults to $" +
+                        timing.TIMING_ENV)
     parser.add_argument('--version', action='version', version=scheduler.__version__)
 
     if len(argv) == 0:
@@ -190,7 +307,17 @@ def parse_status_cmd(argv):
 
 
 def status_cmd(**kwargs):
-    """Status command."""
+    """Status command.
+
+    Forwarded to the submission daemon if it is running.
+    """
+    timing.setup_timing(kwargs.get("timing"), "status")
+    if not daemon.forward("status", kwargs, socket_path=kwargs.get("socket")):
+        run_status_cmd(**kwargs)
+
+
+def run_status_cmd(**kwargs):
+    """Status command in this process."""
     ecf_name = kwargs["ecf_name"]
     ecf_tryno = kwargs["ecf_tryno"]
     ecf_pass = kwargs["ecf_pass"]
@@ -198,8 +325,7 @@ def status_cmd(**kwargs):
     submission_id = kwargs["submission_id"]
     env_submit = kwargs["env_submit"]
     if isinstance(env_submit, str):
-        with open(env_submit, mode="r", encoding="utf-8") as file_handler:
-            env_submit = json.load(file_handler)
+        env_submit = scheduler.TaskSettingsIndex.from_file(env_submit)
     jobout_dir = kwargs["joboutdir"]
     if isinstance(jobout_dir, str):
         jobout_dir = {"0": jobout_dir}
@@ -220,3 +346,25 @@ def status_cmd(**kwargs):
     sub = scheduler.get_submission_object(task, task_settings, server)
     if not dry_run:
         sub.status()
+
+
+def parse_daemon_cmd(argv):
+    """Parse the command line input arguments."""
+    parser = ArgumentParser("Persistent submission daemon for ECF_submit, ECF_status and ECF_kill")
+    parser.add_argument('--socket', dest="socket", type=str, required=False, default=None,
+                        help="Unix socket to listen to. Defaults to $" + daemon.SOCKET_ENV)
+    parser.add_argument('--version', action='version', version=scheduler.__version__)
+
+    args = parser.parse_args(argv)
+    kwargs = {}
+    for arg in vars(args):
+        kwargs.update({arg: getattr(args, arg)})
+    return kwargs
+
+
+def daemon_cmd(**kwargs):
+    """Start the submission daemon."""
+    socket_path = daemon.get_socket_path(kwargs.get("socket"))
+    if socket_path is None:
+        raise Exception("No socket set for the submission daemon")
+    daemon.SubmissionDaemon(socket_path).serve_forever()
@@ -0,0 +1,381 @@
+"""Persistent submission daemon.
+
+The daemon keeps submission configurations and server clients in memory and
+listens on a unix socket. ECF_submit, ECF_status and ECF_kill forward their
+parsed arguments to it and fall back to in-process execution if it is not running.
+"""
+import os
+import json
+import time
+import threading
+import logging
+from .log_writer import flush_log_writers
+from .timing import RequestTiming, get_tracer
+
+
+SOCKET_ENV = "ECF_SUBMISSION_SOCKET"
+# Seconds between the maintenance of the ssh connection pools
+MAINTENANCE_INTERVAL = 60
+# Arguments with file names resolved in the working directory of the caller
+PATH_ARGUMENTS = ["env_submit", "joboutdir", "env_server", "logfile", "dbfile", "timing"]
+# Environment variables set by the shell which do not affect the commands
+SHELL_VARIABLES = ["PWD", "OLDPWD", "SHLVL", "_"]
+
+
+class DaemonException(Exception):
+    """Exception raised when the daemon failed to handle a request."""
+
+
+def get_socket_path(socket_path=None):
+    """Get the daemon socket path.
+
+    Args:
+        socket_path (str, optional): Explicit socket path. Defaults to None.
+
+    Returns:
+        str: Socket path from argument or environment. None if not set.
+
+    """
+    if socket_path is None:
+        socket_path = os.environ.get(SOCKET_ENV)
+    if socket_path == "":
+        socket_path = None
+    return socket_path
+
+
+def absolute_paths(kwargs):
+    """Make the file names in the arguments absolute.
+
+    Args:
+        kwargs (dict): Parsed command line arguments.
+
+    Returns:
+        dict: Arguments with absolute file names.
+
+    """
+    kwargs = dict(kwargs)
+    for key in PATH_ARGUMENTS:
+        value = kwargs.get(key)
+        if isinstance(value, str) and value != "":
+            kwargs.update({key: os.path.abspath(value)})
+    return kwargs
+
+
+def get_environment():
+    """Get the environment the commands run in.
+
+    Returns:
+        dict: Environment variables except the ones set by the shell.
+
+    """
+    return {key: value for key, value in os.environ.items() if key not in SHELL_VARIABLES}
+
+
+def send_request(socket_path, request, timeout=300):
+    """Send a request to the daemon and wait for the answer.
+
+    Args:
+        socket_path (str): Daemon socket.
+        request (dict): Request.
+        timeout (int, optional): Timeout in seconds. Defaults to 300.
+
+    Raises:
+        OSError: If the daemon could not be reached.
+        TypeError: If the request can not be serialized.
+
+    Returns:
+        dict: Response from the daemon.
+
+    """
+    import socket
+
+    data = json.dumps(request).encode("utf-8")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(data)
+        sock.shutdown(socket.SHUT_WR)
+        data = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data = data + chunk
+    return json.loads(data.decode("utf-8"))
+
+
+def forward(command, kwargs, socket_path=None, timeout=300):
+    """Forward a command to the daemon if it is running.
+
+    File names are made absolute and the environment of the caller is sent with the
+    request. The daemon only runs commands from callers with its own environment, since
+    the batch commands inherit it. Other callers run the command in-process.
+
+    Args:
+        command (str): Command (submit, kill, bulk_kill or status).
+        kwargs (dict): Parsed command line arguments.
+        socket_path (str, optional): Daemon socket. Defaults to None.
+        timeout (int, optional): Timeout in seconds. Defaults to 300.
+
+    Raises:
+        DaemonException: If the daemon failed to handle the request.
+        SystemExit: If the command exited in the daemon.
+
+    Returns:
+        dict: Response of the daemon with the "result" of the command. None if the command
+              must run in-process.
+
+    """
+    socket_path = get_socket_path(socket_path)
+    if socket_path is None:
+        return None
+    try:
+        request = {"command": command, "kwargs": absolute_paths(kwargs),
+                   "environ": get_environment()}
+        response = send_request(socket_path, request, timeout=timeout)
+    except TypeError:
+        logging.debug("Arguments can not be serialized. Run %s in-process", command)
+        return None
+    except (OSError, ValueError) as error:
+        logging.debug("Daemon not available on %s: %s", socket_path, repr(error))
+        return None
+
+    status = response.get("status")
+    if status == "ok":
+        return response
+    if status == "in_process":
+        logging.info("Run %s in-process: %s", command, response.get("message"))
+        return None
+    if status == "exit":
+        raise SystemExit(response.get("code"))
+    raise DaemonException(response.get("message"))
+
+
+class SubmissionDaemon(object):
+    """Long-lived submission daemon listening on a unix socket."""
+
+    def __init__(self, socket_path, batcher=None):
+        """Construct the daemon.
+
+        Args:
+            socket_path (str): Unix socket to listen to.
+            batcher (scheduler.SlurmArrayBatcher, optional): Batcher for slurm job arrays.
+                                                             Defaults to None.
+
+        """
+        from .submission import SlurmArrayBatcher
+
+        if batcher is None:
+            batcher = SlurmArrayBatcher()
+        self.batcher = batcher
+        self.socket_path = socket_path
+        self.env_submit_cache = {}
+        self.lock = threading.Lock()
+        self.servers = {}
+        self.server = None
+        self.last_maintained = time.time()
+
+    def get_env_submit(self, env_submit):
+        """Get the compiled submission settings.
+
+        Files are compiled once and re-compiled only if they are modified.
+
+        Args:
+            env_submit (str): File with submission settings.
+
+        Returns:
+            scheduler.TaskSettingsIndex: Compiled submission settings.
+
+        """
+        from .submission import TaskSettingsIndex
+
+        if not isinstance(env_submit, str):
+            return env_submit
+        mtime = os.stat(env_submit).st_mtime_ns
+        with self.lock:
+            cached = self.env_submit_cache.get(env_submit)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        index = TaskSettingsIndex.from_file(env_submit)
+        with self.lock:
+            self.env_submit_cache.update({env_submit: (mtime, index)})
+        return index
+
+    def checkout_server(self, env_server, logfile):
+        """Get an ecflow server client from the pool.
+
+        The ecflow client is not thread safe, so a client is only used by one request
+        at a time and returned to the pool with checkin_server.
+
+        Args:
+            env_server (str): File with ecflow server settings.
+            logfile (str): Server logfile.
+
+        Returns:
+            scheduler.EcflowServer: The server.
+
+        """
+        from .scheduler import EcflowServerFromFile
+
+        key = (env_server, logfile)
+        with self.lock:
+            idle = self.servers.get(key, [])
+            if len(idle) > 0:
+                return idle.pop()
+        return EcflowServerFromFile(env_server, logfile)
+
+    def checkin_server(self, env_server, logfile, server):
+        """Return an ecflow server client to the pool.
+
+        Args:
+            env_server (str): File with ecflow server settings.
+            logfile (str): Server logfile.
+            server (scheduler.EcflowServer): The server.
+
+        """
+        key = (env_server, logfile)
+        with self.lock:
+            if key not in self.servers:
+                self.servers.update({key: []})
+            self.servers[key].append(server)
+
+    def prepare(self, command, kwargs):
+        """Replace file names with cached objects.
+
+        Args:
+            command (str): Command.
+            kwargs (dict): Parsed command line arguments.
+
+        Returns:
+            dict: Arguments for the in-process commands.
+
+        """
+        kwargs = dict(kwargs)
+        if kwargs.get("env_submit") is not None:
+            kwargs.update({"env_submit": self.get_env_submit(kwargs["env_submit"])})
+        if isinstance(kwargs.get("env_server"), str):
+            kwargs.update({"env_server": self.checkout_server(kwargs["env_server"],
+                                                              kwargs.get("logfile"))})
+        if command == "submit":
+            kwargs.update({"batcher": self.batcher})
+        return kwargs
+
+    def handle(self, request):
+        """Handle a request.
+
+        Args:
+            request (dict): Request with command, kwargs and the environ of the caller.
+
+        Returns:
+            dict: Response. The status is "in_process" if the environment of the caller
+                  differs from the environment of the daemon.
+
+        """
+        from .cli import run_submit_cmd, run_kill_cmd, run_status_cmd, run_bulk_kill_cmd
+
+        command = request.get("command")
+        if command == "ping":
+            return {"status": "ok"}
+
+        commands = {
+            "submit": run_submit_cmd,
+            "kill": run_kill_cmd,
+            "status": run_status_cmd,
+            "bulk_kill": run_bulk_kill_cmd
+        }
+        if command not in commands:
+            return {"status": "error", "message": f"Unknown command {command}"}
+
+        environ = request.get("environ")
+        if environ is None:
+            return {"status": "in_process", "message": "No environment in the request"}
+        daemon_environ = get_environment()
+        if environ != daemon_environ:
+            names = sorted(key for key in set(environ) | set(daemon_environ)
+                           if environ.get(key) != daemon_environ.get(key))
+            return {"status": "in_process",
+                    "message": "Environment differs from the daemon: " + ", ".join(names)}
+
+        request_kwargs = request.get("kwargs", {})
+        kwargs = None
+        result = None
+        try:
+            with RequestTiming(request_kwargs.get("timing")):
+                kwargs = self.prepare(command, request_kwargs)
+                result = commands[command](**kwargs)
+        except SystemExit as exit_status:
+            return {"status": "exit", "code": exit_status.code}
+        except Exception as error:
+            logging.exception("Daemon %s failed", command)
+            return {"status": "error", "message": repr(error)}
+        finally:
+            if kwargs is not None and isinstance(request_kwargs.get("env_server"), str):
+                self.checkin_server(request_kwargs["env_server"], request_kwargs.get("logfile"),
+                                    kwargs["env_server"])
+            tracer = get_tracer()
+            if tracer is not None:
+                tracer.flush()
+        return {"status": "ok", "result": result}
+
+    def service_actions(self):
+        """Maintain the ssh connection pools between requests."""
+        from .remote import maintain_ssh_pools
+
+        if time.time() - self.last_maintained < MAINTENANCE_INTERVAL:
+            return
+        self.last_maintained = time.time()
+        try:
+            maintain_ssh_pools()
+        except Exception:
+            logging.exception("Maintenance of the ssh connections failed")
+
+    def serve_forever(self):
+        """Listen to the socket until shutdown."""
+        import socketserver
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            """Handle one request per connection."""
+
+            def handle(self):
+                """Read request and write response."""
+                try:
+                    request = json.loads(self.rfile.read().decode("utf-8"))
+                except ValueError as error:
+                    response = {"status": "error", "message": repr(error)}
+                else:
+                    response = daemon.handle(request)
+                self.wfile.write(json.dumps(response).encode("utf-8"))
+
+        class Server(socketserver.ThreadingUnixStreamServer):
+            """Threaded server with periodic maintenance."""
+
+            def service_actions(self):
+                """Run the maintenance of the daemon."""
+                daemon.service_actions()
+
+        # Only the owner may connect, since requests run commands as the owner
+        umask = os.umask(0o177)
+        try:
+            self.server = Server(self.socket_path, RequestHandler)
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, 0o600)
+        self.server.daemon_threads = True
+        logging.info("Submission daemon listening on %s", self.socket_path)
+        try:
+            self.server.serve_forever()
+        finally:
+            self.batcher.flush_all()
+            flush_log_writers()
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        """Stop the daemon."""
+        if self.server is not None:
+            self.server.shutdown()
@@ -0,0 +1,305 @@
+"""SQLite store of submitted tasks."""
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+# File systems shared between hosts. Write-ahead logging needs memory shared on one host.
+NETWORK_FILE_SYSTEMS = ["nfs", "nfs4", "cifs", "smb3", "smbfs", "lustre", "gpfs", "beegfs",
+                        "ceph", "glusterfs", "panfs", "afs", "fuse.sshfs"]
+DATABASES = {}
+DATABASES_LOCK = threading.Lock()
+COLUMNS = ["ecf_name", "tryno", "suite", "submit_type", "host", "job_id", "state",
+           "submit_time", "start_time", "end_time", "exit_status", "timings"]
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS submissions (
+        ecf_name TEXT NOT NULL,
+        tryno INTEGER NOT NULL,
+        suite TEXT NOT NULL,
+        submit_type TEXT,
+        host TEXT,
+        job_id TEXT,
+        state TEXT,
+        submit_time REAL,
+        start_time REAL,
+        end_time REAL,
+        exit_status INTEGER,
+        timings TEXT,
+        PRIMARY KEY (ecf_name, tryno)
+    )""",
+    "CREATE INDEX IF NOT EXISTS submissions_job_id ON submissions (job_id)",
+    "CREATE INDEX IF NOT EXISTS submissions_suite ON submissions (suite, ecf_name)"
+]
+
+
+def get_file_system(path, mounts="/proc/mounts"):
+    """Get the type of the file system of a file.
+
+    Args:
+        path (str): File.
+        mounts (str, optional): Mount table. Defaults to "/proc/mounts".
+
+    Returns:
+        str: File system type. None if not known.
+
+    """
+    directory = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+    mount_point = ""
+    file_system = None
+    try:
+        with open(mounts, mode="r", encoding="utf-8") as file_handler:
+            for line in file_handler:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                point = fields[1].replace("\\040", " ")
+                if directory == point or directory.startswith(point.rstrip("/") + "/"):
+                    if len(point) >= len(mount_point):
+                        mount_point = point
+                        file_system = fields[2]
+    except OSError:
+        return None
+    return file_system
+
+
+def is_shared(path, mounts="/proc/mounts"):
+    """Check if a file is on a file system shared between hosts.
+
+    Args:
+        path (str): File.
+        mounts (str, optional): Mount table. Defaults to "/proc/mounts".
+
+    Returns:
+        bool: True if the file is on a network file system.
+
+    """
+    return get_file_system(path, mounts=mounts) in NETWORK_FILE_SYSTEMS
+
+
+class SubmissionDatabase(object):
+    """Submission database with one row per task and try number.
+
+    A database on a local disk uses write-ahead logging, so readers do not block the
+    submitting processes. Write-ahead logging does not work on network file systems, where
+    the rollback journal is used. Each thread uses its own connection.
+    """
+
+    def __init__(self, db_file, timeout=30, shared=None):
+        """Construct the database.
+
+        An existing file in the old text format is moved to db_file.old.
+
+        Args:
+            db_file (str): Database file.
+            timeout (float, optional): Seconds to wait for a lock. Defaults to 30.
+            shared (bool, optional): The file is on a network file system. Defaults to None,
+                                     which checks the mount table.
+
+        """
+        self.db_file = db_file
+        self.timeout = timeout
+        if shared is None:
+            shared = is_shared(db_file)
+        self.shared = shared
+        self.local = threading.local()
+        if os.path.exists(db_file) and os.path.getsize(db_file) > 0:
+            with open(db_file, mode="rb") as file_handler:
+                header = file_handler.read(len(SQLITE_HEADER))
+            if header != SQLITE_HEADER:
+                logging.warning("Move old submission database %s to %s.old", db_file, db_file)
+                os.replace(db_file, db_file + ".old")
+        connection = self.connection()
+        with connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def connection(self):
+        """Get the connection of this thread.
+
+        Returns:
+            sqlite3.Connection: Connection.
+
+        """
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file, timeout=self.timeout)
+            connection.row_factory = sqlite3.Row
+            if self.shared:
+                connection.execute("PRAGMA journal_mode=DELETE")
+            else:
+                connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    @staticmethod
+    def get_suite(ecf_name):
+        """Get the suite of a task.
+
+        Args:
+            ecf_name (str): Task path.
+
+        Returns:
+            str: Suite name.
+
+        """
+        return ecf_name.strip("/").split("/")[0]
+
+    def record_submission(self, ecf_name, tryno, job_id, submit_type=None, host=None,
+                          state="submitted", timings=None):
+        """Insert or replace the row of a submission.
+
+        Args:
+            ecf_name (str): Task path.
+            tryno (int): Try number.
+            job_id (str): Job identifier.
+            submit_type (str, optional): Submit type. Defaults to None.
+            host (str, optional): Host. Defaults to None.
+            state (str, optional): State. Defaults to "submitted".
+            timings (dict, optional): Seconds spent in each submission stage.
+                                      Defaults to None.
+
+        """
+        if timings is not None:
+            timings = json.dumps(timings)
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO submissions (ecf_name, tryno, suite, submit_type, host, "
+                "job_id, state, submit_time, timings) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ecf_name, int(tryno), self.get_suite(ecf_name), submit_type, host,
+                 None if job_id is None else str(job_id), state, time.time(), timings))
+
+    def update_state(self, ecf_name, tryno, state, exit_status=None, started=False,
+                     ended=False):
+        """Update the state of a submission.
+
+        Args:
+            ecf_name (str): Task path.
+            tryno (int): Try number.
+            state (str): State.
+            exit_status (int, optional): Exit status. Defaults to None.
+            started (bool, optional): Set the start time. Defaults to False.
+            ended (bool, optional): Set the end time. Defaults to False.
+
+        """
+        now = time.time()
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                "UPDATE submissions SET state = ?, exit_status = COALESCE(?, exit_status), "
+                "start_time = CASE WHEN ? THEN ? ELSE start_time END, "
+                "end_time = CASE WHEN ? THEN ? ELSE end_time END "
+                "WHERE ecf_name = ? AND tryno = ?",
+                (state, exit_status, started, now, ended, now, ecf_name, int(tryno)))
+
+    def delete(self, ecf_name, tryno):
+        """Delete the row of a submission.
+
+        Args:
+            ecf_name (str): Task path.
+            tryno (int): Try number.
+
+        """
+        connection = self.connection()
+        with connection:
+            connection.execute("DELETE FROM submissions WHERE ecf_name = ? AND tryno = ?",
+                               (ecf_name, int(tryno)))
+
+    @staticmethod
+    def as_dict(row):
+        """Convert a row to a dict.
+
+        Args:
+            row (sqlite3.Row): Row.
+
+        Returns:
+            dict: Submission.
+
+        """
+        submission = {column: row[column] for column in COLUMNS}
+        if submission["timings"] is not None:
+            submission.update({"timings": json.loads(submission["timings"])})
+        return submission
+
+    def get(self, ecf_name, tryno):
+        """Get a submission.
+
+        Args:
+            ecf_name (str): Task path.
+            tryno (int): Try number.
+
+        Returns:
+            dict: Submission. None if not found.
+
+        """
+        row = self.connection().execute(
+            "SELECT * FROM submissions WHERE ecf_name = ? AND tryno = ?",
+            (ecf_name, int(tryno))).fetchone()
+        if row is None:
+            return None
+        return self.as_dict(row)
+
+    def find_job(self, job_id):
+        """Get the submissions of a job id.
+
+        Args:
+            job_id (str): Job identifier.
+
+        Returns:
+            list: Submissions.
+
+        """
+        rows = self.connection().execute("SELECT * FROM submissions WHERE job_id = ?",
+                                         (str(job_id),)).fetchall()
+        return [self.as_dict(row) for row in rows]
+
+    def find_below(self, node_path, states=None):
+        """Get the latest submission of the tasks below a node.
+
+        Args:
+            node_path (str): Absolute node path, e.g. /suite/family.
+            states (list, optional): Only submissions in these states. Defaults to None.
+
+        Returns:
+            list: Submissions.
+
+        """
+        node_path = "/" + node_path.strip("/")
+        query = "SELECT * FROM submissions WHERE suite = ? AND (ecf_name = ? OR " \
+                "(ecf_name >= ? AND ecf_name < ?))"
+        args = [self.get_suite(node_path), node_path, node_path + "/", node_path + "0"]
+        if states is not None:
+            query = query + " AND state IN (" + ", ".join(["?"] * len(states)) + ")"
+            args = args + list(states)
+        query = query + " ORDER BY ecf_name, tryno"
+        latest = {}
+        for row in self.connection().execute(query, args).fetchall():
+            latest.update({row["ecf_name"]: self.as_dict(row)})
+        return list(latest.values())
+
+    def clear(self):
+        """Delete all submissions."""
+        connection = self.connection()
+        with connection:
+            connection.execute("DELETE FROM submissions")
+
+
+def get_database(db_file):
+    """Get the database of a file for this process.
+
+    Args:
+        db_file (str): Database file.
+
+    Returns:
+        SubmissionDatabase: The database.
+
+    """
+    with DATABASES_LOCK:
+        if db_file not in DATABASES:
+            DATABASES.update({db_file: SubmissionDatabase(db_file)})
+        return DATABASES[db_file]
@@ -0,0 +1,211 @@
+"""Stream a suite definition to a def file while it is built.
+
+DefWriter replaces ecflow.Defs in EcflowSuite when a stream file is given. The nodes
+offer the ecflow methods used by EcflowNode and are written as soon as the next node
+outside their subtree is added, so the suite must be built depth first. Attributes of a
+node can be added until its first child is added.
+"""
+import shutil
+import logging
+
+
+class StreamNode(object):
+    """Suite, family or task written by a DefWriter."""
+
+    streaming = True
+    string_defstatus = True
+
+    def __init__(self, writer, keyword, name, parent=None):
+        """Construct the node.
+
+        Args:
+            writer (DefWriter): Writer.
+            keyword (str): "suite", "family" or "task".
+            name (str): Name.
+            parent (StreamNode, optional): Parent node. Defaults to None.
+
+        """
+        self.writer = writer
+        self.keyword = keyword
+        self.node_name = name
+        self.parent = parent
+        if parent is None:
+            self.path = "/" + name
+            self.indent = ""
+        else:
+            self.path = parent.path + "/" + name
+            self.indent = parent.indent + "  "
+        self.attributes = []
+        self.trigger = None
+        self.written = False
+
+    def name(self):
+        """Get the name."""
+        return self.node_name
+
+    def get_abs_node_path(self):
+        """Get the absolute node path."""
+        return self.path
+
+    def add_attribute(self, line):
+        """Add an attribute line.
+
+        Args:
+            line (str): Def-file line without indentation.
+
+        Raises:
+            Exception: The node is already written.
+
+        """
+        if self.written:
+            raise Exception(f"Node {self.path} is already written")
+        self.attributes.append(line)
+
+    def add_variable(self, name, value):
+        """Add a variable.
+
+        Args:
+            name (str): Variable name.
+            value (any): Value. Quoted with ' or " in the def file.
+
+        Raises:
+            Exception: The value contains both quote characters.
+
+        """
+        value = str(value)
+        if value.find("'") < 0:
+            self.add_attribute(f"edit {name} '{value}'")
+        elif value.find("\"") < 0:
+            self.add_attribute(f"edit {name} \"{value}\"")
+        else:
+            raise Exception(f"Value of {name} in {self.path} can not be quoted in a def file: "
+                            f"{value}")
+
+    def add_trigger(self, trigger):
+        """Add the trigger."""
+        if self.trigger is not None:
+            raise Exception(f"Node {self.path} already has a trigger")
+        self.add_attribute(f"trigger {trigger}")
+        self.trigger = trigger
+
+    def delete_trigger(self):
+        """Delete the trigger and the part triggers."""
+        if self.written:
+            raise Exception(f"Node {self.path} is already written")
+        self.attributes = [line for line in self.attributes if not line.startswith("trigger ")]
+        self.trigger = None
+
+    def add_part_trigger(self, trigger, mode=True):
+        """Add a part trigger combined with AND (mode True) or OR."""
+        self.add_attribute(f"trigger {'-a' if mode else '-o'} {trigger}")
+
+    def add_defstatus(self, defstatus):
+        """Add the default status."""
+        self.add_attribute(f"defstatus {defstatus}")
+
+    def add_limit(self, name, limit):
+        """Add a limit."""
+        self.add_attribute(f"limit {name} {limit}")
+
+    def add_inlimit(self, name, path="", tokens=1):
+        """Add an inlimit on the limit name of the node path (default the nearest one)."""
+        if path != "":
+            name = path + ":" + name
+        self.add_attribute(f"inlimit {name} {tokens}")
+
+    def add_family(self, name):
+        """Add a family."""
+        return self.writer.open(StreamNode(self.writer, "family", name, self))
+
+    def add_task(self, name):
+        """Add a task."""
+        return self.writer.open(StreamNode(self.writer, "task", name, self))
+
+
+class DefWriter(object):
+    """Write nodes to a def file as the suite is built."""
+
+    def __init__(self, def_file):
+        """Open the def file.
+
+        Args:
+            def_file (str): Definition file.
+
+        """
+        self.def_file = def_file
+        self.file_handler = open(def_file, mode="w", encoding="utf-8", buffering=1 << 20)
+        self.stack = []
+        # Task scripts of the streamed suite. Streamed nodes do not keep their parents.
+        self.ecf_scripts = None
+
+    def add_suite(self, name):
+        """Add the suite."""
+        return self.open(StreamNode(self, "suite", name))
+
+    def write_header(self, node):
+        """Write the node line and its attributes.
+
+        Args:
+            node (StreamNode): Node.
+
+        """
+        if node.written:
+            return
+        lines = [f"{node.indent}{node.keyword} {node.node_name}\n"]
+        lines.extend(f"{node.indent}  {line}\n" for line in node.attributes)
+        self.file_handler.write("".join(lines))
+        node.attributes = None
+        node.written = True
+
+    def close_node(self):
+        """Write and close the innermost open node."""
+        node = self.stack.pop()
+        self.write_header(node)
+        if node.keyword != "task":
+            self.file_handler.write(f"{node.indent}end{node.keyword}\n")
+
+    def open(self, node):
+        """Start a node. Nodes outside the subtree of its parent are closed.
+
+        Args:
+            node (StreamNode): New node.
+
+        Raises:
+            Exception: The parent is already closed.
+
+        Returns:
+            StreamNode: The node.
+
+        """
+        if self.file_handler is None:
+            raise Exception(f"Definition {self.def_file} is already closed")
+        if node.parent is not None:
+            if node.parent not in self.stack:
+                raise Exception(f"Node {node.parent.path} is already written. Streamed suites "
+                                "must be built depth first")
+            while self.stack[-1] is not node.parent:
+                self.close_node()
+            self.write_header(node.parent)
+        self.stack.append(node)
+        return node
+
+    def close(self):
+        """Write the open nodes and close the file."""
+        if self.file_handler is None:
+            return
+        while len(self.stack) > 0:
+            self.close_node()
+        self.file_handler.close()
+        self.file_handler = None
+        logging.info("def file streamed to %s", self.def_file)
+
+    def save_as_defs(self, def_file):
+        """Close the definition and copy it if another file is requested.
+
+        Args:
+            def_file (str): Definition file.
+
+        """
+        self.close()
+        if def_file != self.def_file:
+            shutil.copyfile(self.def_file, def_file)
@@ -16,8 +16,11 @@ ecf_pass = "%ECF_PASS%"
 ecf_tryno = "%ECF_TRYNO%"
 ecf_rid = "%ECF_RID%"
 submission_id = "%SUBMISSION_ID%"
+db_file = "%DBFILE:%"
+if db_file == "":
+    db_file = None
 task = scheduler.EcflowTask(ecf_name, ecf_tryno, ecf_pass, ecf_rid, submission_id)
 
 # This will also handle call to sys.exit(), i.e. Client.__exit__ will still be called.
-with scheduler.EcflowClient(server, task) as ci:
+with scheduler.EcflowClient(server, task, db_file=db_file) as ci:
     scheduler.init_run(exp, stream=stream)
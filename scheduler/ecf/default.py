@@ -25,6 +25,9 @@ ecf_pass = "%ECF_PASS%"
 ecf_tryno = "%ECF_TRYNO%"
 ecf_rid = "%ECF_RID%"
 submission_id = "%SUBMISSION_ID%"
+db_file = "%DBFILE:%"
+if db_file == "":
+    db_file = None
 task_name = "%TASK%"
 args = "%ARGS%"
 if args == "":
@@ -39,7 +42,7 @@ print("%LIB%/pysurfex/scheduler/bin/ECF_kill %EXP% %LIB% %ECF_NAME% %ECF_TRYNO%
       "-ecf_rid %ECF_RID% -submission_id %SUBMISSION_ID%")
 
 # This will also handle call to sys.exit(), i.e. Client.__exit__ will still be called.
-with scheduler.EcflowClient(server, task) as ci:
+with scheduler.EcflowClient(server, task, db_file=db_file) as ci:
     print("Running task " + task_name)
     task_class = getattr(scheduler.tasks, task_name)
 
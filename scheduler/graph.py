@@ -0,0 +1,392 @@
+"""Analysis of the trigger dependencies of a suite.
+
+Every node has a start and a complete event. The graph has an edge from an event to every
+event it waits for:
+
+* a node starts after the nodes in its trigger have completed and after its family started,
+* a node completes after it started,
+* a family completes after all its children completed.
+
+Only "complete" clauses combined with AND at the top level of a trigger are required
+dependencies. Other clauses and part triggers are used for the cycle detection only.
+"""
+import logging
+from .suites import EcflowSuiteTriggers, NodeState, And, combine_triggers
+
+
+class TriggerGraph(object):
+    """Dependency graph of the nodes and triggers of a suite."""
+
+    def __init__(self, suite):
+        """Construct the graph.
+
+        Args:
+            suite (scheduler.SuiteDefinition or scheduler.EcflowNode): Suite or node to analyse.
+
+        """
+        if hasattr(suite, "suite"):
+            suite = suite.suite
+        self.nodes = []
+        self.numbers = {}
+        stack = [suite]
+        while len(stack) > 0:
+            node = stack.pop()
+            self.numbers.update({node.path: len(self.nodes)})
+            self.nodes.append(node)
+            stack.extend(reversed(node.children))
+
+        self.unknown = set()
+        self.required = []
+        self.references = []
+        for node in self.nodes:
+            required = []
+            references = []
+            if node.triggers is not None and node.triggers.expression is not None:
+                required = self.required_clauses(node.triggers.expression)
+                references = self.clauses(node.triggers.expression)
+            for triggers in node.part_triggers:
+                references = references + self.clauses(triggers.expression)
+            self.required.append(self.trigger_nodes(required))
+            self.references.append(self.trigger_nodes(references))
+
+    def trigger_nodes(self, clauses):
+        """Get the node numbers of trigger clauses.
+
+        Paths outside the graph are added to unknown.
+
+        Args:
+            clauses (list): NodeState clauses.
+
+        Returns:
+            list: Node numbers without duplicates.
+
+        """
+        numbers = []
+        for clause in clauses:
+            number = self.numbers.get(clause.path)
+            if number is None:
+                self.unknown.add(clause.path)
+            elif number not in numbers:
+                numbers.append(number)
+        return numbers
+
+    @staticmethod
+    def clauses(expression):
+        """Get all node clauses of an expression.
+
+        Args:
+            expression (scheduler.TriggerExpression): Expression.
+
+        Returns:
+            list: NodeState clauses.
+
+        """
+        clauses = []
+        stack = [expression]
+        while len(stack) > 0:
+            expression = stack.pop()
+            if isinstance(expression, NodeState):
+                clauses.append(expression)
+            else:
+                stack.extend(reversed(expression.operands))
+        return clauses
+
+    @staticmethod
+    def required_clauses(expression):
+        """Get the "complete" clauses that must all be true.
+
+        Args:
+            expression (scheduler.TriggerExpression): Expression.
+
+        Returns:
+            list: NodeState clauses.
+
+        """
+        operands = [expression]
+        if isinstance(expression, And):
+            operands = expression.operands
+        return [operand for operand in operands
+                if isinstance(operand, NodeState) and operand.state == "complete"]
+
+    @staticmethod
+    def start(number):
+        """Get the start event of a node."""
+        return 2 * number
+
+    @staticmethod
+    def complete(number):
+        """Get the complete event of a node."""
+        return 2 * number + 1
+
+    def event_name(self, event):
+        """Get a readable name of an event.
+
+        Args:
+            event (int): Event.
+
+        Returns:
+            str: Node path and event.
+
+        """
+        return self.nodes[event // 2].path + (" complete" if event % 2 else " start")
+
+    def edges(self, triggers):
+        """Get the events each event waits for.
+
+        Args:
+            triggers (list): Trigger node numbers per node, required or references.
+
+        Returns:
+            list: Events waited for per event.
+
+        """
+        edges = []
+        for number, node in enumerate(self.nodes):
+            start = [self.complete(target) for target in triggers[number]]
+            if node.parent is not None and node.parent.path in self.numbers:
+                start.append(self.start(self.numbers[node.parent.path]))
+            complete = [self.start(number)]
+            complete.extend(self.complete(self.numbers[child.path]) for child in node.children)
+            edges.append(start)
+            edges.append(complete)
+        return edges
+
+    def find_cycles(self):
+        """Find trigger cycles.
+
+        Returns:
+            list: Cycles as lists of events, e.g. "/suite/task start".
+
+        """
+        edges = self.edges(self.references)
+        index = {}
+        lowlink = {}
+        on_stack = set()
+        stack = []
+        cycles = []
+        for root in range(len(edges)):
+            if root in index:
+                continue
+            index.update({root: len(index)})
+            lowlink.update({root: index[root]})
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(edges[root]))]
+            while len(work) > 0:
+                event, successors = work[-1]
+                descended = False
+                for successor in successors:
+                    if successor not in index:
+                        index.update({successor: len(index)})
+                        lowlink.update({successor: index[successor]})
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(edges[successor])))
+                        descended = True
+                        break
+                    if successor in on_stack:
+                        lowlink.update({event: min(lowlink[event], index[successor])})
+                if descended:
+                    continue
+                work.pop()
+                if len(work) > 0:
+                    parent = work[-1][0]
+                    lowlink.update({parent: min(lowlink[parent], lowlink[event])})
+                if lowlink[event] == index[event]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == event:
+                            break
+                    if len(component) > 1 or event in edges[event]:
+                        cycles.append([self.event_name(member) for member in reversed(component)])
+        return cycles
+
+    def check(self):
+        """Raise an exception if the triggers contain a cycle.
+
+        Raises:
+            Exception: A cycle was found.
+
+        """
+        cycles = self.find_cycles()
+        if len(cycles) > 0:
+            raise Exception("Trigger cycle between " + ", ".join(cycles[0]))
+
+    def topological_order(self, edges):
+        """Order the events so that every event comes after the events it waits for.
+
+        Args:
+            edges (list): Events waited for per event.
+
+        Raises:
+            Exception: The dependencies contain a cycle.
+
+        Returns:
+            list: Events.
+
+        """
+        waiting = [len(successors) for successors in edges]
+        predecessors = [[] for successors in edges]
+        for event, successors in enumerate(edges):
+            for successor in successors:
+                predecessors[successor].append(event)
+        ready = [event for event in range(len(edges)) if waiting[event] == 0]
+        order = []
+        while len(ready) > 0:
+            event = ready.pop()
+            order.append(event)
+            for predecessor in predecessors[event]:
+                waiting[predecessor] = waiting[predecessor] - 1
+                if waiting[predecessor] == 0:
+                    ready.append(predecessor)
+        if len(order) != len(edges):
+            self.check()
+            raise Exception("Trigger cycle")
+        return order
+
+    def redundant_triggers(self):
+        """Find trigger clauses implied by other dependencies.
+
+        A clause of node C on node A is redundant if C also waits for a node B which
+        waits for A, directly, through other nodes or through the families of C.
+
+        Only the complete events of trigger targets get a bit in the reachability sets, and
+        the set of an event is released when all events waiting for it are done, so memory
+        grows with the targets and the open part of the graph instead of the square of the
+        number of nodes.
+
+        Returns:
+            list: Tuples of node path and redundant trigger path.
+
+        """
+        edges = self.edges(self.required)
+        bits = {}
+        for required in self.required:
+            for target in required:
+                bits.setdefault(self.complete(target), len(bits))
+        waiting = [0] * len(edges)
+        for successors in edges:
+            for successor in successors:
+                waiting[successor] = waiting[successor] + 1
+
+        reach = {}
+        redundant = []
+        for event in self.topological_order(edges):
+            reachable = 0
+            for successor in edges[event]:
+                reachable = reachable | reach[successor]
+            if event % 2 == 0:
+                number = event // 2
+                for target in self.required[number]:
+                    if reachable >> bits[self.complete(target)] & 1:
+                        redundant.append((self.nodes[number].path, self.nodes[target].path))
+            for successor in edges[event]:
+                if successor in bits:
+                    reachable = reachable | 1 << bits[successor]
+                waiting[successor] = waiting[successor] - 1
+                if waiting[successor] == 0:
+                    del reach[successor]
+            if waiting[event] > 0:
+                reach[event] = reachable
+        return redundant
+
+    def remove_redundant_triggers(self):
+        """Remove redundant trigger clauses from the nodes.
+
+        Nodes with part triggers are not changed.
+
+        Returns:
+            list: Tuples of node path and removed trigger path.
+
+        """
+        redundant = {}
+        for path, target in self.redundant_triggers():
+            redundant.setdefault(path, set()).add(target)
+        removed = []
+        for path, targets in redundant.items():
+            number = self.numbers[path]
+            node = self.nodes[number]
+            if len(node.part_triggers) > 0:
+                continue
+            expression = node.triggers.expression
+            operands = [expression]
+            if isinstance(expression, And):
+                operands = expression.operands
+            kept = [operand for operand in operands
+                    if not (isinstance(operand, NodeState) and operand.state == "complete" and
+                            operand.path in targets)]
+            triggers = None
+            if len(kept) > 0:
+                triggers = EcflowSuiteTriggers(combine_triggers(kept))
+            node.set_triggers(triggers)
+            if triggers is None:
+                self.required[number] = []
+                self.references[number] = []
+            else:
+                self.required[number] = self.trigger_nodes(
+                    self.required_clauses(triggers.expression))
+                self.references[number] = self.trigger_nodes(self.clauses(triggers.expression))
+            for target in sorted(targets):
+                logging.debug("Removed redundant trigger of %s on %s", path, target)
+                removed.append((path, target))
+        return removed
+
+    def critical_path(self, durations=None, default_duration=1.0):
+        """Find the chain of tasks that determines the run time of the suite.
+
+        Args:
+            durations (dict, optional): Duration of the tasks in seconds by path.
+                                        Defaults to None.
+            default_duration (float, optional): Duration of tasks without a known duration.
+                                                Defaults to 1.0.
+
+        Returns:
+            tuple: Length of the critical path in seconds and the task paths in run order.
+
+        """
+        if durations is None:
+            durations = {}
+        edges = self.edges(self.required)
+        time = [0.0] * len(edges)
+        previous = [None] * len(edges)
+        for event in self.topological_order(edges):
+            for successor in edges[event]:
+                if previous[event] is None or time[successor] > time[event]:
+                    time[event] = time[successor]
+                    previous[event] = successor
+            node = self.nodes[event // 2]
+            if event % 2 == 1 and node.node_type == "task":
+                time[event] = time[event] + durations.get(node.path, default_duration)
+        if len(edges) == 0:
+            return 0.0, []
+        event = max(range(len(edges)), key=lambda key: time[key])
+        length = time[event]
+        chain = []
+        while event is not None:
+            node = self.nodes[event // 2]
+            if event % 2 == 1 and node.node_type == "task":
+                chain.append(node.path)
+            event = previous[event]
+        return length, list(reversed(chain))
+
+
+def historical_durations(database, node_path):
+    """Get the run time of the tasks below a node from the submission database.
+
+    Args:
+        database (scheduler.SubmissionDatabase): Submission database.
+        node_path (str): Node path, e.g. the suite.
+
+    Returns:
+        dict: Duration in seconds by task path of the latest completed run.
+
+    """
+    durations = {}
+    for submission in database.find_below(node_path, states=["complete"]):
+        if submission["start_time"] is not None and submission["end_time"] is not None:
+            durations.update({submission["ecf_name"]:
+                              submission["end_time"] - submission["start_time"]})
+    return durations
@@ -0,0 +1,185 @@
+"""Buffered writer for the server log.
+
+Each process keeps one open handle per log file. Records are buffered and written in one
+append when the buffer is full, when the oldest record is older than the flush interval,
+and at exit. A rotated log is written and rotated under a lock file shared by the
+processes, and a handle to a log rotated by another process is reopened.
+"""
+import os
+import fcntl
+import atexit
+import threading
+from datetime import datetime
+
+
+MAX_BYTES_ENV = "ECF_LOG_MAX_BYTES"
+FLUSH_INTERVAL_ENV = "ECF_LOG_FLUSH_INTERVAL"
+LOG_WRITERS = {}
+LOG_WRITERS_LOCK = threading.Lock()
+
+
+class BufferedLogWriter(object):
+    """Buffered log writer with optional size rotation."""
+
+    def __init__(self, logfile, buffer_size=65536, flush_interval=2.0, max_bytes=None,
+                 backup_count=1):
+        """Construct the writer.
+
+        Args:
+            logfile (str): Log file.
+            buffer_size (int, optional): Flush when the buffer exceeds this number of bytes.
+                                         Defaults to 65536.
+            flush_interval (float, optional): Flush when the oldest buffered record is older
+                                              than this number of seconds. Defaults to 2.0.
+            max_bytes (int, optional): Rotate the log when it exceeds this size.
+                                       Defaults to None (no rotation).
+            backup_count (int, optional): Number of rotated logs to keep. Defaults to 1.
+
+        """
+        self.logfile = logfile
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.records = []
+        self.size = 0
+        self.handle = None
+        self.timer = None
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def format_record(text):
+        """Format a log record.
+
+        Args:
+            text (str): Text to log.
+
+        Returns:
+            str: Time stamped line.
+
+        """
+        utcnow = datetime.utcnow().strftime("[%H:%M:%S %d.%m.%Y]")
+        return utcnow + " " + str(text) + "\n"
+
+    def write(self, text):
+        """Buffer a record.
+
+        Args:
+            text (str): Text to log.
+
+        """
+        record = self.format_record(text)
+        with self.lock:
+            self.records.append(record)
+            self.size = self.size + len(record)
+            if self.size >= self.buffer_size or self.flush_interval <= 0:
+                self.flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.flush_interval, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Write the buffered records in one append."""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if len(self.records) == 0:
+                return
+            if self.max_bytes is None:
+                self.append()
+                return
+            with open(self.logfile + ".lock", mode="w", encoding="utf-8") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if self.handle is not None and self.rotated():
+                    self.close_handle()
+                self.append()
+                if os.fstat(self.handle.fileno()).st_size >= self.max_bytes:
+                    self.rotate()
+
+    def append(self):
+        """Append the buffered records to the log."""
+        with self.lock:
+            if self.handle is None:
+                self.handle = open(self.logfile, mode="a", encoding="utf-8")
+            self.handle.write("".join(self.records))
+            self.handle.flush()
+            self.records = []
+            self.size = 0
+
+    def rotated(self):
+        """Check if the open log was rotated by another process.
+
+        Returns:
+            bool: True if the handle is not the log file any more.
+
+        """
+        try:
+            return os.stat(self.logfile).st_ino != os.fstat(self.handle.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def rotate(self):
+        """Move the log to logfile.1 and older logs one number up.
+
+        Must be called with the lock file held.
+        """
+        with self.lock:
+            self.close_handle()
+            for number in range(self.backup_count - 1, 0, -1):
+                backup = f"{self.logfile}.{number}"
+                if os.path.exists(backup):
+                    os.replace(backup, f"{self.logfile}.{number + 1}")
+            if self.backup_count > 0:
+                os.replace(self.logfile, f"{self.logfile}.1")
+            else:
+                os.unlink(self.logfile)
+
+    def close_handle(self):
+        """Close the file handle."""
+        with self.lock:
+            if self.handle is not None:
+                self.handle.close()
+                self.handle = None
+
+    def close(self):
+        """Flush and close the writer."""
+        with self.lock:
+            self.flush()
+            self.close_handle()
+
+
+def get_log_writer(logfile):
+    """Get the writer of a log file for this process.
+
+    The writer rotates the log if ECF_LOG_MAX_BYTES is set and flushes after
+    ECF_LOG_FLUSH_INTERVAL seconds (default 2).
+
+    Args:
+        logfile (str): Log file.
+
+    Returns:
+        BufferedLogWriter: The writer.
+
+    """
+    with LOG_WRITERS_LOCK:
+        if logfile not in LOG_WRITERS:
+            max_bytes = os.environ.get(MAX_BYTES_ENV)
+            if max_bytes is not None:
+                max_bytes = int(max_bytes)
+            flush_interval = float(os.environ.get(FLUSH_INTERVAL_ENV, "2"))
+            LOG_WRITERS.update({logfile: BufferedLogWriter(logfile, max_bytes=max_bytes,
+                                                           flush_interval=flush_interval)})
+        return LOG_WRITERS[logfile]
+
+
+def flush_log_writers():
+    """Flush all writers of this process."""
+    with LOG_WRITERS_LOCK:
+        writers = list(LOG_WRITERS.values())
+    for writer in writers:
+        writer.flush()
+
+
+atexit.register(flush_log_writers)
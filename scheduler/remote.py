@@ -0,0 +1,220 @@
+"""Persistent remote connections for submit, status and kill commands."""
+import os
+import shlex
+import time
+import subprocess
+import threading
+import logging
+
+
+CONTROL_DIR_ENV = "ECF_SSH_CONTROL_DIR"
+TRANSPORT_ENV = "ECF_SSH_TRANSPORT"
+POOLS = {}
+POOLS_LOCK = threading.Lock()
+
+
+class SSHConnectionPool(object):
+    """Multiplexed ssh connections per remote host.
+
+    The first command to a host starts an ssh ControlMaster. Later commands reuse the master
+    socket and skip the TCP and ssh handshakes. Masters exit by themselves after being idle
+    for persist seconds. The pool runs maintain at most once every persist seconds when a
+    command is built, and the submission daemon runs it periodically.
+
+    With the local transport, remote commands run on the local host. This is used for testing.
+    """
+
+    def __init__(self, control_dir=None, persist=600, transport="ssh"):
+        """Construct the pool.
+
+        Args:
+            control_dir (str, optional): Directory for master sockets. Defaults to None.
+            persist (int, optional): Idle seconds before a master exits. Defaults to 600.
+            transport (str, optional): ssh or local. Defaults to "ssh".
+
+        Raises:
+            NotImplementedError: If the transport is not known.
+
+        """
+        if transport not in ["ssh", "local"]:
+            raise NotImplementedError("Unknown transport " + transport)
+        if control_dir is None:
+            control_dir = os.environ.get(CONTROL_DIR_ENV)
+        if control_dir is None:
+            control_dir = os.path.join(os.path.expanduser("~"), ".ssh", "ecf_control")
+        self.control_dir = control_dir
+        self.persist = int(persist)
+        self.transport = transport
+        self.last_used = {}
+        self.last_maintained = time.time()
+        self.lock = threading.Lock()
+
+    def options(self):
+        """Get the ssh multiplexing options.
+
+        Returns:
+            str: Options.
+
+        """
+        control_path = os.path.join(self.control_dir, "%C")
+        return f"-o ControlMaster=auto -o ControlPath={control_path} " \
+               f"-o ControlPersist={self.persist}"
+
+    def command(self, remote_cmd):
+        """Get the remote command using a pooled connection.
+
+        Args:
+            remote_cmd (str): Remote command from the settings, e.g. ssh user@host.
+
+        Returns:
+            str: Remote command.
+
+        """
+        if remote_cmd is None:
+            return None
+        if self.transport == "local":
+            return "sh -c"
+        remote_cmd = remote_cmd.strip()
+        words = shlex.split(remote_cmd)
+        if len(words) == 0 or os.path.basename(words[0]) != "ssh" or \
+                not remote_cmd.startswith(words[0]):
+            return remote_cmd
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+        now = time.time()
+        with self.lock:
+            self.last_used.update({remote_cmd: now})
+            maintain = now - self.last_maintained > self.persist
+        if maintain:
+            self.maintain()
+        program = words[0]
+        return f"{program} {self.options()}{remote_cmd[len(program):]}"
+
+    def control_cmd(self, remote_cmd, operation):
+        """Get an ssh control command for the master of a host.
+
+        Args:
+            remote_cmd (str): Remote command from the settings.
+            operation (str): ssh control operation, e.g. check or stop.
+
+        Returns:
+            str: Control command.
+
+        """
+        # Not built with command, which would mark the connection as used
+        remote_cmd = remote_cmd.strip()
+        program = shlex.split(remote_cmd)[0]
+        return f"{program} -O {operation} {self.options()}{remote_cmd[len(program):]}"
+
+    def check(self, remote_cmd):
+        """Check if the master connection to a host is alive.
+
+        Args:
+            remote_cmd (str): Remote command from the settings.
+
+        Returns:
+            bool: True if the master connection is alive.
+
+        """
+        if self.transport == "local":
+            return True
+        process = subprocess.run(self.control_cmd(remote_cmd, "check"), shell=True,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                 check=False)
+        return process.returncode == 0
+
+    def close(self, remote_cmd):
+        """Close the master connection to a host.
+
+        The master is shared with other processes using the same control directory, so it
+        is only stopped from accepting new sessions. Running sessions are not interrupted.
+
+        Args:
+            remote_cmd (str): Remote command from the settings.
+
+        """
+        cmd = None
+        if self.transport != "local":
+            cmd = self.control_cmd(remote_cmd, "stop")
+        with self.lock:
+            self.last_used.pop(remote_cmd.strip(), None)
+        if cmd is not None:
+            subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           check=False)
+
+    def evict_idle(self, max_idle=None):
+        """Close connections not used for max_idle seconds.
+
+        Args:
+            max_idle (int, optional): Idle seconds. Defaults to persist.
+
+        Returns:
+            list: Remote commands of the closed connections.
+
+        """
+        if max_idle is None:
+            max_idle = self.persist
+        now = time.time()
+        with self.lock:
+            idle = [remote_cmd for remote_cmd, last_used in self.last_used.items()
+                    if now - last_used > max_idle]
+        for remote_cmd in idle:
+            logging.info("Close idle connection %s", remote_cmd)
+            self.close(remote_cmd)
+        return idle
+
+    def maintain(self):
+        """Close the idle connections and forget the masters that are gone.
+
+        Returns:
+            list: Remote commands of the closed or lost connections.
+
+        """
+        with self.lock:
+            self.last_maintained = time.time()
+        closed = self.evict_idle()
+        with self.lock:
+            remote_cmds = list(self.last_used.keys())
+        for remote_cmd in remote_cmds:
+            if not self.check(remote_cmd):
+                logging.info("Master connection %s is gone", remote_cmd)
+                with self.lock:
+                    self.last_used.pop(remote_cmd, None)
+                closed.append(remote_cmd)
+        return closed
+
+
+def get_ssh_pool(persist=600, control_dir=None, transport=None):
+    """Get the connection pool of this process.
+
+    Args:
+        persist (int, optional): Idle seconds before a master exits. Defaults to 600.
+        control_dir (str, optional): Directory for master sockets. Defaults to None.
+        transport (str, optional): ssh or local. Defaults to $ECF_SSH_TRANSPORT or ssh.
+
+    Returns:
+        SSHConnectionPool: The pool.
+
+    """
+    if transport is None:
+        transport = os.environ.get(TRANSPORT_ENV, "ssh")
+    key = (int(persist), control_dir, transport)
+    with POOLS_LOCK:
+        if key not in POOLS:
+            POOLS.update({key: SSHConnectionPool(control_dir=control_dir, persist=persist,
+                                                 transport=transport)})
+        return POOLS[key]
+
+
+def maintain_ssh_pools():
+    """Maintain the connection pools of this process.
+
+    Returns:
+        list: Remote commands of the closed or lost connections.
+
+    """
+    with POOLS_LOCK:
+        pools = list(POOLS.values())
+    closed = []
+    for pool in pools:
+        closed.extend(pool.maintain())
+    return closed
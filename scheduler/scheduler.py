@@ -11,10 +11,11 @@ import sys
 import shutil
 import json
 import logging
-try:
-    import ecflow
-except ModuleNotFoundError:
-    ecflow = None
+from .log_writer import get_log_writer
+from . import suite_diff
+from .suites import get_defs, get_suite_name, archive_definition, load_ecflow
+from .def_writer import DefWriter
+from .database import get_database, is_shared
 
 
 # Base Scheduler server class
@@ -40,7 +41,8 @@ class Server(ABC):
 
         Args:
             suite_name (str): Name of the suite.
-            def_file (str): Name of the definition file.
+            def_file (str, scheduler.SuiteDefinition or ecflow.Defs): Name of the definition
+                                                                      file or the definition.
 
         Raises:
             NotImplementedError: Must be implemented by the child server object.
@@ -53,14 +55,14 @@ class Server(ABC):
         """Begin the suite in a server specific way.
 
         Args:
-            suite_name (str): Name of the suite
+            suite_name (str or scheduler.SuiteDefinition): Name of the suite or the suite.
 
         Raises:
             NotImplementedError: Must be implemented by the child server object.
         """
         raise NotImplementedError
 
-    def start_suite(self, suite_name, def_file, begin=True):
+    def start_suite(self, suite_name, def_file, begin=True, archive_file=None):
         """Start the suite.
 
         All the servers have these methods implemented and can start the server in a
@@ -68,11 +70,16 @@ class Server(ABC):
 
         Args:
             suite_name (str): Name of the suite
-            def_file (str): Name of the definition file.
+            def_file (str, scheduler.SuiteDefinition or ecflow.Defs): Name of the definition
+                                                                      file or the definition.
             begin (bool, optional): If the suite should begin. Defaults to True.
+            archive_file (str, optional): Write an in-memory definition to this file in the
+                                          background. Defaults to None.
         """
         self.start_server()
         self.replace(suite_name, def_file)
+        if archive_file is not None:
+            archive_definition(def_file, archive_file)
         if begin:
             self.begin_suite(suite_name)
 
@@ -87,27 +94,39 @@ class EcflowServer(Server):
     def __init__(self, ecf_host, ecf_port, logfile):
         """Construct the EcflowServer.
 
+        The ecflow client is created on first use, so commands which do not contact the
+        server do not load ecflow.
+
         Args:
             ecf_host (str): Host name of the ecflow server.
             ecf_port (int): Port to listen to.
             logfile (str): Logfile for the scheduler.
 
-        Raises:
-            Exception: _description_
-
         """
-        if ecflow is None:
-            raise Exception("Ecflow was not found")
         Server.__init__(self)
         self.ecf_host = ecf_host
         self.ecf_port = ecf_port
         self.logfile = logfile
-        self.ecf_client = ecflow.Client(self.ecf_host, self.ecf_port)
+        self.client = None
         self.settings = {
             "ECF_HOST": self.ecf_host,
             "ECF_PORT": self.ecf_port
         }
 
+    @property
+    def ecf_client(self):
+        """Ecflow client of the server.
+
+        Raises:
+            Exception: If ecflow is not installed.
+
+        """
+        if self.client is None:
+            if load_ecflow() is None:
+                raise Exception("Ecflow was not found")
+            self.client = load_ecflow().Client(self.ecf_host, self.ecf_port)
+        return self.client
+
     def start_server(self):
         """Start the server."""
         logging.debug("Start EcFlow server")
@@ -136,9 +155,9 @@ class EcflowServer(Server):
         """Begin the suite.
 
         Args:
-            suite_name (str): Nam eof the suite.
+            suite_name (str or scheduler.SuiteDefinition): Name of the suite or the suite.
         """
-        self.ecf_client.begin_suite(suite_name)
+        self.ecf_client.begin_suite(get_suite_name(suite_name))
 
     def force_complete(self, task):
         """Force the task complete.
@@ -147,7 +166,7 @@ class EcflowServer(Server):
             task (scheduler.EcflowTask): Task to force complete.
         """
         ecf_name = task.ecf_name
-        self.ecf_client.force_state(ecf_name, ecflow.State.complete)
+        self.ecf_client.force_state(ecf_name, load_ecflow().State.complete)
 
     def force_aborted(self, task):
         """Force the task aborted.
@@ -156,7 +175,52 @@ class EcflowServer(Server):
             task (scheduler.EcflowTask): Task to force aborted.
         """
         ecf_name = task.ecf_name
-        self.ecf_client.force_state(ecf_name, ecflow.State.aborted)
+        self.ecf_client.force_state(ecf_name, load_ecflow().State.aborted)
+
+    def force_aborted_tasks(self, tasks):
+        """Force several tasks aborted in one call.
+
+        Args:
+            tasks (list): List of scheduler.EcflowTask to force aborted.
+        """
+        paths = [task.ecf_name for task in tasks]
+        self.ecf_client.force_state(paths, load_ecflow().State.aborted)
+
+    def get_submitted_tasks(self, node_path):
+        """Get the active and submitted tasks below a node.
+
+        Args:
+            node_path (str): Absolute path of an ecflow node.
+
+        Raises:
+            Exception: If the node was not found.
+
+        Returns:
+            list: List of scheduler.EcflowTask with submission ids.
+
+        """
+        ecflow = load_ecflow()
+        self.ecf_client.sync_local()
+        defs = self.ecf_client.get_defs()
+        node = None
+        if defs is not None:
+            node = defs.find_abs_node(node_path)
+        if node is None:
+            raise Exception("Node " + node_path + " not found")
+        if isinstance(node, ecflow.Task):
+            nodes = [node]
+        else:
+            nodes = node.get_all_tasks()
+
+        tasks = []
+        for node in nodes:
+            if node.get_state() not in [ecflow.State.active, ecflow.State.submitted]:
+                continue
+            submission_id = node.find_parent_variable_sub_value("SUBMISSION_ID")
+            ecf_pass = node.find_gen_variable("ECF_PASS").value()
+            tasks.append(EcflowTask(node.get_abs_node_path(), node.get_try_no(), ecf_pass,
+                                    None, submission_id=submission_id))
+        return tasks
 
     def update_submission_id(self, task):
         """Update the submission id.
@@ -173,34 +237,125 @@ class EcflowServer(Server):
     def replace(self, suite_name, def_file):
         """Replace the suite name from def_file.
 
+        An in-memory definition is loaded by the client without writing a def file.
+
         Args:
             suite_name (str): Suite name.
-            def_file (str): Definition file.
+            def_file (str, scheduler.SuiteDefinition or ecflow.Defs): Definition file or the
+                                                                      definition.
 
         Raises:
             Exception: _description_
         """
         logging.debug("%s %s", suite_name, def_file)
+        definition = get_defs(def_file)
         try:
-            self.ecf_client.replace("/" + suite_name, def_file)
+            self.ecf_client.replace("/" + suite_name, definition)
         except RuntimeError:
             try:
                 self.ecf_client.delete("/" + suite_name)
-                self.ecf_client.replace("/" + suite_name, def_file)
+                self.ecf_client.replace("/" + suite_name, definition)
             except RuntimeError:
                 raise Exception("Could not replace suite " + suite_name) from RuntimeError
 
+    def get_server_node(self, path):
+        """Get a node of the definition on the server.
+
+        Args:
+            path (str): Absolute node path.
+
+        Returns:
+            ecflow.Node: The node. None if not found.
+
+        """
+        self.ecf_client.sync_local()
+        defs = self.ecf_client.get_defs()
+        if defs is None:
+            return None
+        return defs.find_abs_node(path)
+
+    def update_suite(self, suite_definition, def_file=None, hash_file=None):
+        """Update the suite on the server with the changes of a definition.
+
+        Nothing is sent if the definition did not change since the last update to this
+        server and the suite on the server still has the same content. Otherwise the
+        definition is compared with the suite on the server and only the changed variables
+        and triggers are altered and the changed families and tasks replaced. The whole
+        suite is replaced if it is not on the server or the update fails.
+
+        The definition is loaded from memory. The def file is only written as an archive
+        in the background.
+
+        Args:
+            suite_definition (scheduler.SuiteDefinition): New definition.
+            def_file (str, optional): Archive the definition in this file. Defaults to None.
+            hash_file (str, optional): File with the digest of the last deployed definition.
+                                       Defaults to def_file + ".sha1" if def_file is set.
+
+        Raises:
+            Exception: The suite is streamed to a def file.
+
+        Returns:
+            list: Applied changes as tuples of action, node path and alter arguments.
+
+        """
+        if isinstance(suite_definition.suite.defs, DefWriter):
+            raise Exception("A streamed suite can not be updated incrementally")
+        if hash_file is None and def_file is not None:
+            hash_file = def_file + ".sha1"
+        ecf_node = suite_definition.suite.ecf_node
+        path = "/" + ecf_node.name()
+        local = suite_diff.NodeSnapshot(ecf_node, path)
+        server_key = f"{self.ecf_host}:{self.ecf_port}"
+        server_node = self.get_server_node(path)
+        server = None
+        if server_node is not None:
+            server = suite_diff.NodeSnapshot(server_node, path)
+        if hash_file is not None and suite_diff.read_digest(hash_file, server_key) == \
+                local.digest:
+            # The suite can have been deleted or replaced on the server since the update
+            if server is not None and server.digest == local.digest:
+                logging.info("Suite %s is unchanged", path)
+                return []
+            logging.info("Suite %s was changed on the server", path)
+
+        defs = get_defs(suite_definition)
+        if server is None:
+            changes = [("replace", path, ())]
+        else:
+            changes = suite_diff.diff_nodes(local, server)
+        try:
+            for action, node_path, args in changes:
+                logging.debug("%s %s %s", action, node_path, args)
+                if action == "alter":
+                    self.ecf_client.alter(node_path, *args)
+                elif action == "replace":
+                    self.ecf_client.replace(node_path, defs, True, False)
+                else:
+                    self.ecf_client.delete(node_path)
+        except RuntimeError as error:
+            logging.warning("Incremental update of %s failed: %s", path, repr(error))
+            self.replace(ecf_node.name(), defs)
+            changes = [("replace", path, ())]
+        if def_file is not None:
+            archive_definition(defs, def_file)
+        if hash_file is not None:
+            suite_diff.write_digest(hash_file, local.digest, server_key)
+        return changes
+
     def update_log(self, text):
         """Update the log.
 
+        The records are buffered and written by the log writer of this process.
+
         Args:
             text (str): Text to log
         """
-        logging.debug(self.logfile)
-        with open(self.logfile, mode="a", encoding="utf-8") as server_log:
-            utcnow = datetime.utcnow().strftime("[%H:%M:%S %d.%m.%Y]")
-            server_log.write(utcnow + " " + str(text) + "\n")
-            server_log.flush()
+        get_log_writer(self.logfile).write(text)
+
+    def flush_log(self):
+        """Write the buffered log records."""
+        get_log_writer(self.logfile).flush()
 
 
 class EcflowServerFromFile(EcflowServer):
@@ -275,7 +430,14 @@ class EcflowLogServer():
 
 
 class EcflowTask():
-    """Ecflow scheduler task."""
+    """Ecflow scheduler task.
+
+    A submission handles many tasks, so the task keeps its arguments and the names derived
+    from them in slots. The job file names are cached per job output directory.
+    """
+
+    __slots__ = ("ecf_name", "ecf_tryno", "ecf_pass", "ecf_rid", "ecf_timeout",
+                 "submission_id", "ecf_task", "ecf_families", "family1", "job_bases")
 
     def __init__(self, ecf_name, ecf_tryno, ecf_pass, ecf_rid, submission_id=None, ecf_timeout=20):
         """Construct a task running and communicating with ecflow server.
@@ -289,26 +451,43 @@ class EcflowTask():
             ecf_timeout (int, optional): _description_. Defaults to 20.
 
         """
-        self.ecf_name = ecf_name
+        self.ecf_name = sys.intern(str(ecf_name))
         self.ecf_tryno = int(ecf_tryno)
         self.ecf_pass = ecf_pass
         if ecf_rid == "" or ecf_rid is None:
             ecf_rid = os.getpid()
         self.ecf_rid = int(ecf_rid)
         self.ecf_timeout = ecf_timeout
+
+        if submission_id == "":
+            submission_id = None
+        self.submission_id = submission_id
+
         ecf_name_parts = self.ecf_name.split("/")
         self.ecf_task = ecf_name_parts[-1]
-        ecf_families = None
-        if len(ecf_name_parts) > 2:
-            ecf_families = ecf_name_parts[1:-1]
-        self.ecf_families = ecf_families
+        self.ecf_families = None
         self.family1 = None
-        if self.ecf_families is not None:
+        if len(ecf_name_parts) > 2:
+            self.ecf_families = ecf_name_parts[1:-1]
             self.family1 = self.ecf_families[-1]
+        self.job_bases = None
 
-        if submission_id == "":
-            submission_id = None
-        self.submission_id = submission_id
+    def get_job_base(self, joboutdir):
+        """Get the ecflow job file name that the other file names extend.
+
+        Args:
+            joboutdir (str): Location of ecflow created job files.
+
+        Returns:
+            str: Name of the ecflow job file.
+        """
+        if self.job_bases is None:
+            self.job_bases = {}
+        job_base = self.job_bases.get(joboutdir)
+        if job_base is None:
+            job_base = joboutdir + "/" + self.ecf_name + ".job" + str(self.ecf_tryno)
+            self.job_bases.update({joboutdir: job_base})
+        return job_base
 
     def create_submission_log(self, joboutdir):
         """Create the submssion log file name.
@@ -319,7 +498,7 @@ class EcflowTask():
         Returns:
             str: Name of the submission output file.
         """
-        fname = joboutdir + "/" + self.ecf_name + ".job" + str(self.ecf_tryno) + ".sub"
+        fname = self.get_job_base(joboutdir) + ".sub"
         logging.debug("Submission file name: %s", fname)
         return fname
 
@@ -332,7 +511,7 @@ class EcflowTask():
         Returns:
             str: Name of the kill output file.
         """
-        fname = joboutdir + "/" + self.ecf_name + ".job" + str(self.ecf_tryno) + ".kill"
+        fname = self.get_job_base(joboutdir) + ".kill"
         logging.debug("Kill file name: %s", fname)
         return fname
 
@@ -345,7 +524,7 @@ class EcflowTask():
         Returns:
             str: Name of the status output file.
         """
-        fname = joboutdir + "/" + self.ecf_name + ".job" + str(self.ecf_tryno) + ".stat"
+        fname = self.get_job_base(joboutdir) + ".stat"
         logging.debug("Status file name: %s", fname)
         return fname
 
@@ -358,7 +537,7 @@ class EcflowTask():
         Returns:
             str: Name of the ecflow job file.
         """
-        fname = joboutdir + "/" + self.ecf_name + ".job" + str(self.ecf_tryno)
+        fname = self.get_job_base(joboutdir)
         logging.debug("Ecflow job file name: %s", fname)
         return fname
 
@@ -383,17 +562,29 @@ class EcflowClient(object):
     the child command init()/complete(), for job start/finish. It will also
     handle exceptions and signals, by calling the abort child command.
     *ONLY* one instance of this class, should be used. Otherwise zombies will be created.
+    With a submission data base the start, end and exit status of the job are recorded.
+    Jobs only write to an existing data base on a local disk, i.e. jobs running on the
+    host of the data base. SQLite can not be written from several hosts.
     """
 
-    def __init__(self, server, task):
+    def __init__(self, server, task, db_file=None):
         """Construct the ecflow client.
 
         Args:
             server (EcflowServer): Ecflow server object.
             task (EcflowTask): Ecflow task object.
+            db_file (str, optional): Data base for monitoring. Defaults to None.
 
         """
         logging.debug("Creating Client")
+        if db_file is not None and not os.path.exists(db_file):
+            logging.warning("Data base %s is not on this host. The job state is not recorded",
+                            db_file)
+            db_file = None
+        elif db_file is not None and is_shared(db_file):
+            logging.warning("Data base %s is on a network file system. The job state is not "
+                            "recorded", db_file)
+            db_file = None
         self.server = server
         self.client = server.ecf_client
         # self.ci.set_host_port("%ECF_HOST%", "%ECF_PORT%")
@@ -406,6 +597,7 @@ class EcflowClient(object):
         self.client.set_child_timeout(task.ecf_timeout)
         # self.ci.set_zombie_child_timeout(10)
         self.task = task
+        self.db_file = db_file
 
         # Abort the task for the following signals
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -440,6 +632,27 @@ class EcflowClient(object):
         # self.ci.child_abort("Signal handler called with signal " + str(signum))
         self.__exit__(Exception, "Signal handler called with signal " + str(signum), extra)
 
+    def update_db_state(self, state, exit_status=None, started=False, ended=False):
+        """Update the state of the task in the data base.
+
+        A data base error is logged and does not stop the task.
+
+        Args:
+            state (str): State.
+            exit_status (int, optional): Exit status. Defaults to None.
+            started (bool, optional): Set the start time. Defaults to False.
+            ended (bool, optional): Set the end time. Defaults to False.
+
+        """
+        if self.db_file is None:
+            return
+        try:
+            get_database(self.db_file).update_state(self.task.ecf_name, self.task.ecf_tryno,
+                                                    state, exit_status=exit_status,
+                                                    started=started, ended=ended)
+        except Exception as error:
+            logging.error("Could not update the data base %s: %s", self.db_file, repr(error))
+
     def __enter__(self):
         """Enter the object.
 
@@ -449,6 +662,7 @@ class EcflowClient(object):
         logging.info('Calling init at: %s', self.at_time())
         # self.server.update_log(self.task.ecf_name + " init")
         self.client.child_init()
+        self.update_db_state("active", started=True)
         return self.client
 
     def __exit__(self, ex_type, value, tback):
@@ -466,6 +680,10 @@ class EcflowClient(object):
         if ex_type is not None:
             logging.info('Calling abort %s', self.at_time())
             self.client.child_abort(f"Aborted with exception type {str(ex_type)}:{str(value)}")
+            exit_status = 1
+            if isinstance(value, SystemExit) and isinstance(value.code, int):
+                exit_status = value.code
+            self.update_db_state("aborted", exit_status=exit_status, ended=True)
             if tback is not None:
                 print(tback)
                 traceback.print_tb(tback, limit=1, file=sys.stdout)
@@ -484,8 +702,10 @@ class EcflowClient(object):
                 print(repr(traceback.format_tb(tback)))
                 print("*** tb_lineno:", tback.tb_lineno)
                 self.server.update_log(self.task.ecf_name + " abort")
+                self.server.flush_log()
             return False
         print('Calling complete at: ' + self.at_time())
         # self.server.update_log(self.task.ecf_name + " complete")
         self.client.child_complete()
+        self.update_db_state("complete", exit_status=0, ended=True)
         return False
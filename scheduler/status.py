@@ -0,0 +1,250 @@
+"""Aggregated batch system status with a time-to-live cache."""
+import os
+import re
+import json
+import time
+import fcntl
+import subprocess
+import threading
+import logging
+
+
+STATUS_TABLES = {}
+STATUS_LOCK = threading.Lock()
+ARRAY_PATTERN = re.compile(r"^(\S+)_\[([0-9,\-%]+)\]$")
+
+
+def expand_array_id(job_id):
+    """Expand a pending slurm array id like 123_[0-3,5] to the ids of the array tasks.
+
+    Args:
+        job_id (str): Job id.
+
+    Returns:
+        list: Job ids.
+
+    """
+    match = ARRAY_PATTERN.match(job_id)
+    if match is None:
+        return [job_id]
+    base = match.group(1)
+    # Throttle limits like 0-9%2 are not part of the indices
+    indices = match.group(2).split("%")[0]
+    job_ids = []
+    for part in indices.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            for index in range(int(first), int(last) + 1):
+                job_ids.append(f"{base}_{index}")
+        elif part != "":
+            job_ids.append(f"{base}_{part}")
+    return job_ids
+
+
+class StatusCache(object):
+    """Status table from one bulk query per batch system and host.
+
+    The table maps the SUBMISSION_ID of the jobs to their state in the batch system.
+    It is shared between processes through a file and refreshed by one process at a time
+    when it is older than the time-to-live.
+    """
+
+    def __init__(self, cache_file, bulk_status_cmd, parser, ttl=30):
+        """Construct the status cache.
+
+        Args:
+            cache_file (str): File with the shared status table.
+            bulk_status_cmd (str): Command listing all jobs.
+            parser (callable): Parse the output of the command to a dict job_id -> state.
+            ttl (float, optional): Time-to-live of the table in seconds. Defaults to 30.
+
+        """
+        self.cache_file = cache_file
+        self.bulk_status_cmd = bulk_status_cmd
+        self.parser = parser
+        self.ttl = float(ttl)
+
+    def is_fresh(self, table):
+        """Check if a table is within the time-to-live.
+
+        Args:
+            table (dict): Status table.
+
+        Returns:
+            bool: True if the table can be used.
+
+        """
+        return table is not None and time.time() - table["time"] < self.ttl
+
+    def read(self):
+        """Read the shared table.
+
+        Returns:
+            dict: Status table. None if not available.
+
+        """
+        try:
+            with open(self.cache_file, mode="r", encoding="utf-8") as file_handler:
+                return json.load(file_handler)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, table):
+        """Write the shared table.
+
+        Args:
+            table (dict): Status table.
+
+        """
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, mode="w", encoding="utf-8") as file_handler:
+                json.dump(table, file_handler)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as error:
+            logging.debug("Could not write status cache %s: %s", self.cache_file, repr(error))
+
+    def query(self):
+        """Run the bulk status command.
+
+        Raises:
+            RuntimeError: If the command failed.
+
+        Returns:
+            dict: Status table.
+
+        """
+        logging.info(self.bulk_status_cmd)
+        process = subprocess.run(self.bulk_status_cmd, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, shell=True, check=False)
+        if process.returncode != 0:
+            raise RuntimeError("Bulk status command failed with error code " +
+                               str(process.returncode))
+        jobs = self.parser(process.stdout.decode("utf-8", errors="replace"))
+        return {"time": time.time(), "jobs": jobs}
+
+    def refresh(self):
+        """Refresh the shared table.
+
+        Only one process runs the bulk query. The others wait for it and use its result.
+
+        Returns:
+            dict: Status table.
+
+        """
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(self.cache_file + ".lock", mode="w", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                table = self.read()
+                if not self.is_fresh(table):
+                    table = self.query()
+                    self.write(table)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return table
+
+    def get_table(self):
+        """Get a fresh status table from memory, file or a new query.
+
+        Returns:
+            dict: Status table.
+
+        """
+        with STATUS_LOCK:
+            table = STATUS_TABLES.get(self.cache_file)
+        if not self.is_fresh(table):
+            table = self.read()
+            if not self.is_fresh(table):
+                table = self.refresh()
+            with STATUS_LOCK:
+                STATUS_TABLES.update({self.cache_file: table})
+        return table
+
+    def lookup(self, job_id):
+        """Get the state of a job.
+
+        Args:
+            job_id (str): The SUBMISSION_ID of the job.
+
+        Returns:
+            str: State of the job. None if the job is not in the table.
+
+        """
+        return self.get_table()["jobs"].get(str(job_id))
+
+
+def parse_slurm_status(output):
+    """Parse squeue -h -o "%i %T".
+
+    Args:
+        output (str): Output of squeue.
+
+    Returns:
+        dict: Job states.
+
+    """
+    jobs = {}
+    for line in output.splitlines():
+        words = line.split()
+        if len(words) >= 2:
+            for job_id in expand_array_id(words[0]):
+                jobs.update({job_id: words[1]})
+    return jobs
+
+
+def parse_pbs_status(output):
+    """Parse qstat -u.
+
+    qstat -u truncates long job ids, so the states are keyed by the job number before the
+    first dot, e.g. 12345 for 12345.pbsserver.
+
+    Args:
+        output (str): Output of qstat.
+
+    Returns:
+        dict: Job states.
+
+    """
+    jobs = {}
+    for line in output.splitlines():
+        words = line.split()
+        if len(words) >= 10 and words[0][0].isdigit():
+            jobs.update({words[0].split(".")[0]: words[9]})
+    return jobs
+
+
+def parse_grid_engine_status(output):
+    """Parse qstat -u.
+
+    Args:
+        output (str): Output of qstat.
+
+    Returns:
+        dict: Job states.
+
+    """
+    jobs = {}
+    for line in output.splitlines():
+        words = line.split()
+        if len(words) >= 5 and words[0].isdigit():
+            jobs.update({words[0]: words[4]})
+    return jobs
+
+
+def parse_ps_status(output):
+    """Parse ps -e -o pid=,stat=.
+
+    Args:
+        output (str): Output of ps.
+
+    Returns:
+        dict: Process states.
+
+    """
+    jobs = {}
+    for line in output.splitlines():
+        words = line.split()
+        if len(words) >= 2:
+            jobs.update({words[0]: words[1]})
+    return jobs
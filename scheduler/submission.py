@@ -1,9 +1,53 @@
 """Job submission setup."""
-import shutil
 import os
+import shlex
 import subprocess
+import json
+import hashlib
+import re
+import stat
+import threading
+from concurrent.futures import Future
 from abc import ABC, abstractmethod
 import logging
+from .remote import get_ssh_pool
+from .backends import get_backend, backend_supports
+from .database import get_database
+from .timing import span
+from .status import StatusCache, parse_slurm_status, parse_pbs_status, \
+    parse_grid_engine_status, parse_ps_status
+
+
+SUBSTITUTE_PATTERN = re.compile("@WRAPPER_TO_BE_SUBSTITUTED@|@HOST_TO_BE_SUBSTITUTED@")
+SLURM_JOB_ID_PATTERN = re.compile(r"Submitted batch job (\S+)")
+SGE_JOB_ID_PATTERN = re.compile(r"Your job(?:-array)? (\S+)")
+ENV_FILE_CACHE = {}
+ENV_FILE_LOCK = threading.Lock()
+
+
+def read_env_file(env_file):
+    """Read the host environment file.
+
+    The content is cached and only re-read if the file is modified.
+
+    Args:
+        env_file (str): Environment file.
+
+    Returns:
+        str: Content of the environment file.
+
+    """
+    file_stat = os.stat(env_file)
+    key = (file_stat.st_mtime_ns, file_stat.st_size)
+    with ENV_FILE_LOCK:
+        cached = ENV_FILE_CACHE.get(env_file)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with open(env_file, mode="r", encoding="utf-8") as fh_env:
+        content = fh_env.read()
+    with ENV_FILE_LOCK:
+        ENV_FILE_CACHE.update({env_file: (key, content)})
+    return content
 
 
 class EcflowSubmitTask(object):
@@ -11,7 +55,8 @@ class EcflowSubmitTask(object):
 
     def __init__(self, task, env_submit, server, joboutdir,
                  stream=None, dbfile=None, interpreter="#!/usr/bin/env python3",
-                 ensmbr=None, submit_exceptions=None, coldstart=False, env_file=None):
+                 ensmbr=None, submit_exceptions=None, coldstart=False, env_file=None,
+                 batcher=None):
         """Construct a ecflow submission task.
 
         Args:
@@ -26,10 +71,13 @@ class EcflowSubmitTask(object):
             submit_exceptions (dict, optional): Task submission exceptions. Defaults to None.
             coldstart (bool, optional): Cold start. Defaults to False.
             env_file (str, optional): Environment file. Defaults to None.
+            batcher (SlurmArrayBatcher, optional): Coalesce slurm submissions in job arrays.
+                                                   Defaults to None.
 
         """
         self.task = task
         self.env_file = env_file
+        self.batcher = batcher
         self.ecflow_server = server
         self.coldstart = coldstart
 
@@ -44,78 +92,117 @@ class EcflowSubmitTask(object):
         self.debug = True
 
         # Parse Env_submit
-        self.task_settings = TaskSettings(self.task, env_submit, joboutdir, interpreter=interpreter,
-                                          submit_exceptions=submit_exceptions, coldstart=False)
+        timings = {}
+        with span("task_settings", timings=timings, task=self.task.ecf_name):
+            self.task_settings = TaskSettings(self.task, env_submit, joboutdir,
+                                              interpreter=interpreter,
+                                              submit_exceptions=submit_exceptions,
+                                              coldstart=False)
         self.sub = get_submission_object(self.task, self.task_settings, self.ecflow_server,
                                          db_file=self.db_file)
+        self.sub.timings.update(timings)
 
-    def write_header(self, file_handler):
-        """Write header to file handler.
-
-        Args:
-            file_handler (_type_): _description_
+    def render_header(self):
+        """Render the job header.
 
         Returns:
-            _type_: _description_
+            tuple: Header, wrapper and host.
+
         """
-        file_handler.write(self.task_settings.interpreter + "\n")
+        lines = [self.task_settings.interpreter + "\n"]
         if self.task_settings.header is not None:
-            file_handler.write("\n# Batch commands\n")
+            lines.append("\n# Batch commands\n")
             # Loop twice, first comments (likely to be batch commands)
-            for setting, value in self.task_settings.header.items():
+            for value in self.task_settings.header.values():
                 value = str(value)
                 if value.find("#") >= 0:
-                    # print(str(self.header[setting]))
-                    file_handler.write(str(self.task_settings.header[setting]) + "\n")
+                    lines.append(value + "\n")
 
             # Host environment
             if self.env_file is not None:
-                file_handler.write("\n# Host specific environment settings in python syntax:\n")
-                with open(self.env_file, mode="r", encoding="utf-8") as fh_env:
-                    for line in fh_env.readlines():
-                        file_handler.write(line)
-                fh_env.close()
-
-            file_handler.write("\n# Task specific settings:\n")
-            for setting, value in self.task_settings.header.items():
+                lines.append("\n# Host specific environment settings in python syntax:\n")
+                lines.append(read_env_file(self.env_file))
+
+            lines.append("\n# Task specific settings:\n")
+            for value in self.task_settings.header.values():
                 value = str(value)
                 if value.find("#") < 0:
-                    # print(str(self.header[setting]))
-                    file_handler.write(str(value) + "\n")
+                    lines.append(value + "\n")
 
-            wrapper = ""
-            if self.task_settings.wrapper is not None:
-                wrapper = str(self.task_settings.wrapper)
+            lines.append("\n#Python script:\n")
 
-            file_handler.write("\n#Python script:\n")
-            return wrapper, self.task_settings.host
+        wrapper = ""
+        if self.task_settings.wrapper is not None:
+            wrapper = str(self.task_settings.wrapper)
+        return "".join(lines), wrapper, self.task_settings.host
 
-    def write_trailer(self, file_handler):
-        """Write trailer in job file.
+    def write_header(self, file_handler):
+        """Write header to file handler.
 
         Args:
             file_handler (_type_): _description_
 
+        Returns:
+            tuple: Wrapper and host.
+
         """
+        header, wrapper, host = self.render_header()
+        file_handler.write(header)
+        return wrapper, host
+
+    def render_trailer(self):
+        """Render the job trailer.
+
+        Returns:
+            str: Trailer.
+
+        """
+        trailer = ""
         if self.task_settings.trailer is not None:
             for value in self.task_settings.trailer.values():
-                file_handler.write(str(value) + "\n")
+                trailer = trailer + str(value) + "\n"
+        return trailer
+
+    def write_trailer(self, file_handler):
+        """Write trailer in job file.
+
+        Args:
+            file_handler (_type_): _description_
+
+        """
+        file_handler.write(self.render_trailer())
 
     def write_job(self):
-        """Write job file."""
+        """Write job file.
+
+        The ecflow generated job is read once, the placeholders are substituted in one pass
+        and the result is written to a temporary file which is renamed into place.
+        """
         logging.info("Job file: %s", self.task_settings.ecf_job)
         ecf_job = self.task_settings.ecf_job
-        fname = ecf_job + ".tmp"
-        shutil.move(ecf_job, fname)
-        with open(ecf_job, mode="w", encoding="utf-8") as file_handler:
-            wrapper, host = self.write_header(file_handler)
-            with open(fname, mode="r", encoding="utf-8") as job_fh:
-                for line in job_fh.readlines():
-                    line = line.replace("@WRAPPER_TO_BE_SUBSTITUTED@", wrapper)
-                    line = line.replace("@HOST_TO_BE_SUBSTITUTED@", host)
-                    file_handler.write(line)
-            self.write_trailer(file_handler)
-        os.system("chmod u+x " + ecf_job)
+        header, wrapper, host = self.render_header()
+        with open(ecf_job, mode="r", encoding="utf-8") as job_fh:
+            content = job_fh.read()
+            mode = os.fstat(job_fh.fileno()).st_mode
+
+        substitutes = {
+            "@WRAPPER_TO_BE_SUBSTITUTED@": wrapper,
+            "@HOST_TO_BE_SUBSTITUTED@": host
+        }
+        content = SUBSTITUTE_PATTERN.sub(lambda match: substitutes[match.group(0)], content)
+
+        fname = f"{ecf_job}.{os.getpid()}.tmp"
+        try:
+            with open(fname, mode="w", encoding="utf-8") as file_handler:
+                file_handler.write(header)
+                file_handler.write(content)
+                file_handler.write(self.render_trailer())
+            os.chmod(fname, stat.S_IMODE(mode) | stat.S_IXUSR)
+            os.replace(fname, ecf_job)
+        except OSError:
+            if os.path.exists(fname):
+                os.unlink(fname)
+            raise
 
     def submit(self):
         """Sumit task."""
@@ -125,7 +212,8 @@ class EcflowSubmitTask(object):
             if "NAME" not in self.task_settings.header:
                 self.task_settings.header.update({"NAME": self.sub.set_job_name()})
             logging.debug("write")
-            self.write_job()
+            with span("write_job", timings=self.sub.timings, task=self.task.ecf_name):
+                self.write_job()
 
             if self.ecflow_server is None:
                 raise Exception("You must set server to submit!")
@@ -133,25 +221,41 @@ class EcflowSubmitTask(object):
             if self.complete:
                 logging.debug("force_complete")
                 self.ecflow_server.force_complete(self.task)
+            elif self.batcher is not None and self.batcher.accepts(self):
+                logging.debug("batcher.add")
+                future = self.batcher.add(self)
+                if self.batcher.wait:
+                    with span("wait_for_batch", task=self.task.ecf_name):
+                        error = future.exception()
+                    if error is not None:
+                        # The batcher aborted the task. Report the error as a failed submission.
+                        raise Exception("Batch submission failed: " + repr(error))
             else:
-                logging.debug("sub.set_submit_cmd")
-                self.sub.set_submit_cmd()
-                logging.debug("submit_job")
-                self.sub.submit_job()
-                logging.debug("set_jobid")
-                self.sub.set_jobid()
-                logging.debug("job_id")
-                self.task.submission_id = self.sub.job_id
-                logging.debug("update_submission_id")
-                self.ecflow_server.update_submission_id(self.task)
+                self.submit_job_file()
 
         except RuntimeError:
             # Supposed to handle abort self unless killed
-            pass
+            self.sub.join_logs()
         except Exception as error:
+            self.sub.join_logs()
             msg = f"Submission failed {str(error)}"
             raise SubmitException(msg, self.task, self.task_settings) from error
 
+    def submit_job_file(self):
+        """Submit the written job file and update the submission id on the server."""
+        logging.debug("sub.set_submit_cmd")
+        self.sub.set_submit_cmd()
+        logging.debug("submit_job")
+        self.sub.submit_job()
+        logging.debug("set_jobid")
+        self.sub.set_jobid()
+        logging.debug("job_id")
+        self.task.submission_id = self.sub.job_id
+        logging.debug("update_submission_id")
+        with span("update_submission_id", task=self.task.ecf_name):
+            self.ecflow_server.update_submission_id(self.task)
+        self.sub.join_logs()
+
 
 class TaskSettings(object):
     """Set the task specific setttings."""
@@ -163,7 +267,7 @@ class TaskSettings(object):
 
         Args:
             task (scheduler.EcflowTask): Task
-            submission_defs (dict): Submission definitions
+            submission_defs (dict|TaskSettingsIndex): Submission definitions or a compiled index.
             joboutdirs (_type_): _description_
             submit_exceptions (_type_, optional): _description_. Defaults to None.
             interpreter (str, optional): Python interpreter. Defaults to "#!/usr/bin/env python3".
@@ -177,6 +281,11 @@ class TaskSettings(object):
 
         """
         self.task = task
+        if isinstance(submission_defs, TaskSettingsIndex):
+            self.index = submission_defs
+            submission_defs = self.index.submission_defs
+        else:
+            self.index = TaskSettingsIndex(submission_defs)
         self.submission_defs = submission_defs
         self.header = {}
         self.trailer = {}
@@ -190,6 +299,9 @@ class TaskSettings(object):
         self.coldstart = coldstart
         self.host = None
         self.submit_variables = None
+        self.array_window = None
+        self.status_cache_ttl = None
+        self.ssh_multiplex = None
 
         if submit_exceptions is not None:
             self.check_exceptions(submit_exceptions)
@@ -263,6 +375,12 @@ class TaskSettings(object):
                     self.submit_variables = value
                 elif key == "WRAPPER":
                     self.wrapper = value
+                elif key == "ARRAY_WINDOW":
+                    self.array_window = float(value)
+                elif key == "STATUS_CACHE_TTL":
+                    self.status_cache_ttl = float(value)
+                elif key == "SSH_MULTIPLEX":
+                    self.ssh_multiplex = int(value)
                 elif key == "HOST":
                     self.host = str(value)
                     if self.host != "0" and self.host != "1":
@@ -270,40 +388,189 @@ class TaskSettings(object):
                 else:
                     self.header.update({key: value})
 
+        # Re-use persistent connections to the remote host
+        if self.ssh_multiplex is not None and self.remote_submit_cmd is not None:
+            pool = get_ssh_pool(persist=self.ssh_multiplex)
+            self.remote_submit_cmd = pool.command(self.remote_submit_cmd)
+            self.remote_status_cmd = pool.command(self.remote_status_cmd)
+            self.remote_kill_cmd = pool.command(self.remote_kill_cmd)
+
     def parse_submission_defs(self):
         """Parse the submssion definitions."""
-        ecf_task = self.task.ecf_task
-        task_settings = {}
-        # print("parse", ecf_task)
-        # print(self.submission_defs)
-        all_defs = self.submission_defs
-        print(all_defs)
+        return self.index.lookup(self.task.ecf_task)
+
+
+class TaskSettingsIndex(object):
+    """Compiled index from task name to submission settings.
+
+    The index maps every task name to its submit type and possible task exceptions,
+    so resolving the settings for a task is a single lookup.
+    """
+
+    version = 1
+
+    def __init__(self, submission_defs=None, index=None):
+        """Construct the index.
+
+        Args:
+            submission_defs (dict, optional): Submission definitions. Defaults to None.
+            index (dict, optional): Already compiled index. Defaults to None.
+
+        Raises:
+            Exception: If neither definitions or index are given.
+
+        """
+        if index is None:
+            if submission_defs is None:
+                raise Exception("Submission definitions or an index is needed")
+            index = self.compile(submission_defs)
+        self.submission_defs = submission_defs
+        self.default_submit_type = index["default_submit_type"]
+        self.submit_type_settings = index["submit_type_settings"]
+        self.task_submit_types = index["task_submit_types"]
+        self.task_exceptions = index["task_exceptions"]
+
+    @staticmethod
+    def compile(all_defs):
+        """Compile the index.
+
+        If a task is listed for several submit types, the last one in submit_types is used.
+
+        Args:
+            all_defs (dict): Submission definitions.
+
+        Returns:
+            dict: The compiled index.
+
+        """
         submit_types = all_defs["submit_types"]
         default_submit_type = all_defs["default_submit_type"]
-        task_submit_type = None
+        submit_type_settings = {}
+        task_submit_types = {}
         for s_t in submit_types:
             if s_t in all_defs and "tasks" in all_defs[s_t]:
                 for tname in all_defs[s_t]["tasks"]:
-                    if tname == ecf_task:
-                        task_submit_type = s_t
-        if task_submit_type is None:
-            task_submit_type = default_submit_type
-
-        if task_submit_type in all_defs:
-            for setting in all_defs[task_submit_type]:
-                if setting != "tasks":
-                    task_settings.update({setting: all_defs[task_submit_type][setting]})
-
-        ex = "task_exceptions"
-        if ex in all_defs:
-            for tname in all_defs[ex]:
-                if tname == ecf_task:
-                    for setting in all_defs[ex][tname]:
-                        task_settings.update({setting: all_defs[ex][tname][setting]})
-
-        # print(task_settings)
+                    task_submit_types.update({tname: s_t})
+        for s_t in list(submit_types) + [default_submit_type]:
+            if s_t in all_defs:
+                settings = {}
+                for setting in all_defs[s_t]:
+                    if setting != "tasks":
+                        settings.update({setting: all_defs[s_t][setting]})
+                submit_type_settings.update({s_t: settings})
+
+        return {
+            "default_submit_type": default_submit_type,
+            "submit_type_settings": submit_type_settings,
+            "task_submit_types": task_submit_types,
+            "task_exceptions": all_defs.get("task_exceptions", {})
+        }
+
+    def as_dict(self):
+        """Get the compiled index.
+
+        Returns:
+            dict: The compiled index.
+
+        """
+        return {
+            "default_submit_type": self.default_submit_type,
+            "submit_type_settings": self.submit_type_settings,
+            "task_submit_types": self.task_submit_types,
+            "task_exceptions": self.task_exceptions
+        }
+
+    def lookup(self, ecf_task):
+        """Get the merged settings for a task.
+
+        Args:
+            ecf_task (str): Task name.
+
+        Returns:
+            dict: Task settings.
+
+        """
+        submit_type = self.task_submit_types.get(ecf_task, self.default_submit_type)
+        task_settings = dict(self.submit_type_settings.get(submit_type, {}))
+        if ecf_task in self.task_exceptions:
+            task_settings.update(self.task_exceptions[ecf_task])
         return task_settings
 
+    @staticmethod
+    def get_index_file(env_submit_file):
+        """Get the name of the persisted index.
+
+        Args:
+            env_submit_file (str): File with submission settings.
+
+        Returns:
+            str: Index file name.
+
+        """
+        return env_submit_file + ".index"
+
+    @classmethod
+    def from_file(cls, env_submit_file, index_file=None):
+        """Get the index for a submission file.
+
+        The index is persisted next to the submission file. It is re-used as long as the
+        modification time and size, or the content hash, of the submission file are unchanged.
+
+        Args:
+            env_submit_file (str): File with submission settings.
+            index_file (str, optional): Persisted index. Defaults to None.
+
+        Returns:
+            TaskSettingsIndex: The index.
+
+        """
+        if index_file is None:
+            index_file = cls.get_index_file(env_submit_file)
+        file_stat = os.stat(env_submit_file)
+        stamp = {"version": cls.version, "mtime_ns": file_stat.st_mtime_ns,
+                 "size": file_stat.st_size}
+
+        cached = None
+        try:
+            with open(index_file, mode="r", encoding="utf-8") as file_handler:
+                cached = json.load(file_handler)
+        except (OSError, ValueError):
+            cached = None
+        if cached is not None and cached.get("version") == cls.version:
+            if cached.get("mtime_ns") == stamp["mtime_ns"] and cached.get("size") == stamp["size"]:
+                logging.debug("Using index %s", index_file)
+                return cls(index=cached["index"])
+
+        with open(env_submit_file, mode="rb") as file_handler:
+            content = file_handler.read()
+        stamp.update({"sha256": hashlib.sha256(content).hexdigest()})
+        if cached is not None and cached.get("sha256") == stamp["sha256"]:
+            index = cls(index=cached["index"])
+        else:
+            index = cls(submission_defs=json.loads(content.decode("utf-8")))
+        index.save(index_file, stamp)
+        return index
+
+    def save(self, index_file, stamp):
+        """Persist the index.
+
+        Args:
+            index_file (str): Index file name.
+            stamp (dict): Validation stamp of the submission file.
+
+        """
+        content = dict(stamp)
+        content.update({"index": self.as_dict()})
+        tmp_file = f"{index_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, mode="w", encoding="utf-8") as file_handler:
+                json.dump(content, file_handler)
+            os.replace(tmp_file, index_file)
+        except OSError as error:
+            logging.debug("Could not save index %s: %s", index_file, repr(error))
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+
 
 class SubmitException(Exception):
     """Submit exception."""
@@ -377,7 +644,7 @@ def get_submission_object(task, task_settings, server, db_file=None):
         db_file (str, optional): Data base for monitoring.. Defaults to None.
 
     Raises:
-        NotImplementedError: _description_
+        NotImplementedError: If no backend is registered for the submit type.
 
     Returns:
         SubmissionBaseClass: Return a submission object.
@@ -385,19 +652,80 @@ def get_submission_object(task, task_settings, server, db_file=None):
     """
     submit_type = task_settings.submit_type
     logging.info("Submit type: %s", submit_type)
-    if submit_type.lower() == "pbs":
-        sub = PBSSubmission(task, task_settings, server, db_file=db_file)
-    elif submit_type.lower() == "slurm":
-        sub = SlurmSubmission(task, task_settings, server, db_file=db_file)
-    elif submit_type.lower() == "grid_engine":
-        sub = GridEngineSubmission(task, task_settings, server, db_file=db_file)
-    elif submit_type == "background":
-        sub = BackgroundSubmission(task, task_settings, server, db_file=db_file)
-    else:
-        raise NotImplementedError
+    submission_class = get_backend(submit_type).load()
+    sub = submission_class(task, task_settings, server, db_file=db_file)
     return sub
 
 
+def kill_tasks(tasks, submission_defs, joboutdirs, server, dry_run=False, db_file=None):
+    """Kill several tasks with one batch system call per submission type.
+
+    Tasks killed in the batch system are force aborted in one ecflow call.
+
+    Args:
+        tasks (list): List of scheduler.EcflowTask with submission ids.
+        submission_defs (dict|TaskSettingsIndex): Submission definitions.
+        joboutdirs (dict): Job output directories per host.
+        server (scheduler.EcflowServer): Server.
+        dry_run (bool, optional): Only group the tasks. Defaults to False.
+        db_file (str, optional): Data base for monitoring. Defaults to None.
+
+    Returns:
+        dict: Lists of "killed" and "failed" tasks.
+
+    """
+    if not isinstance(submission_defs, TaskSettingsIndex):
+        submission_defs = TaskSettingsIndex(submission_defs)
+    groups = {}
+    failed = []
+    for task in tasks:
+        if task.submission_id is None:
+            logging.warning("No submission id for %s", task.ecf_name)
+            failed.append(task)
+            continue
+        # The submission exceptions exit, so SystemExit is caught to go on with the other tasks
+        try:
+            task_settings = TaskSettings(task, submission_defs, joboutdirs)
+            sub = get_submission_object(task, task_settings, server, db_file=db_file)
+            key = sub.bulk_kill_key()
+        except (Exception, SystemExit) as error:
+            logging.error("Could not set up the kill of %s: %s", task.ecf_name, repr(error))
+            failed.append(task)
+            continue
+        if key not in groups:
+            groups.update({key: []})
+        groups[key].append(sub)
+
+    killed = []
+    for subs in groups.values():
+        logging.info("Kill %s tasks with %s", len(subs), subs[0].__class__.__name__)
+        if dry_run:
+            continue
+        if backend_supports(subs[0].task_settings.submit_type, "bulk_kill"):
+            try:
+                subs[0].kill_jobs(subs)
+                killed = killed + [sub.task for sub in subs]
+            except (Exception, SystemExit) as error:
+                logging.error("Bulk kill failed: %s", repr(error))
+                failed = failed + [sub.task for sub in subs]
+        else:
+            for sub in subs:
+                try:
+                    sub.set_kill_cmd()
+                    if sub.kill_job_cmd is None:
+                        raise RuntimeError("No kill command set for "
+                                           + sub.task_settings.submit_type)
+                    sub.kill_job()
+                    killed.append(sub.task)
+                except (Exception, SystemExit) as error:
+                    logging.error("Kill of %s failed: %s", sub.task.ecf_name, repr(error))
+                    failed.append(sub.task)
+
+    if len(killed) > 0:
+        server.force_aborted_tasks(killed)
+    return {"killed": killed, "failed": failed}
+
+
 class SubmissionBaseClass(ABC):
     """An abstract class for submssion to be implemented by all children.
 
@@ -416,8 +744,10 @@ class SubmissionBaseClass(ABC):
             server (scheduler.Server): Server.
             db_file (str, optional): Data base for monitoring. Defaults to None.
             remote_submit_cmd (str, optional): Remote submit command. Defaults to None.
-            remote_kill_cmd (str, optional): Remote kill command. Defaults to None.
-            remote_status_cmd (str, optional): Remote status command. Defaults to None.
+            remote_kill_cmd (str, optional): Remote kill command. Defaults to the one of
+                                             the task settings.
+            remote_status_cmd (str, optional): Remote status command. Defaults to the one of
+                                               the task settings.
 
         """
         self.task = task
@@ -429,28 +759,77 @@ class SubmissionBaseClass(ABC):
         if task.submission_id is not None:
             self.job_id = task.submission_id
         self.submit_cmd = None
+        self.submit_output = None
+        self.log_writers = []
+        self.timings = {}
         self.kill_job_cmd = None
         self.job_status_cmd = None
 
+        # Status and kill commands use the pooled connection of the task settings.
+        # The submit commands add the remote command of the task settings themselves.
+        if remote_kill_cmd is None:
+            remote_kill_cmd = task_settings.remote_kill_cmd
+        if remote_status_cmd is None:
+            remote_status_cmd = task_settings.remote_status_cmd
         self.remote_submit_cmd = remote_submit_cmd
         self.remote_kill_cmd = remote_kill_cmd
         self.remote_status_cmd = remote_status_cmd
 
-    def update_db(self, job_id):
+    def update_db(self, job_id, state="submitted"):
         """Update the data base.
 
         Args:
             job_id (str): Job identifier.
+            state (str, optional): State of the submission. Defaults to "submitted".
         """
         if self.db_file is not None:
-            with open(self.db_file, mode="a", encoding="utf-8") as file_handler:
-                file_handler.write(job_id + "\n")
+            get_database(self.db_file).record_submission(
+                self.task.ecf_name, self.task.ecf_tryno, job_id,
+                submit_type=self.task_settings.submit_type, host=self.task_settings.host,
+                state=state, timings=self.timings)
+
+    def update_db_state(self, state, exit_status=None):
+        """Update the state of the submission in the data base.
+
+        Args:
+            state (str): State.
+            exit_status (int, optional): Exit status. Defaults to None.
+        """
+        if self.db_file is not None:
+            get_database(self.db_file).update_state(self.task.ecf_name, self.task.ecf_tryno,
+                                                    state, exit_status=exit_status,
+                                                    ended=state in ["killed", "aborted"])
+
+    def write_log(self, fname, text):
+        """Write a log file asynchronously.
+
+        Use join_logs to wait for the logs to be written.
+
+        Args:
+            fname (str): Log file name.
+            text (str): Content.
+
+        """
+        def write():
+            try:
+                with open(fname, mode="w", encoding="utf-8") as file_handler:
+                    file_handler.write(text)
+            except OSError as error:
+                logging.error("Could not write %s: %s", fname, repr(error))
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.log_writers.append(writer)
+
+    def join_logs(self):
+        """Wait for asynchronous log writes to finish."""
+        while len(self.log_writers) > 0:
+            self.log_writers.pop().join()
 
     def clear_db(self):
-        """Remove database."""
+        """Remove the submission from the data base."""
         if self.db_file is not None:
-            if os.path.exists(self.db_file):
-                os.unlink(self.db_file)
+            get_database(self.db_file).delete(self.task.ecf_name, self.task.ecf_tryno)
 
     @abstractmethod
     def set_submit_cmd(self):
@@ -500,13 +879,16 @@ class SubmissionBaseClass(ABC):
             logfile = self.get_logfile()
             logging.info(cmd)
             if logfile is None:
+                self.server.update_log("ECF_JOB_CMD: " + cmd)
+                with span("submit_cmd", timings=self.timings, task=self.task.ecf_name):
+                    process = subprocess.run(cmd, stdout=subprocess.PIPE,
+                                             stderr=subprocess.STDOUT, shell=True, check=False)
+                self.submit_output = process.stdout.decode("utf-8", errors="replace")
                 subfile = self.task.create_submission_log(self.task_settings.joboutdir)
-                with open(subfile, mode="w", encoding="utf-8") as subfile:
-                    self.server.update_log("ECF_JOB_CMD: " + cmd)
-                    process = subprocess.Popen(cmd, stdout=subfile, stderr=subfile, shell=True)
-                    process.wait()
+                self.write_log(subfile, self.submit_output)
                 ret = process.returncode
                 if ret != 0:
+                    self.update_db(None, state="submit_failed")
                     raise RuntimeError("Submit command failed with error code " + str(ret))
             else:
                 self.server.update_log("ECF_JOB_CMD: " + cmd)
@@ -514,7 +896,8 @@ class SubmissionBaseClass(ABC):
                     self.process = subprocess.Popen(cmd, stdout=logfile, stderr=logfile, shell=True)
 
             logging.debug(self.submit_cmd)
-            self.job_id = self.set_jobid()
+            with span("job_id", timings=self.timings, task=self.task.ecf_name):
+                self.job_id = self.set_jobid()
             logging.debug(self.job_id)
             if self.db_file is not None:
                 SubmissionBaseClass.update_db(self, self.job_id)
@@ -550,6 +933,7 @@ class SubmissionBaseClass(ABC):
             log_handler.write("\n\n*** KILLED BY ECF_kill ****")
             log_handler.flush()
             log_handler.close()
+            self.update_db_state("killed")
 
     @abstractmethod
     def set_job_status(self,):
@@ -573,6 +957,12 @@ class SubmissionBaseClass(ABC):
         """
         if self.job_id is None:
             StatusException("No job ID was provided!", self.task, self.task_settings)
+        try:
+            with span("cached_status", task=self.task.ecf_name):
+                if self.cached_status():
+                    return
+        except Exception as error:
+            logging.warning("Cached status failed: %s", repr(error))
         try:
             self.set_job_status()
         except Exception as error:
@@ -582,11 +972,85 @@ class SubmissionBaseClass(ABC):
             raise StatusException("No status command set for " + self.task_settings.submit_type,
                                   self.task, self.task_settings)
         try:
-            self.job_status()
+            with span("status_cmd", task=self.task.ecf_name):
+                self.job_status()
         except Exception as error:
             raise StatusException("Status command failed " + repr(error), self.task,
                                   self.task_settings) from error
 
+    def bulk_status_cmd(self):
+        """Command listing the state of all jobs.
+
+        Returns:
+            str: Command. None if the submission type has no bulk status.
+
+        """
+        return None
+
+    @staticmethod
+    def parse_bulk_status(output):
+        """Parse the output of the bulk status command.
+
+        Args:
+            output (str): Output of the bulk status command.
+
+        Raises:
+            NotImplementedError: If the submission type has no bulk status.
+
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def bulk_status_key(job_id):
+        """Get the key of a job in the table of the bulk status command.
+
+        Args:
+            job_id (str): Job id.
+
+        Returns:
+            str: Key.
+
+        """
+        return str(job_id)
+
+    def get_status_cache(self):
+        """Get the status cache.
+
+        The cache is enabled with STATUS_CACHE_TTL in the submission settings.
+
+        Returns:
+            scheduler.status.StatusCache: Status cache. None if not enabled.
+
+        """
+        ttl = self.task_settings.status_cache_ttl
+        if ttl is None or not backend_supports(self.task_settings.submit_type, "bulk_status"):
+            return None
+        cmd = self.bulk_status_cmd()
+        if cmd is None:
+            return None
+        cmd = self.set_remote_cmd(cmd, self.remote_status_cmd)
+        cache_file = f"{self.task_settings.joboutdir}/status_cache/" \
+                     f"{self.task_settings.submit_type}.{self.task_settings.host}.json"
+        return StatusCache(cache_file, cmd, self.parse_bulk_status, ttl=ttl)
+
+    def cached_status(self):
+        """Answer the status from the status cache.
+
+        Returns:
+            bool: True if the job was found in the cache.
+
+        """
+        cache = self.get_status_cache()
+        if cache is None:
+            return False
+        state = cache.lookup(self.bulk_status_key(self.job_id))
+        if state is None:
+            return False
+        statusfile = self.task.create_status_log(self.task_settings.joboutdir)
+        self.write_log(statusfile, f"Job {self.job_id} is {state} (cached)\n")
+        self.join_logs()
+        return True
+
     def job_status(self):
         """General job status method.
 
@@ -624,11 +1088,63 @@ class SubmissionBaseClass(ABC):
             raise KillException("No kill command set for " + self.task_settings.submit_type,
                                 self.task, self.task_settings)
         try:
-            self.kill_job()
+            with span("kill_cmd", task=self.task.ecf_name):
+                self.kill_job()
         except Exception as error:
             raise KillException("Kill failed " + repr(error), self.task,
                                 self.task_settings) from error
 
+    def bulk_kill_cmd(self, job_ids):
+        """Command killing several jobs.
+
+        Args:
+            job_ids (list): Job identifiers.
+
+        Returns:
+            str: Command. None if the submission type can not kill several jobs at once.
+
+        """
+        return None
+
+    def bulk_kill_key(self):
+        """Key of submissions which can be killed with the same command.
+
+        Returns:
+            tuple: Key.
+
+        """
+        return (self.__class__.__name__, self.bulk_kill_cmd([]), self.remote_kill_cmd,
+                self.task_settings.host)
+
+    def kill_jobs(self, subs):
+        """Kill the jobs of several submissions with one command.
+
+        Args:
+            subs (list): Submissions with the same bulk_kill_key.
+
+        Raises:
+            RuntimeError: If the kill command failed.
+
+        """
+        job_ids = [str(sub.job_id) for sub in subs]
+        cmd = self.set_remote_cmd(self.bulk_kill_cmd(job_ids), self.remote_kill_cmd)
+        logging.info(cmd)
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 shell=True, check=False)
+        output = process.stdout.decode("utf-8", errors="replace")
+        for sub in subs:
+            killfile = sub.task.create_kill_log(sub.task_settings.joboutdir)
+            self.write_log(killfile, f"Kill job {sub.task_settings.ecf_job_at_host} with "
+                                     f"command:\n{cmd}\n{output}")
+        self.join_logs()
+        if process.returncode != 0:
+            raise RuntimeError("Kill command failed with error code " + str(process.returncode))
+
+        for sub in subs:
+            with open(sub.task_settings.ecf_jobout, mode="a", encoding="utf-8") as log_handler:
+                log_handler.write("\n\n*** KILLED BY ECF_kill ****")
+            sub.update_db_state("killed")
+
     @abstractmethod
     def set_kill_cmd(self):
         """Set kill command.
@@ -645,11 +1161,12 @@ class SubmissionBaseClass(ABC):
     def set_remote_cmd(cmd, remote_cmd):
         """Set remote command.
 
-        Pre-pending a remote command statement (e.g. ssh)
+        Pre-pending a remote command statement (e.g. ssh). The command is quoted, so it is
+        expanded by the remote shell.
 
         """
         if remote_cmd is not None:
-            cmd = remote_cmd + " \"" + str(cmd) + "\""
+            cmd = remote_cmd + " " + shlex.quote(str(cmd))
         return cmd
 
     @abstractmethod
@@ -719,11 +1236,23 @@ class BackgroundSubmission(SubmissionBaseClass):
         ecf_jobout = self.task_settings.ecf_jobout
         return ecf_jobout
 
+    def bulk_kill_cmd(self, job_ids):
+        """Command killing several processes."""
+        return "kill -9 " + " ".join(job_ids)
+
     def set_kill_cmd(self):
         """Set the kill command."""
         if self.job_id is not None:
-            cmd = "kill -9 " + str(self.job_id)
-            self.kill_job_cmd = self.set_remote_cmd(cmd, self.remote_kill_cmd)
+            self.kill_job_cmd = "kill -9 " + str(self.job_id)
+
+    def bulk_status_cmd(self):
+        """Command listing the state of all processes."""
+        return "ps -e -o pid=,stat="
+
+    @staticmethod
+    def parse_bulk_status(output):
+        """Parse the output of ps."""
+        return parse_ps_status(output)
 
     def set_job_status(self):
         """Set the job status."""
@@ -789,13 +1318,81 @@ class BatchSubmission(SubmissionBaseClass):
         self.submit_cmd = cmd
 
     def set_jobid(self):
-        """Set job id."""
+        """Set job id.
+
+        The job id is parsed from the captured output of the submit command. If the
+        output is not available, it is read from the submission log.
+
+        Returns:
+            str: Job id.
+
+        """
+        output = self.submit_output
+        if output is None:
+            logfile = self.task.create_submission_log(self.task_settings.joboutdir)
+            with open(logfile, mode="r", encoding="utf-8") as file_handler:
+                output = file_handler.read()
+        self.job_id = self.get_job_id(output)
+        return self.job_id
+
+    def get_job_id(self, output):
+        """Get the job id from the output of the submit command.
+
+        If the backend has the parsable_output capability and the answer is a single
+        word, it is the job id (jobid[;cluster]). Other output is parsed by parse_job_id.
+
+        Args:
+            output (str): Output from the submit command.
+
+        Returns:
+            str: Job id.
+
+        """
+        if backend_supports(self.task_settings.submit_type, "parsable_output"):
+            words = self.get_answer(output).split()
+            if len(words) == 1:
+                return words[0].split(";")[0]
+        return self.parse_job_id(output)
+
+    def parse_job_id(self, output):
+        """Parse the job id from the output of the submit command.
+
+        Args:
+            output (str): Output from the submit command.
+
+        Raises:
+            NotImplementedError: Must be implemented by the batch system.
+
+        """
         raise NotImplementedError
 
+    @staticmethod
+    def get_answer(output):
+        """Get the last non-empty line of the output.
+
+        Args:
+            output (str): Output from the submit command.
+
+        Raises:
+            Exception: If no answer was found.
+
+        Returns:
+            str: The answer.
+
+        """
+        lines = [line.strip() for line in output.splitlines() if line.strip() != ""]
+        if len(lines) == 0:
+            raise Exception("No answer found in submission output")
+        return lines[-1]
+
     def get_logfile(self):
         """Get the logfile."""
         return None
 
+    def bulk_kill_cmd(self, job_ids):
+        """Command killing several jobs."""
+        return self.batch_kill + " " + " ".join(job_ids)
+
     def set_kill_cmd(self):
         """Set kill command."""
         if self.job_id is not None:
@@ -846,26 +1443,40 @@ class PBSSubmission(BatchSubmission):
                                  stat=stat, kill=kill, prefix=prefix)
         self.name = self.name[0:15]
 
-    def set_jobid(self):
-        """Set job id."""
-        logfile = self.task.create_submission_log(self.task_settings.joboutdir)
-        with open(logfile, mode="r", encoding="utf-8") as file_handler:
-            lines = file_handler.readlines()
-
-        answer = None
-        for line in lines:
-            answer = line
-
-        # expected_len = 7
-        expected_len = 1
-        answer = answer.replace("\n", "")
-        words = answer.split(" ")
-        if len(words) == expected_len:
-            # Set job id as the second element in answer
-            self.job_id = str(words[0])
-            # self.job_id = str(words[2])
-        else:
-            raise Exception("Expected " + str(expected_len) + " in output. Got " + str(len(words)))
+    def parse_job_id(self, output):
+        """Parse the job id.
+
+        qsub prints the bare job id, e.g. 12345.server.
+
+        Args:
+            output (str): Output from the submit command.
+
+        Raises:
+            Exception: If the output is not a job id.
+
+        Returns:
+            str: Job id.
+
+        """
+        answer = self.get_answer(output)
+        words = answer.split()
+        if len(words) != 1:
+            raise Exception("Expected a job id in output. Got " + answer)
+        return words[0]
+
+    def bulk_status_cmd(self):
+        """Command listing the state of all jobs of the user."""
+        return "qstat -u $USER"
+
+    @staticmethod
+    def parse_bulk_status(output):
+        """Parse the output of qstat."""
+        return parse_pbs_status(output)
+
+    @staticmethod
+    def bulk_status_key(job_id):
+        """Get the job number, since qstat -u truncates the job ids."""
+        return str(job_id).split(".")[0]
 
     def set_job_name(self):
         """Set job name."""
@@ -880,15 +1491,15 @@ class SlurmSubmission(BatchSubmission):
         BatchSubmission (_type_): _description_
     """
 
-    def __init__(self, task, task_settings, server, sub="sbatch", stat="squeue -j", kill="scancel",
-                 prefix="#SBATCH", db_file=None):
+    def __init__(self, task, task_settings, server, sub="sbatch --parsable", stat="squeue -j",
+                 kill="scancel", prefix="#SBATCH", db_file=None):
         """Construct SlurmSubmission.
 
         Args:
             task (scheduler.EcflowTask): Task.
             task_settings (TaskSettings): Task settings.
             server (scheduler.Server): Server.
-            sub (str, optional): Submission command. Defaults to "sbatch".
+            sub (str, optional): Submission command. Defaults to "sbatch --parsable".
             stat (str, optional): Status command. Defaults to "squeue -j".
             kill (str, optional): Kill command. Defaults to "scancel".
             prefix (str, optional): Slurm prefix. Defaults to "#SBATCH".
@@ -907,35 +1518,56 @@ class SlurmSubmission(BatchSubmission):
         string += self.batch_prefix + " -e " + logfile
         return string
 
-    def set_jobid(self):
-        """Set job id."""
-        logfile = self.task.create_submission_log(self.task_settings.joboutdir)
-        with open(logfile, mode="r", encoding="utf-8") as file_handler:
-            lines = file_handler.readlines()
-
-        answer = None
-        for line in lines:
-            answer = line
-
-        if answer is None:
-            raise Exception("No answer found " + str(lines) + " " + logfile)
-
-        expected_len = 4
-        answer = answer.replace("\n", "")
-        words = answer.split(" ")
-        if len(words) == expected_len:
-            # Set job id as the second element in answer
-            self.job_id = str(words[-1])
-        else:
-            raise Exception("Expected " + str(expected_len) + " in output. Got " + str(len(words)))
+    def parse_job_id(self, output):
+        """Parse the job id.
 
-    def set_submit_cmd(self):
-        """Set submit command."""
+        Handles both sbatch --parsable (jobid[;cluster]) and the default
+        "Submitted batch job jobid" output.
+
+        Args:
+            output (str): Output from the submit command.
+
+        Raises:
+            Exception: If no job id was found.
+
+        Returns:
+            str: Job id.
+
+        """
+        answer = self.get_answer(output)
+        match = SLURM_JOB_ID_PATTERN.search(answer)
+        if match is not None:
+            return match.group(1)
+        words = answer.split()
+        if len(words) != 1:
+            raise Exception("Expected a job id in output. Got " + answer)
+        return words[0].split(";")[0]
+
+    def bulk_status_cmd(self):
+        """Command listing the state of all jobs of the user."""
+        return "squeue -h -u $USER -o \"%i %T\""
+
+    @staticmethod
+    def parse_bulk_status(output):
+        """Parse the output of squeue."""
+        return parse_slurm_status(output)
+
+    def export_args(self):
+        """Get the sbatch arguments exporting the SUBMIT_VARIABLES.
+
+        Returns:
+            str: Arguments.
+
+        """
         submit_vars = ""
         if self.task_settings.submit_variables is not None:
             for key, val in self.task_settings.submit_variables.items():
                 submit_vars = f"--export {key}={val} {submit_vars}"
+        return submit_vars
 
+    def set_submit_cmd(self):
+        """Set submit command."""
+        submit_vars = self.export_args()
         cmd = f"{self.batch_sub} {submit_vars} {self.task_settings.ecf_job_at_host}"
         cmd = self.set_remote_cmd(cmd, self.task_settings.remote_submit_cmd)
         self.submit_cmd = cmd
@@ -945,6 +1577,259 @@ class SlurmSubmission(BatchSubmission):
         string = self.batch_prefix + " -J " + self.name + "\n"
         return string
 
+    def submit_array(self, script, script_at_host, size):
+        """Submit a job array.
+
+        Args:
+            script (str): Array script.
+            script_at_host (str): Array script at the submission host.
+            size (int): Number of tasks in the array.
+
+        Raises:
+            RuntimeError: If the submission failed.
+
+        Returns:
+            str: Job id of the array.
+
+        """
+        submit_vars = self.export_args()
+        cmd = f"{self.batch_sub} --array=0-{size - 1} {submit_vars}{script_at_host}"
+        cmd = self.set_remote_cmd(cmd, self.task_settings.remote_submit_cmd)
+        self.server.update_log("ECF_JOB_CMD: " + cmd)
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 shell=True, check=False)
+        output = process.stdout.decode("utf-8", errors="replace")
+        self.write_log(script + ".sub", output)
+        if process.returncode != 0:
+            raise RuntimeError("Array submit command failed with error code " +
+                               str(process.returncode))
+        return self.get_job_id(output)
+
+
+class SlurmArrayBatcher(object):
+    """Coalesce slurm submissions into job arrays.
+
+    Tasks with identical settings arriving within the ARRAY_WINDOW of the first task
+    are submitted as one sbatch --array job. Each array index runs the job file of one
+    ecflow task and the SUBMISSION_ID of the task is set to jobid_index.
+    """
+
+    def __init__(self, max_size=1000, wait=True):
+        """Construct the batcher.
+
+        Args:
+            max_size (int, optional): Maximum number of tasks in an array. Defaults to 1000.
+            wait (bool, optional): EcflowSubmitTask.submit waits until the batch of the task
+                                   is submitted and raises its submission error.
+                                   Defaults to True.
+
+        """
+        self.max_size = max_size
+        self.wait = wait
+        self.batches = {}
+        self.futures = {}
+        self.timers = {}
+        self.lock = threading.Lock()
+        self.counter = 0
+
+    @staticmethod
+    def accepts(submit_task):
+        """Check if the task can be batched.
+
+        Args:
+            submit_task (EcflowSubmitTask): Submission task.
+
+        Returns:
+            bool: True if the task can be batched.
+
+        """
+        task_settings = submit_task.task_settings
+        return task_settings.array_window is not None and \
+            backend_supports(task_settings.submit_type, "arrays")
+
+    @staticmethod
+    def batch_key(submit_task):
+        """Get the key of tasks which can be submitted in the same array.
+
+        Args:
+            submit_task (EcflowSubmitTask): Submission task.
+
+        Returns:
+            tuple: Key.
+
+        """
+        task_settings = submit_task.task_settings
+        header = tuple((key, str(value)) for key, value in task_settings.header.items()
+                       if key not in ["OUTPUT", "NAME"])
+        submit_variables = None
+        if task_settings.submit_variables is not None:
+            submit_variables = tuple(sorted(task_settings.submit_variables.items()))
+        return (submit_task.sub.batch_sub, task_settings.remote_submit_cmd, task_settings.host,
+                task_settings.joboutdir, task_settings.joboutdir_at_host, header,
+                submit_variables)
+
+    def add(self, submit_task):
+        """Add a task to its batch.
+
+        Args:
+            submit_task (EcflowSubmitTask): Submission task with the job file written.
+
+        Returns:
+            concurrent.futures.Future: Done when the batch is submitted. Holds the submission
+                                       id or the submission error.
+
+        """
+        key = self.batch_key(submit_task)
+        future = Future()
+        flush = False
+        with self.lock:
+            if key not in self.batches:
+                self.batches.update({key: []})
+                self.futures.update({key: []})
+                timer = threading.Timer(submit_task.task_settings.array_window, self.flush,
+                                        args=[key])
+                timer.daemon = True
+                self.timers.update({key: timer})
+                timer.start()
+            self.batches[key].append(submit_task)
+            self.futures[key].append(future)
+            if len(self.batches[key]) >= self.max_size:
+                flush = True
+        if flush:
+            self.flush(key)
+        return future
+
+    def flush(self, key):
+        """Submit a batch.
+
+        Args:
+            key (tuple): Batch key.
+
+        """
+        with self.lock:
+            submit_tasks = self.batches.pop(key, [])
+            futures = self.futures.pop(key, [])
+            timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        if len(submit_tasks) == 0:
+            return
+        try:
+            self.submit_array(submit_tasks)
+        except Exception as error:
+            # Already logged and the tasks aborted. Raised again in the waiting submissions.
+            for future in futures:
+                future.set_exception(error)
+            return
+        for submit_task, future in zip(submit_tasks, futures):
+            future.set_result(submit_task.task.submission_id)
+
+    def flush_all(self):
+        """Submit all pending batches."""
+        with self.lock:
+            keys = list(self.batches.keys())
+        for key in keys:
+            self.flush(key)
+
+    def write_array_script(self, submit_tasks):
+        """Write the job array script.
+
+        Args:
+            submit_tasks (list): Submission tasks.
+
+        Returns:
+            tuple: Script name and script name at the submission host.
+
+        """
+        task_settings = submit_tasks[0].task_settings
+        sub = submit_tasks[0].sub
+        with self.lock:
+            self.counter = self.counter + 1
+            name = f"array.{os.getpid()}.{self.counter}"
+        array_dir = task_settings.joboutdir + "/arrays"
+        array_dir_at_host = task_settings.joboutdir_at_host + "/arrays"
+        os.makedirs(array_dir, exist_ok=True)
+        script = f"{array_dir}/{name}.job"
+        script_at_host = f"{array_dir_at_host}/{name}.job"
+        logfile_at_host = f"{array_dir_at_host}/{name}.%a"
+
+        lines = [
+            "#!/bin/bash\n",
+            f"{sub.batch_prefix} -J {sub.name}\n",
+            f"{sub.batch_prefix} -o {logfile_at_host}\n",
+            f"{sub.batch_prefix} -e {logfile_at_host}\n"
+        ]
+        for key, value in task_settings.header.items():
+            value = str(value)
+            if key not in ["OUTPUT", "NAME"] and value.find("#") >= 0:
+                lines.append(value + "\n")
+        lines.append("\ncase \"$SLURM_ARRAY_TASK_ID\" in\n")
+        for index, submit_task in enumerate(submit_tasks):
+            settings = submit_task.task_settings
+            lines.append(f"  {index}) exec {settings.ecf_job_at_host} > "
+                         f"{settings.ecf_jobout_at_host} 2>&1 ;;\n")
+        lines.append("esac\nexit 1\n")
+
+        with open(script, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("".join(lines))
+        os.chmod(script, stat.S_IRWXU | stat.S_IRGRP | stat.S_IROTH)
+        return script, script_at_host
+
+    @staticmethod
+    def abort(submit_tasks, reason):
+        """Force tasks aborted after a failed submission.
+
+        Args:
+            submit_tasks (list): Submission tasks.
+            reason (str): Text appended to the task name in the server log.
+
+        """
+        for submit_task in submit_tasks:
+            try:
+                submit_task.ecflow_server.update_log(submit_task.task.ecf_name + reason)
+                submit_task.ecflow_server.force_aborted(submit_task.task)
+            except Exception as abort_error:
+                logging.error("Could not abort %s: %s", submit_task.task.ecf_name,
+                              repr(abort_error))
+
+    def submit_array(self, submit_tasks):
+        """Submit tasks as a job array.
+
+        A single task is submitted as a normal job with its already written job file. If
+        the submission fails, all tasks in the array are aborted and the error is raised.
+
+        Args:
+            submit_tasks (list): Submission tasks.
+
+        """
+        first = submit_tasks[0]
+        if len(submit_tasks) == 1:
+            try:
+                first.submit_job_file()
+            except Exception as error:
+                first.sub.join_logs()
+                logging.error("Submission failed: %s", repr(error))
+                self.abort(submit_tasks, " submission failed")
+                raise
+            return
+
+        try:
+            script, script_at_host = self.write_array_script(submit_tasks)
+            job_id = first.sub.submit_array(script, script_at_host, len(submit_tasks))
+            logging.info("Submitted %s tasks as job array %s", len(submit_tasks), job_id)
+        except Exception as error:
+            first.sub.join_logs()
+            logging.error("Array submission failed: %s", repr(error))
+            self.abort(submit_tasks, " array submission failed")
+            raise
+
+        for index, submit_task in enumerate(submit_tasks):
+            submit_task.task.submission_id = f"{job_id}_{index}"
+            submit_task.sub.job_id = submit_task.task.submission_id
+            submit_task.sub.update_db(submit_task.sub.job_id)
+            submit_task.ecflow_server.update_submission_id(submit_task.task)
+        first.sub.join_logs()
+
 
 class GridEngineSubmission(BatchSubmission):
     """Sun Grid Engine (SGE) job submission.
@@ -953,8 +1838,8 @@ class GridEngineSubmission(BatchSubmission):
         BatchSubmission (_type_): _description_
     """
 
-    def __init__(self, task, task_settings, server, db_file=None, sub="qsub", stat="qstat -j",
-                 kill="qdel", prefix="#$"):
+    def __init__(self, task, task_settings, server, db_file=None, sub="qsub -terse",
+                 stat="qstat -j", kill="qdel", prefix="#$"):
         """Construct the GridEngineSubmission object.
 
         Args:
@@ -962,7 +1847,7 @@ class GridEngineSubmission(BatchSubmission):
             task_settings (TaskSettings): Task settings
             server (scheduler.Server): Server.
             db_file (_type_, optional):  Data base for monitoring. Defaults to None.
-            sub (str, optional): Sumission command. Defaults to "qsub".
+            sub (str, optional): Sumission command. Defaults to "qsub -terse".
             stat (str, optional): Status command. Defaults to "qstat -j".
             kill (str, optional): Kill command. Defaults to "qdel".
             prefix (str, optional): SGE prefix. Defaults to "#$".
@@ -979,25 +1864,39 @@ class GridEngineSubmission(BatchSubmission):
         string += self.batch_prefix + " -e " + logfile
         return string
 
-    def set_jobid(self):
-        """Set job id."""
-        # Your job XXXXXX ("name") has been submitted
-        logfile = self.task.create_submission_log(self.task_settings.joboutdir)
-        with open(logfile, mode="r", encoding="utf-8") as file_handler:
-            lines = file_handler.readlines()
-
-        answer = None
-        for line in lines:
-            answer = line
-
-        expected_len = 7
-        answer = answer.replace("\n", "")
-        words = answer.split(" ")
-        if len(words) == expected_len:
-            # Set job id as the second element in answer
-            self.job_id = str(words[2])
-        else:
-            raise Exception("Expected " + str(expected_len) + " in output. Got " + str(len(words)))
+    def parse_job_id(self, output):
+        """Parse the job id.
+
+        Handles both qsub -terse (jobid) and the default
+        "Your job jobid ("name") has been submitted" output.
+
+        Args:
+            output (str): Output from the submit command.
+
+        Raises:
+            Exception: If no job id was found.
+
+        Returns:
+            str: Job id.
+
+        """
+        answer = self.get_answer(output)
+        match = SGE_JOB_ID_PATTERN.search(answer)
+        if match is not None:
+            return match.group(1)
+        words = answer.split()
+        if len(words) != 1:
+            raise Exception("Expected a job id in output. Got " + answer)
+        return words[0]
+
+    def bulk_status_cmd(self):
+        """Command listing the state of all jobs of the user."""
+        return "qstat -u $USER"
+
+    @staticmethod
+    def parse_bulk_status(output):
+        """Parse the output of qstat."""
+        return parse_grid_engine_status(output)
 
     def set_job_name(self):
         """Set job name."""
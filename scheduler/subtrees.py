@@ -0,0 +1,215 @@
+"""Build independent family subtrees of a suite in parallel.
+
+Each builder runs in a worker process and adds nodes below a stand-in for the parent node.
+The ecflow calls of the nodes are recorded instead of executed, and the node wrappers are
+sent back to the main process, where the calls are replayed on the real parent. Triggers
+between subtrees must be given as node paths (EcflowSuiteTrigger accepts a path), and
+SuiteDefinition.finalize() reports paths that are not in the merged suite. Task scripts
+registered in a worker are registered again in the suite of the parent.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from .suites import EcflowNodeContainer, load_ecflow, add_ecf_script, get_ecf_scripts
+
+
+class RecordNode(object):
+    """Record the ecflow calls on a node so they can be replayed."""
+
+    streaming = False
+    string_defstatus = True
+    __slots__ = ("node_name", "path", "calls")
+
+    def __init__(self, name, path):
+        """Construct the node.
+
+        Args:
+            name (str): Name.
+            path (str): Absolute node path.
+
+        """
+        self.node_name = name
+        self.path = path
+        self.calls = []
+
+    def name(self):
+        """Get the name."""
+        return self.node_name
+
+    def get_abs_node_path(self):
+        """Get the absolute node path."""
+        return self.path
+
+    def record(self, method, *args):
+        """Record a call.
+
+        Args:
+            method (str): Name of the ecflow node method.
+            args (tuple): Arguments.
+
+        """
+        self.calls.append((method, args))
+
+    def add_variable(self, name, value):
+        """Add a variable."""
+        self.record("add_variable", name, value)
+
+    def add_trigger(self, trigger):
+        """Add the trigger."""
+        self.record("add_trigger", trigger)
+
+    def delete_trigger(self):
+        """Delete the trigger and the part triggers."""
+        self.record("delete_trigger")
+
+    def add_part_trigger(self, trigger, mode=True):
+        """Add a part trigger."""
+        self.record("add_part_trigger", trigger, mode)
+
+    def add_defstatus(self, defstatus):
+        """Add the default status."""
+        self.record("add_defstatus", str(defstatus))
+
+    def add_limit(self, name, limit):
+        """Add a limit."""
+        self.record("add_limit", name, limit)
+
+    def add_inlimit(self, name, path="", tokens=1):
+        """Add an inlimit."""
+        self.record("add_inlimit", name, path, tokens)
+
+    def add_family(self, name):
+        """Add a family."""
+        return RecordNode(name, self.path + "/" + name)
+
+    def add_task(self, name):
+        """Add a task."""
+        return RecordNode(name, self.path + "/" + name)
+
+    def add_suite(self, name):
+        """Get the stand-in for the parent node of a subtree."""
+        return self
+
+    def replay(self, ecf_node):
+        """Replay the recorded calls on a node.
+
+        Args:
+            ecf_node (ecflow.Node or scheduler.def_writer.StreamNode): Node.
+
+        """
+        for method, args in self.calls:
+            if method == "add_defstatus" and not getattr(ecf_node, "string_defstatus", False):
+                args = (load_ecflow().Defstatus(args[0]),)
+            getattr(ecf_node, method)(*args)
+
+
+class SubtreeRoot(EcflowNodeContainer):
+    """Stand-in for the parent node while a subtree is built in a worker."""
+
+    __slots__ = ("nodes", "ecf_scripts")
+
+    def __init__(self, path):
+        """Construct the stand-in.
+
+        Args:
+            path (str): Absolute path of the parent node.
+
+        """
+        self.nodes = {}
+        self.ecf_scripts = {}
+        EcflowNodeContainer.__init__(self, path.rsplit("/", 1)[-1], "suite",
+                                     RecordNode(path.rsplit("/", 1)[-1], path))
+
+
+def build_subtree(path, builder, args):
+    """Build a subtree in a worker process.
+
+    Args:
+        path (str): Absolute path of the parent node.
+        builder (callable): Function called with the parent node and args.
+        args (tuple): Arguments of the builder.
+
+    Returns:
+        tuple: The top nodes of the subtree and the task scripts registered by it.
+
+    """
+    root = SubtreeRoot(path)
+    builder(root, *args)
+    nodes = list(root.children)
+    for node in nodes:
+        node.parent = None
+    return nodes, root.ecf_scripts
+
+
+def attach_subtree(top, parent):
+    """Add the nodes of a subtree built in a worker below the parent.
+
+    The nodes are added depth first, so the parent can also be streamed. The paths were
+    set in the worker, which built the subtree below a stand-in with the parent path.
+
+    Args:
+        top (scheduler.EcflowNode): Top node of the subtree.
+        parent (scheduler.EcflowNode): Parent node.
+
+    """
+    streaming = getattr(parent.ecf_node, "streaming", False)
+    index = None
+    if not streaming:
+        suite = parent
+        while suite.parent is not None:
+            suite = suite.parent
+        index = suite.nodes
+
+    stack = [(top, parent)]
+    while len(stack) > 0:
+        node, parent = stack.pop()
+        children = node.children
+        node.children = ()
+        node.parent = None
+        if not streaming:
+            node.parent = parent
+            if len(parent.children) == 0:
+                parent.children = []
+            parent.children.append(node)
+            index[node.path] = node
+
+        record = node.ecf_node
+        if node.node_type == "family":
+            node.ecf_node = parent.ecf_node.add_family(node.name)
+        else:
+            node.ecf_node = parent.ecf_node.add_task(node.name)
+        record.replay(node.ecf_node)
+        stack.extend((child, node) for child in reversed(children))
+
+
+def build_subtrees(parent, builders, processes=None):
+    """Build independent family subtrees in a process pool and add them below a node.
+
+    Builders must be picklable, e.g. module level functions. Each builder is called with a
+    stand-in for the parent and its arguments, and adds families and tasks below it. The
+    subtrees are added in the order of the builders.
+
+    Args:
+        parent (scheduler.EcflowNode): Parent node.
+        builders (list): Tuples of a builder and a tuple of its arguments.
+        processes (int, optional): Number of worker processes. Defaults to the number of
+                                   CPUs.
+
+    Returns:
+        list: The top nodes of the subtrees.
+
+    """
+    suite_scripts = get_ecf_scripts(parent)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(build_subtree, parent.path, builder, args)
+                   for builder, args in builders]
+        nodes = []
+        for future in futures:
+            subtree, scripts = future.result()
+            for node in subtree:
+                attach_subtree(node, parent)
+                nodes.append(node)
+            for ecf_files, names in scripts.items():
+                for name in names:
+                    add_ecf_script(suite_scripts, ecf_files, name)
+    logging.debug("Added %s subtrees below %s", len(builders), parent.path)
+    return nodes
@@ -0,0 +1,194 @@
+"""Differences between a suite definition and the suite on the server.
+
+Nodes are compared through snapshots with a content hash of the node and its subtree, so
+unchanged subtrees are skipped with one comparison. Variables and triggers are changed
+with alter. A node is replaced when its type, default status, complete expression, child
+order or other attributes changed, or when a trigger is added to a node without one.
+
+Variables set on the server while the suite runs, like the SUBMISSION_ID of submitted
+tasks, are not compared. Events, meters, labels and limits are compared by name, so their
+current values are ignored. Repeats and time, date, day and cron attributes are compared by
+their definition.
+"""
+import os
+import hashlib
+import logging
+
+
+OTHER_ATTRIBUTES = ["events", "meters", "labels", "limits", "inlimits"]
+TIME_ATTRIBUTES = ["times", "todays", "dates", "days", "crons"]
+RUNTIME_VARIABLES = {"SUBMISSION_ID", "ECF_TRYNO", "ECF_RID", "ECF_PASS", "ECF_NAME", "ECF_JOB",
+                     "ECF_SCRIPT", "ECF_HOST", "ECF_PORT"}
+
+
+class NodeSnapshot(object):
+    """Content of an ecflow node and its subtree."""
+
+    def __init__(self, node, path=None):
+        """Take the snapshot.
+
+        Args:
+            node (ecflow.Node): Suite, family or task of a local or server definition.
+            path (str, optional): Absolute node path. Defaults to None.
+
+        """
+        if path is None:
+            path = node.get_abs_node_path()
+        self.path = path
+        self.name = node.name()
+        self.kind = type(node).__name__.lower()
+        self.variables = {variable.name(): variable.value() for variable in node.variables
+                          if variable.name() not in RUNTIME_VARIABLES}
+        self.trigger = self.expression(node.get_trigger())
+        other = [str(node.get_defstatus())]
+        if hasattr(node, "get_complete"):
+            other.append(self.expression(node.get_complete()))
+        for attribute in OTHER_ATTRIBUTES:
+            other.append(sorted(item.name() for item in getattr(node, attribute, [])))
+        for attribute in TIME_ATTRIBUTES:
+            other.append(sorted(str(item) for item in getattr(node, attribute, [])))
+        if hasattr(node, "get_repeat"):
+            other.append(str(node.get_repeat()))
+        self.other = repr(other)
+        self.children = [NodeSnapshot(child, path + "/" + child.name())
+                         for child in getattr(node, "nodes", [])]
+
+        content = hashlib.sha1()
+        content.update(repr((self.kind, self.name, sorted(self.variables.items()), self.trigger,
+                             self.other)).encode("utf-8"))
+        self.own_digest = content.hexdigest()
+        for child in self.children:
+            content.update(child.digest.encode("utf-8"))
+        self.digest = content.hexdigest()
+
+    @staticmethod
+    def expression(expression):
+        """Get the string of an ecflow expression.
+
+        Args:
+            expression (ecflow.Expression): Expression. Can be None.
+
+        Returns:
+            str: Expression string. None if there is no expression.
+
+        """
+        if expression is None:
+            return None
+        return expression.get_expression()
+
+
+def same_order(local, server):
+    """Check if the children keep their order when new children are added and others deleted.
+
+    New children are added after the existing ones on the server.
+
+    Args:
+        local (NodeSnapshot): Snapshot of the new definition.
+        server (NodeSnapshot): Snapshot of the node on the server.
+
+    Returns:
+        bool: True if the children can be updated one by one.
+
+    """
+    local_names = [child.name for child in local.children]
+    server_names = [child.name for child in server.children]
+    local_set = set(local_names)
+    server_set = set(server_names)
+    kept = [name for name in server_names if name in local_set]
+    added = [name for name in local_names if name not in server_set]
+    return kept + added == local_names
+
+
+def diff_nodes(local, server):
+    """Find the changes turning the server node into the local node.
+
+    Args:
+        local (NodeSnapshot): Snapshot of the new definition.
+        server (NodeSnapshot): Snapshot of the node on the server.
+
+    Returns:
+        list: Changes as tuples of action ("alter", "replace" or "delete"), node path and
+              alter arguments.
+
+    """
+    changes = []
+    stack = [(local, server)]
+    while len(stack) > 0:
+        local, server = stack.pop()
+        if local.digest == server.digest:
+            continue
+        if local.kind != server.kind or local.other != server.other or \
+                not same_order(local, server) or \
+                (local.trigger is not None and server.trigger is None):
+            changes.append(("replace", local.path, ()))
+            continue
+        if local.own_digest != server.own_digest:
+            for name, value in local.variables.items():
+                if name not in server.variables:
+                    changes.append(("alter", local.path, ("add", "variable", name, value)))
+                elif server.variables[name] != value:
+                    changes.append(("alter", local.path, ("change", "variable", name, value)))
+            for name in server.variables:
+                if name not in local.variables:
+                    changes.append(("alter", local.path, ("delete", "variable", name)))
+            if local.trigger is None and server.trigger is not None:
+                changes.append(("alter", local.path, ("delete", "trigger")))
+            elif local.trigger != server.trigger:
+                changes.append(("alter", local.path, ("change", "trigger", local.trigger)))
+        server_children = {child.name: child for child in server.children}
+        for child in local.children:
+            if child.name in server_children:
+                stack.append((child, server_children.pop(child.name)))
+            else:
+                changes.append(("replace", child.path, ()))
+        for child in server_children.values():
+            changes.append(("delete", child.path, ()))
+    return changes
+
+
+def read_digest(hash_file, server=None):
+    """Read the digest of the last deployed definition.
+
+    Args:
+        hash_file (str): Hash file.
+        server (str, optional): Server as host:port. Defaults to None.
+
+    Returns:
+        str: Digest deployed to the server. None if not available.
+
+    """
+    if not os.path.exists(hash_file):
+        return None
+    with open(hash_file, mode="r", encoding="utf-8") as file_handler:
+        for line in file_handler:
+            words = line.split()
+            if server is None and len(words) == 1:
+                return words[0]
+            if len(words) == 2 and words[0] == server:
+                return words[1]
+    return None
+
+
+def write_digest(hash_file, digest, server=None):
+    """Store the digest of the deployed definition.
+
+    The digests deployed to other servers are kept.
+
+    Args:
+        hash_file (str): Hash file.
+        digest (str): Digest.
+        server (str, optional): Server as host:port. Defaults to None.
+
+    """
+    lines = []
+    if server is not None and os.path.exists(hash_file):
+        with open(hash_file, mode="r", encoding="utf-8") as file_handler:
+            lines = [line for line in file_handler
+                     if len(line.split()) == 2 and line.split()[0] != server]
+    if server is None:
+        lines.append(digest + "\n")
+    else:
+        lines.append(server + " " + digest + "\n")
+    with open(hash_file, mode="w", encoding="utf-8") as file_handler:
+        file_handler.write("".join(lines))
+    logging.debug("Stored suite digest %s of %s in %s", digest, server, hash_file)
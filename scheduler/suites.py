@@ -1,10 +1,203 @@
 """Ecflow suites."""
 import os
+import importlib
 import logging
-try:
-    import ecflow
-except ImportError:
-    ecflow = None
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .def_writer import DefWriter
+ecflow = None
+ARCHIVE_EXECUTOR = []
+ARCHIVE_LOCK = threading.Lock()
+ARCHIVES = []
+
+
+def load_ecflow():
+    """Import ecflow on first use.
+
+    Returns:
+        module: The ecflow module. None if ecflow is not installed.
+
+    """
+    global ecflow
+    if ecflow is None:
+        try:
+            ecflow = importlib.import_module("ecflow")
+        except ImportError:
+            return None
+    return ecflow
+
+
+def get_defs(definition):
+    """Get the ecflow definition to load on the client.
+
+    Args:
+        definition (SuiteDefinition, EcflowSuite, ecflow.Defs or str): Definition or def file.
+
+    Returns:
+        ecflow.Defs or str: In-memory definition or the def file. A streamed definition is
+                            closed and its def file returned.
+
+    """
+    if isinstance(definition, SuiteDefinition):
+        definition.finalize()
+        definition = definition.suite.defs
+    elif isinstance(definition, EcflowSuite):
+        prepare_ecf_files(definition)
+        definition = definition.defs
+    if isinstance(definition, DefWriter):
+        definition.close()
+        return definition.def_file
+    return definition
+
+
+def get_suite_name(suite):
+    """Get the name of a suite.
+
+    Args:
+        suite (SuiteDefinition, EcflowSuite or str): Suite or suite name.
+
+    Returns:
+        str: Suite name.
+
+    """
+    if isinstance(suite, SuiteDefinition):
+        return suite.suite.name
+    if isinstance(suite, EcflowSuite):
+        return suite.name
+    return suite
+
+
+def archive_definition(definition, def_file):
+    """Write a def file in a background thread.
+
+    The definition must not be changed before the archival is done.
+
+    Args:
+        definition (SuiteDefinition, EcflowSuite or ecflow.Defs): Definition.
+        def_file (str): Definition file.
+
+    Returns:
+        concurrent.futures.Future: Done when the file is written.
+
+    """
+    with ARCHIVE_LOCK:
+        if len(ARCHIVE_EXECUTOR) == 0:
+            ARCHIVE_EXECUTOR.append(ThreadPoolExecutor(max_workers=1))
+        defs = get_defs(definition)
+        if isinstance(defs, str):
+            future = ARCHIVE_EXECUTOR[0].submit(shutil.copyfile, defs, def_file)
+        else:
+            future = ARCHIVE_EXECUTOR[0].submit(defs.save_as_defs, def_file)
+        ARCHIVES.append(future)
+    logging.debug("Archive definition in %s", def_file)
+    return future
+
+
+def wait_for_archives():
+    """Wait until the def files of archive_definition are written.
+
+    Raises:
+        Exception: Writing a def file failed.
+
+    """
+    with ARCHIVE_LOCK:
+        futures = list(ARCHIVES)
+        ARCHIVES.clear()
+    for future in futures:
+        future.result()
+
+
+def get_ecf_scripts(node):
+    """Get the task scripts registered in the suite of a node.
+
+    Args:
+        node (EcflowNode): Node.
+
+    Returns:
+        dict: Task names for each ECF_FILES directory. None if the suite does not defer the
+              links.
+
+    """
+    while node.parent is not None:
+        node = node.parent
+    if node.node_type == "suite":
+        return getattr(node, "ecf_scripts", None)
+    # Streamed nodes are not kept in the tree
+    return getattr(getattr(node.ecf_node, "writer", None), "ecf_scripts", None)
+
+
+def add_ecf_script(scripts, ecf_files, name):
+    """Register the task script of a task to be linked to default.py by prepare_ecf_files.
+
+    Args:
+        scripts (dict): Task names for each ECF_FILES directory of the suite. If None, the
+                        missing task script is linked now.
+        ecf_files (str): ECF_FILES directory.
+        name (str): Task name.
+
+    """
+    if scripts is not None:
+        scripts.setdefault(ecf_files, set()).add(name)
+        return
+    default_job = ecf_files + "/default.py"
+    task_job = ecf_files + "/" + name + ".py"
+    if not os.path.exists(task_job) and not os.path.islink(task_job):
+        print(default_job + " - > " + task_job)
+        os.symlink(default_job, task_job)
+
+
+def prepare_ecf_files(suite, dry_run=False, workers=8):
+    """Link the missing task scripts of the tasks registered in a suite to default.py.
+
+    Each ECF_FILES directory is listed once and the missing links are created in a thread
+    pool, instead of checking every task script while the suite is built.
+
+    Args:
+        suite (SuiteDefinition or EcflowSuite): Suite.
+        dry_run (bool, optional): Only find the missing task scripts. Defaults to False.
+        workers (int, optional): Threads creating the links. Defaults to 8.
+
+    Raises:
+        Exception: Creating a link failed. The task scripts stay registered.
+
+    Returns:
+        list: The missing task scripts, which are created unless dry_run is set.
+
+    """
+    if isinstance(suite, SuiteDefinition):
+        suite = suite.suite
+    scripts = suite.ecf_scripts
+    if scripts is None:
+        return []
+    default_jobs = []
+    task_jobs = []
+    for ecf_files, names in scripts.items():
+        try:
+            existing = set(os.listdir(ecf_files))
+        except FileNotFoundError:
+            existing = set()
+        default_job = ecf_files + "/default.py"
+        if "default.py" not in existing:
+            logging.warning("Default task script %s is missing", default_job)
+        for name in sorted(names):
+            if name + ".py" not in existing:
+                default_jobs.append(default_job)
+                task_jobs.append(ecf_files + "/" + name + ".py")
+
+    if dry_run:
+        logging.info("%s task scripts are missing", len(task_jobs))
+        return task_jobs
+    if len(task_jobs) > 0:
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(os.symlink, default_jobs, task_jobs))
+        except OSError as exc:
+            raise Exception(f"Could not link task scripts to default.py: {exc}") from exc
+        logging.info("Linked %s task scripts to default.py", len(task_jobs))
+    scripts.clear()
+    return task_jobs
 
 
 class SuiteDefinition(object):
@@ -16,7 +209,8 @@ class SuiteDefinition(object):
 
     def __init__(self, suite_name, joboutdir, ecf_files, env_submit,
                  ecf_home=None, ecf_include=None, ecf_out=None, ecf_jobout=None,
-                 ecf_job_cmd=None, ecf_status_cmd=None, ecf_kill_cmd=None, pythonpath="", path=""):
+                 ecf_job_cmd=None, ecf_status_cmd=None, ecf_kill_cmd=None, pythonpath="", path="",
+                 stream_file=None, defer_ecf_files=True):
         """Construct the definition.
 
         Args:
@@ -33,12 +227,18 @@ class SuiteDefinition(object):
             ecf_kill_cmd (_type_, optional): _description_. Defaults to None.
             pythonpath (str, optional): _description_. Defaults to "".
             path (str, optional): _description_. Defaults to "".
+            stream_file (str, optional): Write the nodes to this def file while the suite is
+                                         built depth first, instead of keeping them in memory.
+                                         Defaults to None.
+            defer_ecf_files (bool, optional): Link the missing task scripts when the suite is
+                                              finalized. If False, they are linked when the
+                                              tasks are created. Defaults to True.
 
         Raises:
             Exception: _description_
 
         """
-        if ecflow is None:
+        if load_ecflow() is None and stream_file is None:
             raise Exception("Ecflow not loaded properly")
 
         name = suite_name
@@ -118,7 +318,144 @@ class SuiteDefinition(object):
             # EcflowSuiteVariable("LOGFILE", self.server_log)
         ]
 
-        self.suite = EcflowSuite(name, variables=variables)
+        self.suite = EcflowSuite(name, variables=variables, stream_file=stream_file,
+                                 defer_ecf_files=defer_ecf_files)
+        self.inlimits = []
+
+    def get_node(self, path):
+        """Get a node of an in-memory suite by its absolute path.
+
+        Args:
+            path (str): Absolute node path.
+
+        Raises:
+            Exception: The suite is streamed or has no node with this path.
+
+        Returns:
+            EcflowNode: The node.
+
+        """
+        if self.suite.nodes is None:
+            raise Exception("Nodes of a streamed suite are not indexed")
+        node = self.suite.nodes.get(path)
+        if node is None:
+            raise Exception(f"No node {path} in suite {self.suite.name}")
+        return node
+
+    def add_triggers(self, path, triggers, mode=True):
+        """Add triggers to a node.
+
+        The triggers become the trigger of a node without one and a part trigger otherwise.
+
+        Args:
+            path (str): Absolute node path.
+            triggers (EcflowSuiteTriggers): The triggers.
+            mode (bool, optional): Combine a part trigger with AND (True) or OR (False).
+                                   Defaults to True.
+
+        """
+        node = self.get_node(path)
+        if node.triggers is None and len(node.part_triggers) == 0:
+            node.set_triggers(triggers)
+        else:
+            node.add_part_trigger(triggers, mode=mode)
+
+    def add_variables(self, path, variables):
+        """Add variables to a node.
+
+        Args:
+            path (str): Absolute node path.
+            variables (EcflowSuiteVariable or list): Variables.
+
+        """
+        node = self.get_node(path)
+        if not isinstance(variables, list):
+            variables = [variables]
+        for var in variables:
+            node.ecf_node.add_variable(var.name, var.value)
+
+    def add_limit(self, path, name, limit):
+        """Add a limit to a node.
+
+        Args:
+            path (str): Absolute node path.
+            name (str): Limit name.
+            limit (int): Number of tasks that can run at the same time.
+
+        """
+        self.get_node(path).ecf_node.add_limit(name, limit)
+
+    def add_inlimit(self, path, name, limit_path, tokens=1):
+        """Restrict a node by a limit.
+
+        Args:
+            path (str): Absolute node path.
+            name (str): Limit name.
+            limit_path (str): Absolute path of the node with the limit.
+            tokens (int, optional): Tokens used by each task. Defaults to 1.
+
+        """
+        self.get_node(path).ecf_node.add_inlimit(name, limit_path, tokens)
+        self.inlimits.append((path, limit_path))
+
+    def missing_references(self):
+        """Find triggers and inlimits referring to nodes that are not in the suite.
+
+        Paths in other suites are not checked.
+
+        Returns:
+            list: Tuples of the node path and the missing path.
+
+        """
+        nodes = self.suite.nodes
+        if nodes is None:
+            return []
+        prefix = self.suite.path + "/"
+        missing = []
+        for path, node in nodes.items():
+            if node.triggers is None and len(node.part_triggers) == 0:
+                continue
+            expressions = [triggers.expression for triggers in node.part_triggers]
+            if node.triggers is not None:
+                expressions.append(node.triggers.expression)
+            for expression in expressions:
+                if isinstance(expression, NodeState):
+                    references = (expression.path,)
+                else:
+                    references = trigger_paths(expression)
+                for reference in references:
+                    if reference not in nodes and reference.startswith(prefix):
+                        missing.append((path, reference))
+        for path, limit_path in self.inlimits:
+            if limit_path.startswith(prefix) and limit_path not in nodes:
+                missing.append((path, limit_path))
+        return missing
+
+    def finalize(self, dry_run=False):
+        """Check the suite and link the task scripts before it is saved or loaded on the server.
+
+        The triggers of an in-memory suite are checked for cycles.
+
+        Args:
+            dry_run (bool, optional): Only find the missing task scripts. Defaults to False.
+
+        Raises:
+            Exception: Triggers or inlimits refer to nodes that are not in the suite, or the
+                       triggers contain a cycle.
+
+        Returns:
+            list: The missing task scripts, which are created unless dry_run is set.
+
+        """
+        missing = self.missing_references()
+        if len(missing) > 0:
+            raise Exception("References to missing nodes:\n" +
+                            "\n".join(f"  {path}: {reference}" for path, reference in missing))
+        if self.suite.nodes is not None:
+            # The graph module imports this module
+            from .graph import TriggerGraph
+            TriggerGraph(self).check()
+        return prepare_ecf_files(self, dry_run=dry_run)
 
     def save_as_defs(self, def_file):
         """Save definition file.
@@ -126,15 +463,24 @@ class SuiteDefinition(object):
         Args:
             def_file (str): Name of definition file
         """
+        self.finalize()
         self.suite.save_as_defs(def_file)
 
 
 class EcflowNode():
     """A Node class is the abstract base class for Suite, Family and Task.
 
-    Every Node instance has a name, and a path relative to a suite
+    Every Node instance has a name, and a path relative to a suite.
+
+    Large suites hold many nodes, so the attributes are kept in slots, names are interned
+    and nodes without children or part triggers share an empty tuple. In-memory nodes keep
+    strong references to their parent, their children and the path index of the suite, so
+    a dropped suite is freed by the cyclic garbage collector. Streamed nodes keep none.
     """
 
+    __slots__ = ("name", "node_type", "children", "part_triggers", "parent", "ecf_node",
+                 "path", "triggers")
+
     def __init__(self, name, node_type, parent, **kwargs):
         """Construct the EcflowNode.
 
@@ -149,8 +495,17 @@ class EcflowNode():
             Exception: _description_
 
         """
-        self.name = name
+        self.name = sys.intern(name)
         self.node_type = node_type
+        self.children = ()
+        self.part_triggers = ()
+        self.parent = None
+        # Streamed nodes are written when done and not kept in the tree
+        if isinstance(parent, EcflowNode) and not getattr(parent.ecf_node, "streaming", False):
+            self.parent = parent
+            if len(parent.children) == 0:
+                parent.children = []
+            parent.children.append(self)
 
         if self.node_type == "family":
             self.ecf_node = parent.ecf_node.add_family(self.name)
@@ -162,6 +517,7 @@ class EcflowNode():
             raise NotImplementedError
 
         self.path = self.ecf_node.get_abs_node_path()
+        self.register()
         triggers = None
         if "triggers" in kwargs:
             triggers = kwargs["triggers"]
@@ -180,8 +536,9 @@ class EcflowNode():
 
         if triggers is not None:
             if isinstance(triggers, EcflowSuiteTriggers):
-                if triggers.trigger_string is not None:
-                    self.ecf_node.add_trigger(triggers.trigger_string)
+                trigger_string = triggers.trigger_string
+                if trigger_string is not None:
+                    self.ecf_node.add_trigger(trigger_string)
                 else:
                     print("WARNING: Empty trigger")
             else:
@@ -190,13 +547,36 @@ class EcflowNode():
 
         if "def_status" in kwargs:
             def_status = kwargs["def_status"]
-            if isinstance(def_status, str):
+            if isinstance(def_status, str) and getattr(self.ecf_node, "string_defstatus", False):
+                self.ecf_node.add_defstatus(def_status)
+            elif isinstance(def_status, str):
                 self.ecf_node.add_defstatus(ecflow.Defstatus(def_status))
-            elif isinstance(def_status, ecflow.Defstatus):
+            elif load_ecflow() is not None and isinstance(def_status, ecflow.Defstatus):
                 self.ecf_node.add_defstatus(def_status)
             else:
                 raise Exception("Unknown defstatus")
 
+    def register(self):
+        """Add the node to the path index of its suite."""
+        if self.parent is not None:
+            suite = self.parent
+            while suite.parent is not None:
+                suite = suite.parent
+            suite.nodes[self.path] = self
+
+    def set_triggers(self, triggers):
+        """Replace the trigger of the node. Part triggers are removed.
+
+        Args:
+            triggers (EcflowSuiteTriggers): The triggers. None to remove the trigger.
+
+        """
+        self.ecf_node.delete_trigger()
+        if triggers is not None and triggers.expression is not None:
+            self.ecf_node.add_trigger(triggers.trigger_string)
+        self.triggers = triggers
+        self.part_triggers = ()
+
     def add_part_trigger(self, triggers, mode=True):
         """Add a part trigger.
 
@@ -209,8 +589,9 @@ class EcflowNode():
 
         """
         if isinstance(triggers, EcflowSuiteTriggers):
-            if triggers.trigger_string is not None:
-                self.ecf_node.add_part_trigger(triggers.trigger_string, mode)
+            if triggers.expression is not None:
+                self.ecf_node.add_part_trigger(triggers.expression.render(enclose=True), mode)
+                self.part_triggers = self.part_triggers + (triggers,)
             else:
                 print("WARNING: Empty trigger")
         else:
@@ -224,6 +605,8 @@ class EcflowNodeContainer(EcflowNode):
         EcflowNode (EcflowNode): Parent class.
     """
 
+    __slots__ = ()
+
     def __init__(self, name, node_type, parent, **kwargs):
         """Construct EcflowNodeContainer.
 
@@ -243,16 +626,35 @@ class EcflowSuite(EcflowNodeContainer):
         EcflowNodeContainer (EcflowNodeContainer): A child of the EcflowNodeContainer class.
     """
 
+    __slots__ = ("defs", "nodes", "ecf_scripts")
+
     def __init__(self, name, **kwargs):
         """Construct the Ecflow suite.
 
+        With a stream_file keyword argument the nodes are written to this def file while the
+        suite is built, instead of kept in an ecflow.Defs. Nodes of an in-memory suite are
+        indexed by path in nodes. The task scripts of the suite are registered in ecf_scripts
+        and linked by prepare_ecf_files, unless defer_ecf_files is False.
+
         Args:
             name (_type_): _description_
 
         """
-        self.defs = ecflow.Defs({})
+        stream_file = kwargs.get("stream_file")
+        self.nodes = None
+        self.ecf_scripts = None
+        if kwargs.get("defer_ecf_files", True):
+            self.ecf_scripts = {}
+        if stream_file is None:
+            self.defs = load_ecflow().Defs({})
+            self.nodes = {}
+        else:
+            self.defs = DefWriter(stream_file)
+            self.defs.ecf_scripts = self.ecf_scripts
 
         EcflowNodeContainer.__init__(self, name, "suite", self.defs, **kwargs)
+        if self.nodes is not None:
+            self.nodes[self.path] = self
 
     def save_as_defs(self, def_file):
         """Save defintion file.
@@ -260,41 +662,288 @@ class EcflowSuite(EcflowNodeContainer):
         Args:
             def_file (str): Name of the definition file.
         """
+        prepare_ecf_files(self)
         self.defs.save_as_defs(def_file)
         logging.info("def file saved to %s", def_file)
 
 
+class TriggerExpression(object):
+    """Node of a trigger expression.
+
+    Expressions are immutable and compare equal when their structure is equal, so
+    identical clauses can be removed. The hash is computed once on construction.
+    """
+
+    operator = None
+    __slots__ = ("operands", "hash")
+
+    def __init__(self, operands):
+        """Construct the expression.
+
+        Args:
+            operands (tuple): Operands.
+
+        """
+        self.operands = operands
+        self.hash = hash((self.operator, operands))
+
+    def __hash__(self):
+        """Get the cached hash."""
+        return self.hash
+
+    def __eq__(self, other):
+        """Compare the structure."""
+        if not isinstance(other, TriggerExpression) or self.hash != other.hash:
+            return False
+        return self.operator == other.operator and self.operands == other.operands
+
+    def __reduce__(self):
+        """Pickle the operands. The hash is computed again when unpickled."""
+        return (type(self), tuple(self.operands))
+
+    def write(self, parts):
+        """Append the rendered expression to a list of strings.
+
+        Args:
+            parts (list): Strings to join.
+
+        """
+        raise NotImplementedError
+
+    def render(self, enclose=False):
+        """Render the expression.
+
+        Args:
+            enclose (bool, optional): Enclose a compound expression in parentheses, e.g. for
+                                      part triggers. Defaults to False.
+
+        Returns:
+            str: Trigger string.
+
+        """
+        parts = []
+        if enclose and isinstance(self, OperatorExpression):
+            parts.append("(")
+            self.write(parts)
+            parts.append(")")
+        else:
+            self.write(parts)
+        return "".join(parts)
+
+    def __str__(self):
+        """Render the expression."""
+        return self.render()
+
+
+class NodeState(TriggerExpression):
+    """Clause on the state of a node, e.g. /suite/task == complete."""
+
+    operator = "=="
+    __slots__ = ()
+
+    def __init__(self, path, state="complete"):
+        """Construct the clause.
+
+        Args:
+            path (str): Node path.
+            state (str, optional): State. Defaults to "complete".
+
+        """
+        TriggerExpression.__init__(self, (path, state))
+
+    @property
+    def path(self):
+        """Node path."""
+        return self.operands[0]
+
+    @property
+    def state(self):
+        """State."""
+        return self.operands[1]
+
+    def write(self, parts):
+        """Append the rendered clause to a list of strings.
+
+        Args:
+            parts (list): Strings to join.
+
+        """
+        parts.append(self.path + " == " + self.state)
+
+
+class Not(TriggerExpression):
+    """Negated expression."""
+
+    operator = "!"
+    __slots__ = ()
+
+    def __init__(self, operand):
+        """Construct the negation.
+
+        Args:
+            operand (TriggerExpression): Negated expression.
+
+        """
+        TriggerExpression.__init__(self, (operand,))
+
+    def write(self, parts):
+        """Append the rendered expression to a list of strings.
+
+        Args:
+            parts (list): Strings to join.
+
+        """
+        parts.append("!(")
+        self.operands[0].write(parts)
+        parts.append(")")
+
+
+class OperatorExpression(TriggerExpression):
+    """Operands joined by an operator.
+
+    Operands of the same operator are flattened into this expression and repeated
+    operands are removed, keeping the first occurrence.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *operands):
+        """Construct the expression.
+
+        Args:
+            operands (TriggerExpression): Operands. None is ignored.
+
+        """
+        flat = []
+        for operand in operands:
+            if operand is None:
+                continue
+            if type(operand) is type(self):
+                flat.extend(operand.operands)
+            else:
+                flat.append(operand)
+        TriggerExpression.__init__(self, tuple(dict.fromkeys(flat)))
+
+    def write(self, parts):
+        """Append the rendered expression to a list of strings.
+
+        Args:
+            parts (list): Strings to join.
+
+        """
+        separator = " " + self.operator + " "
+        for index, operand in enumerate(self.operands):
+            if index > 0:
+                parts.append(separator)
+            if isinstance(operand, OperatorExpression) and len(operand.operands) > 1:
+                parts.append("(")
+                operand.write(parts)
+                parts.append(")")
+            else:
+                operand.write(parts)
+
+
+class And(OperatorExpression):
+    """All operands must be true."""
+
+    operator = "AND"
+    __slots__ = ()
+
+
+class Or(OperatorExpression):
+    """One of the operands must be true."""
+
+    operator = "OR"
+    __slots__ = ()
+
+
+def combine_triggers(operands, mode="AND"):
+    """Combine expressions with an operator.
+
+    Args:
+        operands (list): Expressions. None is ignored.
+        mode (str, optional): "AND" or "OR". Defaults to "AND".
+
+    Raises:
+        Exception: Unknown mode.
+
+    Returns:
+        TriggerExpression: The combined expression. None if there are no operands.
+
+    """
+    if mode.upper() == "AND":
+        expression = And(*operands)
+    elif mode.upper() == "OR":
+        expression = Or(*operands)
+    else:
+        raise Exception("Unknown trigger mode " + mode)
+    if len(expression.operands) == 0:
+        return None
+    if len(expression.operands) == 1:
+        return expression.operands[0]
+    return expression
+
+
+def trigger_paths(expression):
+    """Get the node paths in a trigger expression.
+
+    Args:
+        expression (TriggerExpression): Expression. Can be None.
+
+    Returns:
+        list: Node paths.
+
+    """
+    paths = []
+    stack = [expression]
+    while len(stack) > 0:
+        expression = stack.pop()
+        if isinstance(expression, NodeState):
+            paths.append(expression.path)
+        elif isinstance(expression, TriggerExpression):
+            stack.extend(expression.operands)
+    return paths
+
+
 class EcflowSuiteTriggers():
     """Triggers to an ecflow suite."""
 
+    __slots__ = ("expression",)
+
     def __init__(self, triggers, **kwargs):
         """Construct EcflowSuiteTriggers.
 
         Args:
-            triggers (list): List of EcflowSuiteTrigger objects.
+            triggers (list): List of EcflowSuiteTrigger, EcflowSuiteTriggers or
+                             TriggerExpression objects.
 
         """
         mode = kwargs.get("mode")
         if mode is None:
             mode = "AND"
 
-        trigger_string = self.create_string(triggers, mode)
-        self.trigger_string = trigger_string
+        self.expression = self.create_expression(triggers, mode)
+
+    @property
+    def trigger_string(self):
+        """Rendered trigger expression. None if no triggers were set."""
+        if self.expression is None:
+            return None
+        return self.expression.render()
 
     @staticmethod
-    def create_string(triggers, mode):
-        """Create the trigger string.
+    def create_expression(triggers, mode):
+        """Create the trigger expression.
 
         Args:
             triggers (list): List of trigger objects
             mode     (str): Concatenation type.
 
         Raises:
-            Exception: _description_
-            Exception: _description_
+            Exception: No triggers or a trigger of an unknown type.
 
         Returns:
-            str: The trigger string based on trigger objects.
+            TriggerExpression: The expression. None if all triggers are empty.
 
         """
         if not isinstance(triggers, list):
@@ -303,27 +952,36 @@ class EcflowSuiteTriggers():
         if len(triggers) == 0:
             raise Exception
 
-        trigger_string = "("
-        first = True
+        operands = []
         for trigger in triggers:
-            if trigger is not None:
-                cat = ""
-                if not first:
-                    cat = " " + mode + " "
-                if isinstance(trigger, EcflowSuiteTriggers):
-                    trigger_string = trigger_string + cat + trigger.trigger_string
-                else:
-                    if isinstance(trigger, EcflowSuiteTrigger):
-                        trigger_string = trigger_string + cat + trigger.node.path + " == " +\
-                                                                                    trigger.mode
-                    else:
-                        raise Exception("Trigger must be a Trigger object")
-                first = False
-        trigger_string = trigger_string + ")"
-        # If no triggers were found/set
-        if first:
-            trigger_string = None
-        return trigger_string
+            if trigger is None:
+                continue
+            if isinstance(trigger, EcflowSuiteTriggers):
+                operands.append(trigger.expression)
+            elif isinstance(trigger, EcflowSuiteTrigger):
+                operands.append(NodeState(trigger.path, trigger.mode))
+            elif isinstance(trigger, TriggerExpression):
+                operands.append(trigger)
+            else:
+                raise Exception("Trigger must be a Trigger object")
+        return combine_triggers(operands, mode)
+
+    @staticmethod
+    def create_string(triggers, mode):
+        """Create the trigger string.
+
+        Args:
+            triggers (list): List of trigger objects
+            mode     (str): Concatenation type.
+
+        Returns:
+            str: The trigger string based on trigger objects. None if no triggers were set.
+
+        """
+        expression = EcflowSuiteTriggers.create_expression(triggers, mode)
+        if expression is None:
+            return None
+        return expression.render()
 
     def add_triggers(self, triggers, mode="AND"):
         """Add triggers.
@@ -333,30 +991,39 @@ class EcflowSuiteTriggers():
             mode (str, optional): Cat mode. Defaults to "AND".
 
         """
-        cat_string = " " + mode + " "
-        trigger_string = self.create_string(triggers, mode)
-        if trigger_string is not None:
-            self.trigger_string = self.trigger_string + cat_string + trigger_string
+        expression = self.create_expression(triggers, mode)
+        self.expression = combine_triggers([self.expression, expression], mode)
 
 
 class EcflowSuiteTrigger():
     """EcFlow Trigger in a suite."""
 
+    __slots__ = ("node", "mode")
+
     def __init__(self, node, mode="complete"):
         """Create a EcFlow trigger object.
 
         Args:
-            node (scheduler.EcflowNode): The node to trigger on
+            node (scheduler.EcflowNode or str): The node or the absolute node path to trigger on
             mode (str):
 
         """
         self.node = node
         self.mode = mode
 
+    @property
+    def path(self):
+        """Absolute path of the node to trigger on."""
+        if isinstance(self.node, str):
+            return self.node
+        return self.node.path
+
 
 class EcflowSuiteVariable():
     """A variable in an ecflow suite."""
 
+    __slots__ = ("name", "value")
+
     def __init__(self, name, value):
         """Constuct the EcflowSuiteVariable.
 
@@ -376,6 +1043,8 @@ class EcflowSuiteFamily(EcflowNodeContainer):
         EcflowNodeContainer (_type_): _description_
     """
 
+    __slots__ = ()
+
     def __init__(self, name, parent, **kwargs):
         """Construct the family.
 
@@ -394,6 +1063,8 @@ class EcflowSuiteTask(EcflowNode):
         EcflowNode (EcflowNodeContainer): The node container.
     """
 
+    __slots__ = ()
+
     def __init__(self, name, parent, **kwargs):
         """Constuct the EcflowSuiteTask.
 
@@ -411,9 +1082,5 @@ class EcflowSuiteTask(EcflowNode):
 
             if name == "default":
                 raise Exception("Job should not be called default")
-            else:
-                default_job = ecf_files + "/default.py"
-                task_job = ecf_files + "/" + name + ".py"
-                if not os.path.exists(task_job) and not os.path.islink(task_job):
-                    print(default_job + " - > " + task_job)
-                    os.symlink(default_job, task_job)
+            # Linked to default.py by prepare_ecf_files when the suite is finalized
+            add_ecf_script(get_ecf_scripts(parent), ecf_files, self.name)
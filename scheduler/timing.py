@@ -0,0 +1,307 @@
+"""Timing spans of the submission, kill and status stages.
+
+Spans are recorded when ECF_TIMING_DIR is set (or --timing is given). At exit they are
+appended as JSON lines to spans.jsonl and summed into the Prometheus textfile
+scheduler.prom in that directory. When disabled, span() returns a shared no-op context.
+The daemon records the spans of a request with --timing with a tracer of the request.
+"""
+import os
+import json
+import time
+import fcntl
+import atexit
+import threading
+
+
+TIMING_ENV = "ECF_TIMING_DIR"
+METRIC = "ecf_stage_duration_seconds"
+
+
+class NullSpan(object):
+    """Span doing nothing."""
+
+    def __enter__(self):
+        """Enter."""
+        return self
+
+    def __exit__(self, ex_type, value, tback):
+        """Exit."""
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span(object):
+    """Time a stage."""
+
+    def __init__(self, tracer, name, timings=None, attributes=None):
+        """Construct the span.
+
+        Args:
+            tracer (Tracer): Tracer recording the span. None to only fill timings.
+            name (str): Stage name.
+            timings (dict, optional): Store the duration under name in this dict.
+                                      Defaults to None.
+            attributes (dict, optional): Extra fields of the record. Defaults to None.
+
+        """
+        self.tracer = tracer
+        self.name = name
+        self.timings = timings
+        self.attributes = attributes
+        self.start = None
+
+    def __enter__(self):
+        """Start the span."""
+        self.start = time.time()
+        return self
+
+    def __exit__(self, ex_type, value, tback):
+        """Stop the span."""
+        duration = time.time() - self.start
+        if self.timings is not None:
+            self.timings.update({self.name: duration})
+        if self.tracer is not None:
+            self.tracer.record(self.name, self.start, duration, error=ex_type is not None,
+                               attributes=self.attributes)
+        return False
+
+
+class Tracer(object):
+    """Collect spans and write them at exit."""
+
+    def __init__(self, directory):
+        """Construct the tracer.
+
+        Args:
+            directory (str): Output directory.
+
+        """
+        self.directory = directory
+        self.records = []
+        self.lock = threading.Lock()
+
+    def record(self, name, start, duration, error=False, attributes=None):
+        """Record a span.
+
+        Args:
+            name (str): Stage name.
+            start (float): Start time.
+            duration (float): Duration in seconds.
+            error (bool, optional): The stage raised an exception. Defaults to False.
+            attributes (dict, optional): Extra fields. Defaults to None.
+
+        """
+        record = {"stage": name, "start": start, "duration": duration, "pid": os.getpid(),
+                  "error": error}
+        if attributes is not None:
+            record.update(attributes)
+        with self.lock:
+            self.records.append(record)
+
+    def flush(self):
+        """Write the recorded spans."""
+        with self.lock:
+            records = self.records
+            self.records = []
+        if len(records) == 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        with open(os.path.join(self.directory, "spans.jsonl"), mode="a",
+                  encoding="utf-8") as file_handler:
+            file_handler.write(lines)
+        self.update_textfile(records)
+
+    def update_textfile(self, records):
+        """Add the spans to the sums and counts of the Prometheus textfile.
+
+        Args:
+            records (list): Span records.
+
+        """
+        textfile = os.path.join(self.directory, "scheduler.prom")
+        with open(textfile + ".lock", mode="w", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                metrics = read_textfile(textfile)
+                for record in records:
+                    for suffix, value in [("_sum", record["duration"]), ("_count", 1)]:
+                        key = (METRIC + suffix, record["stage"])
+                        metrics.update({key: metrics.get(key, 0) + value})
+                write_textfile(textfile, metrics)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_textfile(textfile):
+    """Read the stage metrics of a Prometheus textfile.
+
+    Args:
+        textfile (str): Textfile.
+
+    Returns:
+        dict: Values per metric name and stage.
+
+    """
+    metrics = {}
+    if not os.path.exists(textfile):
+        return metrics
+    with open(textfile, mode="r", encoding="utf-8") as file_handler:
+        for line in file_handler:
+            if line.startswith("#") or line.find("{stage=\"") < 0:
+                continue
+            name, rest = line.split("{stage=\"", 1)
+            stage, value = rest.split("\"}", 1)
+            metrics.update({(name, stage): float(value)})
+    return metrics
+
+
+def write_textfile(textfile, metrics):
+    """Write the stage metrics as a Prometheus textfile.
+
+    Args:
+        textfile (str): Textfile.
+        metrics (dict): Values per metric name and stage.
+
+    """
+    lines = [f"# HELP {METRIC} Time spent in the stages of ECF_submit, ECF_kill and "
+             "ECF_status.\n",
+             f"# TYPE {METRIC} summary\n"]
+    for (name, stage), value in sorted(metrics.items()):
+        if name.endswith("_count"):
+            value = int(value)
+        lines.append(f"{name}{{stage=\"{stage}\"}} {value}\n")
+    tmp_file = f"{textfile}.{os.getpid()}.tmp"
+    with open(tmp_file, mode="w", encoding="utf-8") as file_handler:
+        file_handler.write("".join(lines))
+    os.replace(tmp_file, textfile)
+
+
+TRACER = []
+TRACER_LOCK = threading.Lock()
+REQUEST = threading.local()
+
+
+def enable_timing(directory):
+    """Record spans for this process.
+
+    The daemon handles requests in threads, so the tracer is created under a lock.
+
+    Args:
+        directory (str): Output directory.
+
+    """
+    with TRACER_LOCK:
+        if len(TRACER) == 0:
+            TRACER.append(Tracer(directory))
+            atexit.register(TRACER[0].flush)
+
+
+def get_tracer():
+    """Get the tracer of the request handled by this thread or of this process.
+
+    Returns:
+        Tracer: The tracer. None if timing is disabled.
+
+    """
+    tracer = getattr(REQUEST, "tracer", None)
+    if tracer is not None:
+        return tracer
+    if len(TRACER) > 0:
+        return TRACER[0]
+    return None
+
+
+class RequestTiming(object):
+    """Record the spans of the calling thread with a tracer of its own."""
+
+    def __init__(self, directory):
+        """Construct the request timing.
+
+        Args:
+            directory (str): Output directory. None to use the tracer of the process.
+
+        """
+        self.directory = directory
+        self.tracer = None
+
+    def __enter__(self):
+        """Set the tracer of this thread."""
+        if self.directory is not None:
+            self.tracer = Tracer(self.directory)
+        REQUEST.tracer = self.tracer
+        return self
+
+    def __exit__(self, ex_type, value, tback):
+        """Write the spans and unset the tracer of this thread."""
+        REQUEST.tracer = None
+        if self.tracer is not None:
+            self.tracer.flush()
+        return False
+
+
+def span(name, timings=None, **attributes):
+    """Time a stage.
+
+    Args:
+        name (str): Stage name.
+        timings (dict, optional): Store the duration under name in this dict. Defaults to None.
+        attributes: Extra fields of the span record.
+
+    Returns:
+        Span: Context manager.
+
+    """
+    tracer = get_tracer()
+    if tracer is None and timings is None:
+        return NULL_SPAN
+    return Span(tracer, name, timings=timings, attributes=attributes)
+
+
+def process_age():
+    """Seconds since this process started, covering interpreter start-up and imports.
+
+    Returns:
+        float: Process age. None if not available.
+
+    """
+    try:
+        with open("/proc/self/stat", mode="r", encoding="utf-8") as file_handler:
+            start_ticks = float(file_handler.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", mode="r", encoding="utf-8") as file_handler:
+            uptime = float(file_handler.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+def record_startup(**attributes):
+    """Record the process start-up as a span.
+
+    Args:
+        attributes: Extra fields of the span record.
+
+    """
+    tracer = get_tracer()
+    age = process_age()
+    if tracer is not None and age is not None:
+        tracer.record("startup", time.time() - age, age, attributes=attributes)
+
+
+def setup_timing(directory, command):
+    """Enable timing from a command line option and record the start-up.
+
+    Args:
+        directory (str): Output directory. None to use $ECF_TIMING_DIR.
+        command (str): Command name.
+
+    """
+    if directory is not None:
+        enable_timing(directory)
+    record_startup(command=command)
+
+
+if os.environ.get(TIMING_ENV, "") != "":
+    enable_timing(os.environ[TIMING_ENV])
@@ -129,5 +129,7 @@ setup(
         "bin/ECF_submit",
         "bin/ECF_status",
         "bin/ECF_kill",
+        "bin/ECF_daemon",
+        "bin/ECF_bulk_kill",
     ],
 )
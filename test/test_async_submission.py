@@ -0,0 +1,105 @@
+"""Test asynchronous job submission."""
+import unittest
+import os
+import sys
+import time
+import threading
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class AsyncSubmissionTest(unittest.TestCase):
+    """Test asynchronous submission of background jobs."""
+
+    def setUp(self):
+        """Set up tasks with job files."""
+        self.joboutdirs = {"0": "/tmp/host0/job"}
+        self.env_submit = {
+            "submit_types": ["background"],
+            "default_submit_type": "background",
+            "background": {
+                "HOST": "0",
+                "SUBMIT_VARIABLES": {"UNITTEST_ASYNC": "async"}
+            }
+        }
+        os.makedirs("/tmp/host0/job/test_async/", exist_ok=True)
+
+    def get_subs(self, number_of_tasks, script):
+        """Write job files and get submission objects."""
+        subs = []
+        for number in range(0, number_of_tasks):
+            task = scheduler.EcflowTask(f"/test_async/Task{number}", 1, "dummy_password",
+                                        ecf_rid=int(os.getpid()))
+            task_settings = scheduler.TaskSettings(task, self.env_submit, self.joboutdirs)
+            with open(task_settings.ecf_job, mode="w", encoding="utf-8") as file_handler:
+                file_handler.write(script)
+            os.chmod(task_settings.ecf_job, 0o755)
+            subs.append(scheduler.get_async_submission_object(task, task_settings, None))
+        return subs
+
+    def test_submit_status_kill(self):
+        """Submit, check and kill background jobs concurrently."""
+        subs = self.get_subs(4, "#!/bin/sh\necho $UNITTEST_ASYNC\nexec sleep 60\n")
+        engine = scheduler.AsyncSubmissionEngine(max_concurrency=2, timeout=10)
+        for sub in subs:
+            sub.set_submit_cmd()
+        job_ids = engine.submit(subs)
+        self.assertEqual(job_ids, [str(sub.process.pid) for sub in subs])
+
+        for status in engine.status(subs):
+            self.assertNotIsInstance(status, Exception)
+        self.assertEqual(engine.kill(subs), [None, None, None, None])
+        for sub in subs:
+            self.assertEqual(sub.process.wait(timeout=10), -9)
+        with open(subs[0].task_settings.ecf_jobout, mode="r", encoding="utf-8") as file_handler:
+            self.assertTrue(file_handler.read().startswith("async\n"))
+        self.assertTrue(os.path.exists("/tmp/host0/job/test_async/Task3.job1.kill"))
+
+    def test_timeout(self):
+        """Commands are stopped after the timeout."""
+        sub = self.get_subs(1, "#!/bin/sh\n")[0]
+        engine = scheduler.AsyncSubmissionEngine(timeout=0.5)
+        start = time.time()
+        sub.set_job_status = lambda: setattr(sub, "job_status_cmd", "sleep 30")
+        results = engine.status([sub])
+        self.assertIsInstance(results[0], RuntimeError)
+        self.assertLess(time.time() - start, 10)
+        engine.close()
+
+    def test_event_loop(self):
+        """The engine keeps one event loop for its calls."""
+        subs = self.get_subs(2, "#!/bin/sh\nexec sleep 60\n")
+        with scheduler.AsyncSubmissionEngine(timeout=10) as engine:
+            for sub in subs:
+                sub.set_submit_cmd()
+            engine.submit(subs)
+            loop = engine.loop
+            self.assertEqual(engine.kill(subs), [None, None])
+            self.assertIs(engine.loop, loop)
+            self.assertFalse(loop.is_closed())
+        self.assertTrue(loop.is_closed())
+        self.assertIsNone(engine.loop)
+
+    def test_thread(self):
+        """Subprocesses are only started outside of the main thread from Python 3.8."""
+        subs = self.get_subs(1, "#!/bin/sh\n")
+        results = []
+
+        def status():
+            with scheduler.AsyncSubmissionEngine(timeout=10) as engine:
+                try:
+                    results.append(engine.status(subs))
+                except RuntimeError as error:
+                    results.append(error)
+
+        thread = threading.Thread(target=status)
+        thread.start()
+        thread.join()
+        if sys.version_info >= (3, 8):
+            self.assertNotIsInstance(results[0], RuntimeError)
+        else:
+            self.assertIsInstance(results[0], RuntimeError)
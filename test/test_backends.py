@@ -0,0 +1,48 @@
+"""Test the submission backend registry."""
+import unittest
+import os
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class LocalSubmission(scheduler.BackgroundSubmission):
+    """A site specific backend."""
+
+    capabilities = {"bulk_kill": True}
+
+
+class BackendsTest(unittest.TestCase):
+    """Test the backend registry."""
+
+    def test_builtin(self):
+        """Test the built-in backends."""
+        self.assertIs(scheduler.get_backend("SLURM").load(), scheduler.SlurmSubmission)
+        self.assertTrue(scheduler.backend_supports("slurm", "arrays"))
+        self.assertFalse(scheduler.backend_supports("pbs", "arrays"))
+        self.assertTrue(scheduler.backend_supports("background", "bulk_status"))
+        with self.assertRaises(NotImplementedError):
+            scheduler.get_backend("not_existing")
+
+    def test_register(self):
+        """Test a registered site specific backend."""
+        scheduler.register_backend("unittest_local", f"{__name__}:LocalSubmission")
+        self.assertTrue(scheduler.backend_supports("unittest_local", "bulk_kill"))
+        self.assertFalse(scheduler.backend_supports("unittest_local", "arrays"))
+
+        env_submit = {
+            "submit_types": ["local"],
+            "default_submit_type": "local",
+            "local": {
+                "HOST": "0",
+                "SUBMIT_TYPE": "unittest_local"
+            }
+        }
+        task = scheduler.EcflowTask("/test_backends/Task", 1, "dummy_password",
+                                    ecf_rid=int(os.getpid()))
+        task_settings = scheduler.TaskSettings(task, env_submit, {"0": "/tmp/host0/job"})
+        sub = scheduler.get_submission_object(task, task_settings, None)
+        self.assertIsInstance(sub, LocalSubmission)
@@ -0,0 +1,265 @@
+"""Test the submission daemon."""
+import unittest
+import os
+import stat
+import json
+import time
+import threading
+import subprocess
+import io
+import contextlib
+import logging
+import shutil
+import scheduler
+from scheduler import daemon
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class PoolServer(object):
+    """Server in the pool of the daemon recording the calls of the commands."""
+
+    def __init__(self, tasks=None):
+        """Construct the server.
+
+        Args:
+            tasks (list, optional): Tasks returned by get_submitted_tasks. Defaults to None.
+
+        """
+        if tasks is None:
+            tasks = []
+        self.tasks = tasks
+        self.submission_ids = []
+        self.aborted = []
+
+    def get_submitted_tasks(self, node):
+        """Get the submitted tasks."""
+        return [task for task in self.tasks if task.ecf_name.startswith(node)]
+
+    def update_log(self, text):
+        """Ignore log records."""
+
+    def update_submission_id(self, task):
+        """Record the submission id."""
+        self.submission_ids.append(task.submission_id)
+
+    def force_aborted(self, task):
+        """Record an aborted task."""
+        self.aborted.append(task.ecf_name)
+
+    def force_aborted_tasks(self, tasks):
+        """Record aborted tasks."""
+        self.aborted.extend(task.ecf_name for task in tasks)
+
+
+class DaemonTest(unittest.TestCase):
+    """Test the submission daemon."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the daemon in a thread."""
+        cls.socket_path = f"/tmp/unittest_daemon_{os.getpid()}.sock"
+        cls.daemon = scheduler.SubmissionDaemon(cls.socket_path)
+        cls.thread = threading.Thread(target=cls.daemon.serve_forever, daemon=True)
+        cls.thread.start()
+        for __ in range(100):
+            if os.path.exists(cls.socket_path):
+                break
+            time.sleep(0.01)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the daemon."""
+        cls.daemon.shutdown()
+        cls.thread.join()
+
+    def test_ping(self):
+        """Test ping."""
+        response = daemon.send_request(self.socket_path, {"command": "ping"})
+        self.assertEqual(response["status"], "ok")
+
+    def test_unknown_command(self):
+        """Test unknown command."""
+        with self.assertRaises(scheduler.DaemonException):
+            daemon.forward("unknown", {}, socket_path=self.socket_path)
+
+    def test_no_daemon(self):
+        """Test fallback if the daemon is not running."""
+        self.assertFalse(daemon.forward("status", {}, socket_path="/tmp/not_existing.sock"))
+
+    def test_env_submit_cache(self):
+        """Test that submission settings are cached."""
+        env_submit_file = "/tmp/unittest_daemon_env_submit.json"
+        with open(env_submit_file, mode="w", encoding="utf-8") as file_handler:
+            json.dump({"submit_types": ["background"], "default_submit_type": "background"},
+                      file_handler)
+        first = self.daemon.get_env_submit(env_submit_file)
+        second = self.daemon.get_env_submit(env_submit_file)
+        self.assertIs(first, second)
+
+    def test_service_actions(self):
+        """Test the periodic maintenance of the ssh connections."""
+        self.daemon.last_maintained = 0
+        self.daemon.service_actions()
+        self.assertGreater(self.daemon.last_maintained, 0)
+
+    def test_socket_permissions(self):
+        """Test that only the owner can connect to the daemon."""
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_path).st_mode), 0o600)
+
+    def test_bulk_kill(self):
+        """Test that the caller of a forwarded bulk kill gets the result."""
+        env_submit_file = "/tmp/unittest_daemon_bulk_kill_env_submit.json"
+        with open(env_submit_file, mode="w", encoding="utf-8") as file_handler:
+            json.dump({"submit_types": ["background", "broken"],
+                       "default_submit_type": "background",
+                       "background": {"HOST": "0"},
+                       "broken": {"HOST": "0", "SUBMIT_TYPE": "nonexisting",
+                                  "tasks": ["Broken"]}}, file_handler)
+        os.makedirs("/tmp/host0/job/test_daemon_bulk_kill/", exist_ok=True)
+        process = subprocess.Popen(["sleep", "60"])
+        tasks = [
+            scheduler.EcflowTask("/test_daemon_bulk_kill/Task", 1, "dummy_password",
+                                 ecf_rid=int(os.getpid()), submission_id=str(process.pid)),
+            scheduler.EcflowTask("/test_daemon_bulk_kill/Broken", 1, "dummy_password",
+                                 ecf_rid=int(os.getpid()), submission_id="1")
+        ]
+        server = PoolServer(tasks)
+        env_server = "/tmp/unittest_daemon_bulk_kill_server.json"
+        logfile = "/tmp/unittest_daemon_bulk_kill.log"
+        self.daemon.checkin_server(env_server, logfile, server)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            with self.assertRaises(SystemExit) as context:
+                scheduler.bulk_kill_cmd(env_submit=env_submit_file, joboutdir="/tmp/host0/job",
+                                        env_server=env_server, logfile=logfile,
+                                        node="/test_daemon_bulk_kill", dbfile=None,
+                                        socket=self.socket_path, timing=None)
+        self.assertEqual(context.exception.code, 1)
+        self.assertEqual(process.wait(timeout=10), -9)
+        self.assertEqual(server.aborted, ["/test_daemon_bulk_kill/Task"])
+        self.assertEqual(output.getvalue().splitlines()[-1],
+                         "Killed 1 tasks below /test_daemon_bulk_kill. 1 failed.")
+
+    def write_env_submit(self, name):
+        """Write background submission settings.
+
+        Args:
+            name (str): Name of the test.
+
+        Returns:
+            str: File with the settings.
+
+        """
+        env_submit_file = f"/tmp/unittest_daemon_{name}_env_submit.json"
+        with open(env_submit_file, mode="w", encoding="utf-8") as file_handler:
+            json.dump({"submit_types": ["background"], "default_submit_type": "background",
+                       "background": {"HOST": "0"}}, file_handler)
+        return env_submit_file
+
+    def checkin_server(self, name, tasks=None):
+        """Put a recording server in the pool of the daemon.
+
+        Args:
+            name (str): Name of the test.
+            tasks (list, optional): Submitted tasks. Defaults to None.
+
+        Returns:
+            tuple: Server, server settings file and logfile.
+
+        """
+        server = PoolServer(tasks)
+        env_server = f"/tmp/unittest_daemon_{name}_server.json"
+        logfile = f"/tmp/unittest_daemon_{name}.log"
+        self.daemon.checkin_server(env_server, logfile, server)
+        return server, env_server, logfile
+
+    def test_submit(self):
+        """Test a submission in the daemon."""
+        os.makedirs("/tmp/host0/job/test_daemon_submit", exist_ok=True)
+        with open("/tmp/host0/job/test_daemon_submit/Task.job1", mode="w",
+                  encoding="utf-8") as file_handler:
+            file_handler.write("print(\"job\")\n")
+        server, env_server, logfile = self.checkin_server("submit")
+        scheduler.submit_cmd(env_submit=self.write_env_submit("submit"),
+                             joboutdir="/tmp/host0/job", env_server=env_server, logfile=logfile,
+                             ecf_name="/test_daemon_submit/Task", ecf_tryno="1",
+                             ecf_pass="dummy_password", ecf_rid=None, ensmbr=None, dbfile=None,
+                             socket=self.socket_path, timing=None)
+        self.assertEqual(len(server.submission_ids), 1)
+        self.assertEqual(server.aborted, [])
+
+    def test_kill(self):
+        """Test a kill in the daemon."""
+        os.makedirs("/tmp/host0/job/test_daemon_kill", exist_ok=True)
+        process = subprocess.Popen(["sleep", "60"])
+        server, env_server, logfile = self.checkin_server("kill")
+        scheduler.kill_cmd(env_submit=self.write_env_submit("kill"),
+                           joboutdir="/tmp/host0/job", env_server=env_server, logfile=logfile,
+                           ecf_name="/test_daemon_kill/Task", ecf_tryno="1",
+                           ecf_pass="dummy_password", ecf_rid=None,
+                           submission_id=str(process.pid), socket=self.socket_path, timing=None)
+        self.assertEqual(process.wait(timeout=10), -9)
+        self.assertEqual(server.aborted, ["/test_daemon_kill/Task"])
+
+    def test_status(self):
+        """Test a status in the daemon."""
+        os.makedirs("/tmp/host0/job/test_daemon_status", exist_ok=True)
+        process = subprocess.Popen(["sleep", "60"])
+        __, env_server, logfile = self.checkin_server("status")
+        scheduler.status_cmd(env_submit=self.write_env_submit("status"),
+                             joboutdir="/tmp/host0/job", env_server=env_server, logfile=logfile,
+                             ecf_name="/test_daemon_status/Task", ecf_tryno="1",
+                             ecf_pass="dummy_password", ecf_rid=None,
+                             submission_id=str(process.pid), socket=self.socket_path,
+                             timing=None)
+        process.kill()
+        process.wait()
+        with open("/tmp/host0/job/test_daemon_status/Task.job1.stat", mode="r",
+                  encoding="utf-8") as file_handler:
+            self.assertIn(str(process.pid), file_handler.read())
+
+    def test_environment(self):
+        """Test that callers with another environment run the commands in-process."""
+        environ = daemon.get_environment()
+        environ.update({"SBATCH_PARTITION": "unittest_" + str(os.getpid())})
+        response = daemon.send_request(self.socket_path, {"command": "status", "kwargs": {},
+                                                          "environ": environ})
+        self.assertEqual(response["status"], "in_process")
+        self.assertIn("SBATCH_PARTITION", response["message"])
+        response = daemon.send_request(self.socket_path, {"command": "status", "kwargs": {}})
+        self.assertEqual(response["status"], "in_process")
+
+    def test_absolute_paths(self):
+        """Test that file names are resolved in the working directory of the caller."""
+        kwargs = daemon.absolute_paths({"env_submit": "env_submit.json", "joboutdir": "job",
+                                        "dbfile": None, "ecf_name": "/suite/Task"})
+        self.assertEqual(kwargs, {"env_submit": os.path.join(os.getcwd(), "env_submit.json"),
+                                  "joboutdir": os.path.join(os.getcwd(), "job"),
+                                  "dbfile": None, "ecf_name": "/suite/Task"})
+
+    def test_request_timing(self):
+        """Test that the spans of a request are written to the directory of the request."""
+        os.makedirs("/tmp/host0/job/test_daemon_timing", exist_ok=True)
+        __, env_server, logfile = self.checkin_server("timing")
+        kwargs = {"env_submit": self.write_env_submit("timing"), "joboutdir": "/tmp/host0/job",
+                  "env_server": env_server, "logfile": logfile,
+                  "ecf_name": "/test_daemon_timing/Task", "ecf_tryno": "1",
+                  "ecf_pass": "dummy_password", "ecf_rid": None,
+                  "submission_id": str(os.getpid())}
+        directories = [f"/tmp/unittest_daemon_timing_{os.getpid()}_{number}"
+                       for number in range(0, 2)]
+        for directory in directories:
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+
+        for directory in [directories[0], None, directories[1]]:
+            kwargs.update({"timing": directory})
+            self.assertTrue(daemon.forward("status", kwargs, socket_path=self.socket_path))
+        for directory in directories:
+            with open(directory + "/spans.jsonl", mode="r", encoding="utf-8") as file_handler:
+                stages = [json.loads(line)["stage"] for line in file_handler]
+            self.assertEqual(stages.count("status_cmd"), 1)
@@ -0,0 +1,176 @@
+"""Test the submission database."""
+import unittest
+import os
+import signal
+import logging
+import scheduler
+from scheduler import database as submission_database
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class ChildClient(object):
+    """Ecflow client recording the child commands."""
+
+    def __init__(self):
+        """Construct the client."""
+        self.calls = []
+
+    def __getattr__(self, name):
+        """Record a child command."""
+        return lambda *args: self.calls.append(name)
+
+
+class ClientServer(object):
+    """Server of a job."""
+
+    def __init__(self):
+        """Construct the server."""
+        self.ecf_client = ChildClient()
+
+    def update_log(self, text):
+        """Ignore log records."""
+
+    def flush_log(self):
+        """Ignore log records."""
+
+
+class DatabaseTest(unittest.TestCase):
+    """Test the submission database."""
+
+    def setUp(self):
+        """Create an empty database."""
+        self.db_file = f"/tmp/unittest_submissions_{os.getpid()}.db"
+        for fname in [self.db_file, self.db_file + "-wal", self.db_file + "-shm",
+                      self.db_file + ".old"]:
+            if os.path.exists(fname):
+                os.unlink(fname)
+        submission_database.DATABASES.pop(self.db_file, None)
+        signals = [signal.SIGINT, signal.SIGHUP, signal.SIGTERM, signal.SIGUSR1, signal.SIGUSR2,
+                   signal.SIGPIPE]
+        self.handlers = {signum: signal.getsignal(signum) for signum in signals}
+
+    def tearDown(self):
+        """Restore the signal handlers of the ecflow client."""
+        for signum, handler in self.handlers.items():
+            signal.signal(signum, handler)
+
+    def test_queries(self):
+        """Record submissions and query them by job id and suite path."""
+        database = scheduler.SubmissionDatabase(self.db_file)
+        database.record_submission("/suite/fam/Task1", 1, "101", submit_type="slurm", host="1",
+                                   timings={"submit_cmd": 0.5})
+        database.record_submission("/suite/fam/Task1", 2, "102", submit_type="slurm", host="1")
+        database.record_submission("/suite/fam2/Task2", 1, "103")
+        database.record_submission("/suite/fam/Task3", 1, "104")
+        database.record_submission("/other/fam/Task1", 1, "105")
+
+        submission = database.get("/suite/fam/Task1", 1)
+        self.assertEqual(submission["job_id"], "101")
+        self.assertEqual(submission["timings"], {"submit_cmd": 0.5})
+        self.assertEqual(database.find_job("102")[0]["tryno"], 2)
+
+        below = database.find_below("/suite/fam")
+        self.assertEqual([row["job_id"] for row in below], ["102", "104"])
+        self.assertEqual(len(database.find_below("/suite")), 3)
+
+        database.update_state("/suite/fam/Task3", 1, "killed", ended=True)
+        self.assertEqual([row["job_id"] for row in database.find_below("/suite/fam",
+                                                                      states=["killed"])],
+                         ["104"])
+        self.assertIsNotNone(database.get("/suite/fam/Task3", 1)["end_time"])
+        database.delete("/suite/fam/Task3", 1)
+        self.assertIsNone(database.get("/suite/fam/Task3", 1))
+
+    def test_old_format(self):
+        """An old text database is moved away."""
+        with open(self.db_file, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("12345\n")
+        database = scheduler.SubmissionDatabase(self.db_file)
+        self.assertTrue(os.path.exists(self.db_file + ".old"))
+        self.assertEqual(database.find_job("12345"), [])
+
+    def test_background_submission(self):
+        """Background submissions are recorded."""
+        env_submit = {
+            "submit_types": ["background"],
+            "default_submit_type": "background",
+            "background": {
+                "HOST": "0"
+            }
+        }
+        os.makedirs("/tmp/host0/job/test_database/", exist_ok=True)
+        task = scheduler.EcflowTask("/test_database/Task", 1, "dummy_password",
+                                    ecf_rid=int(os.getpid()))
+        task_settings = scheduler.TaskSettings(task, env_submit, {"0": "/tmp/host0/job"})
+        sub = scheduler.get_submission_object(task, task_settings, None, db_file=self.db_file)
+        sub.update_db("4242")
+        sub.update_db_state("killed")
+        submission = scheduler.get_database(self.db_file).get("/test_database/Task", 1)
+        self.assertEqual(submission["submit_type"], "background")
+        self.assertEqual(submission["state"], "killed")
+        sub.clear_db()
+        self.assertIsNone(scheduler.get_database(self.db_file).get("/test_database/Task", 1))
+
+    def test_client(self):
+        """The ecflow client records the start, end and exit status of the jobs."""
+        database = scheduler.get_database(self.db_file)
+        database.clear()
+        for ecf_name in ["/suite/fam/Task1", "/suite/fam/Task2"]:
+            database.record_submission(ecf_name, 1, "101")
+        server = ClientServer()
+
+        task = scheduler.EcflowTask("/suite/fam/Task1", 1, "dummy_password", ecf_rid=None)
+        with scheduler.EcflowClient(server, task, db_file=self.db_file):
+            submission = database.get("/suite/fam/Task1", 1)
+            self.assertEqual(submission["state"], "active")
+            self.assertIsNotNone(submission["start_time"])
+            self.assertIsNone(submission["end_time"])
+        submission = database.get("/suite/fam/Task1", 1)
+        self.assertEqual(submission["state"], "complete")
+        self.assertEqual(submission["exit_status"], 0)
+        self.assertGreaterEqual(submission["end_time"], submission["start_time"])
+
+        task = scheduler.EcflowTask("/suite/fam/Task2", 1, "dummy_password", ecf_rid=None)
+        with self.assertRaises(SystemExit):
+            with scheduler.EcflowClient(server, task, db_file=self.db_file):
+                raise SystemExit(3)
+        submission = database.get("/suite/fam/Task2", 1)
+        self.assertEqual(submission["state"], "aborted")
+        self.assertEqual(submission["exit_status"], 3)
+        self.assertEqual(server.ecf_client.calls.count("child_abort"), 1)
+
+        self.assertEqual(list(scheduler.historical_durations(database, "/suite").keys()),
+                         ["/suite/fam/Task1"])
+
+    def test_shared(self):
+        """A database on a network file system uses the rollback journal."""
+        mounts = f"/tmp/unittest_mounts_{os.getpid()}"
+        with open(mounts, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("/dev/vda / ext4 rw 0 0\n"
+                               "server:/export /tmp/unittest\\040shared nfs4 rw 0 0\n")
+        self.assertEqual(submission_database.get_file_system("/tmp/submissions.db",
+                                                             mounts=mounts), "ext4")
+        self.assertFalse(submission_database.is_shared("/tmp/submissions.db", mounts=mounts))
+        self.assertTrue(submission_database.is_shared("/tmp/unittest shared/sub/submissions.db",
+                                                      mounts=mounts))
+        self.assertIsNone(submission_database.get_file_system("/tmp/submissions.db",
+                                                              mounts=mounts + ".missing"))
+
+        database = scheduler.SubmissionDatabase(self.db_file, shared=True)
+        journal_mode = database.connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "delete")
+        database.connection().close()
+        database = scheduler.SubmissionDatabase(self.db_file, shared=False)
+        journal_mode = database.connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
+        database.connection().close()
+
+    def test_client_on_other_host(self):
+        """A job does not create a database which is not on its host."""
+        task = scheduler.EcflowTask("/suite/fam/Task1", 1, "dummy_password", ecf_rid=None)
+        with scheduler.EcflowClient(ClientServer(), task, db_file=self.db_file) as client:
+            self.assertIsNotNone(client)
+        self.assertFalse(os.path.exists(self.db_file))
@@ -0,0 +1,89 @@
+"""Test streaming suite definitions."""
+import unittest
+import os
+import logging
+import scheduler
+from scheduler import def_writer, subtrees
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class DefWriterTest(unittest.TestCase):
+    """Test streaming suite definitions."""
+
+    def test_stream(self):
+        """Test streaming a suite."""
+        os.makedirs("/tmp/host1/test_def_writer", exist_ok=True)
+        def_file = "/tmp/host1/test_def_writer/stream.def"
+        suite = scheduler.EcflowSuite("stream", stream_file=def_file,
+                                      variables=scheduler.EcflowSuiteVariable("ECF_TRIES", 1))
+        family = scheduler.EcflowSuiteFamily("Family", suite, def_status="complete")
+        task1 = scheduler.EcflowSuiteTask("Task1", family)
+        triggers = scheduler.EcflowSuiteTriggers(scheduler.EcflowSuiteTrigger(task1))
+        scheduler.EcflowSuiteTask("Task2", family, triggers=triggers)
+        last = scheduler.EcflowSuiteTask("Last", suite)
+        last.add_part_trigger(triggers, mode=False)
+
+        with self.assertRaises(Exception):
+            scheduler.EcflowSuiteTask("Late", family)
+
+        suite.save_as_defs(def_file)
+        with open(def_file, mode="r", encoding="utf-8") as file_handler:
+            self.assertEqual(file_handler.read(),
+                             "suite stream\n"
+                             "  edit ECF_TRIES '1'\n"
+                             "  family Family\n"
+                             "    defstatus complete\n"
+                             "    task Task1\n"
+                             "    task Task2\n"
+                             "      trigger /stream/Family/Task1 == complete\n"
+                             "  endfamily\n"
+                             "  task Last\n"
+                             "    trigger -o /stream/Family/Task1 == complete\n"
+                             "endsuite\n")
+        self.assertEqual(scheduler.suites.get_defs(suite), def_file)
+
+    def test_invalid_attributes(self):
+        """Test values that can not be streamed."""
+        os.makedirs("/tmp/host1/test_def_writer", exist_ok=True)
+        def_file = "/tmp/host1/test_def_writer/invalid.def"
+        suite = scheduler.EcflowSuite("invalid", stream_file=def_file)
+        scheduler.EcflowSuiteTask("Quoted", suite, variables=[
+            scheduler.EcflowSuiteVariable("SINGLE", "it's"),
+            scheduler.EcflowSuiteVariable("DOUBLE", "\"quoted\"")
+        ])
+        with self.assertRaises(Exception) as context:
+            scheduler.EcflowSuiteTask("Both", suite, variables=scheduler.EcflowSuiteVariable(
+                "BOTH", "it's \"quoted\""))
+        self.assertIn("BOTH", str(context.exception))
+        with self.assertRaises(Exception) as context:
+            scheduler.EcflowSuiteTask("Status", suite, def_status=1)
+        self.assertEqual(str(context.exception), "Unknown defstatus")
+
+        suite.save_as_defs(def_file)
+        with open(def_file, mode="r", encoding="utf-8") as file_handler:
+            content = file_handler.read()
+        self.assertIn("    edit SINGLE \"it's\"\n", content)
+        self.assertIn("    edit DOUBLE '\"quoted\"'\n", content)
+
+    def test_limits(self):
+        """Test limits replayed from a subtree on a streamed node."""
+        os.makedirs("/tmp/host1/test_def_writer", exist_ok=True)
+        def_file = "/tmp/host1/test_def_writer/limits.def"
+        writer = def_writer.DefWriter(def_file)
+        suite = writer.add_suite("limits")
+        record = subtrees.RecordNode("limits", "/limits")
+        record.add_limit("serial", 1)
+        record.add_inlimit("serial", "/limits", 2)
+        record.add_inlimit("local")
+        record.replay(suite)
+        writer.close()
+        with open(def_file, mode="r", encoding="utf-8") as file_handler:
+            self.assertEqual(file_handler.read(),
+                             "suite limits\n"
+                             "  limit serial 1\n"
+                             "  inlimit /limits:serial 2\n"
+                             "  inlimit local 1\n"
+                             "endsuite\n")
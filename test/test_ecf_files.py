@@ -0,0 +1,78 @@
+"""Test the preparation of task scripts."""
+import unittest
+import os
+import shutil
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class EcfFilesTest(unittest.TestCase):
+    """Test the preparation of task scripts."""
+
+    def test_prepare(self):
+        """Test that task scripts are linked when the suite is finalized."""
+        directory = "/tmp/host1/test_ecf_files"
+        ecf_files = directory + "/ecf"
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(ecf_files)
+        for script in ["default.py", "Task1.py"]:
+            with open(ecf_files + "/" + script, mode="w", encoding="utf-8") as file_handler:
+                file_handler.write("print(\"Task\")\n")
+
+        def_file = directory + "/test_ecf_files.def"
+        defs = scheduler.SuiteDefinition("test_ecf_files", directory, ecf_files,
+                                         "env_submit.json", stream_file=def_file)
+        family = scheduler.EcflowSuiteFamily("Family", defs.suite)
+        for name in ["Task1", "Task2", "Task3", "Task2"]:
+            scheduler.EcflowSuiteTask(name, family, ecf_files=ecf_files)
+        with self.assertRaises(Exception):
+            scheduler.EcflowSuiteTask("default", family, ecf_files=ecf_files)
+        self.assertFalse(os.path.islink(ecf_files + "/Task2.py"))
+
+        missing = [ecf_files + "/Task2.py", ecf_files + "/Task3.py"]
+        self.assertEqual(defs.finalize(dry_run=True), missing)
+        self.assertFalse(os.path.islink(ecf_files + "/Task2.py"))
+
+        self.assertEqual(defs.finalize(), missing)
+        self.assertEqual(os.readlink(ecf_files + "/Task3.py"), ecf_files + "/default.py")
+        self.assertFalse(os.path.islink(ecf_files + "/Task1.py"))
+        self.assertEqual(scheduler.prepare_ecf_files(defs, dry_run=True), [])
+        defs.save_as_defs(def_file)
+
+    def test_suites(self):
+        """Test that finalizing a suite only links the task scripts of this suite."""
+        directory = "/tmp/host1/test_ecf_files_suites"
+        shutil.rmtree(directory, ignore_errors=True)
+        suites = []
+        for name in ["Suite1", "Suite2"]:
+            ecf_files = directory + "/" + name
+            os.makedirs(ecf_files)
+            defs = scheduler.SuiteDefinition(name, directory, ecf_files, "env_submit.json",
+                                             stream_file=directory + "/" + name + ".def")
+            scheduler.EcflowSuiteTask("Task", defs.suite, ecf_files=ecf_files)
+            suites.append(defs)
+
+        suites[0].finalize()
+        self.assertTrue(os.path.islink(directory + "/Suite1/Task.py"))
+        self.assertFalse(os.path.islink(directory + "/Suite2/Task.py"))
+        self.assertEqual(suites[1].finalize(dry_run=True), [directory + "/Suite2/Task.py"])
+        for defs in suites:
+            defs.save_as_defs(directory + "/" + defs.suite.name + ".def")
+
+    def test_not_deferred(self):
+        """Test that task scripts are linked when the task is created."""
+        directory = "/tmp/host1/test_ecf_files_not_deferred"
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        defs = scheduler.SuiteDefinition("test_ecf_files_not_deferred", directory, directory,
+                                         "env_submit.json", stream_file=directory + "/suite.def",
+                                         defer_ecf_files=False)
+        family = scheduler.EcflowSuiteFamily("Family", defs.suite)
+        scheduler.EcflowSuiteTask("Task", family, ecf_files=directory)
+        self.assertEqual(os.readlink(directory + "/Task.py"), directory + "/default.py")
+        self.assertEqual(defs.finalize(), [])
+        defs.save_as_defs(directory + "/suite.def")
@@ -187,3 +187,14 @@ class EcflowTest(unittest.TestCase):
             with scheduler.EcflowClient(server, task):
                 print("Running task ")
                 raise Exception("This should be failing!")
+
+    def test_archive_definition(self):
+        """Test archiving an in-memory definition."""
+        def_file = "unittest_test_archive.def"
+        if os.path.exists(def_file):
+            os.remove(def_file)
+        suite = scheduler.EcflowSuite("test_archive")
+        scheduler.EcflowSuiteTask("My_task", suite)
+        scheduler.archive_definition(suite, def_file)
+        scheduler.wait_for_archives()
+        self.assertTrue(os.path.exists(def_file))
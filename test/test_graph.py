@@ -0,0 +1,71 @@
+"""Test trigger graph analysis."""
+import unittest
+import os
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class GraphTest(unittest.TestCase):
+    """Test trigger graph analysis."""
+
+    @staticmethod
+    def get_suite():
+        """Create a suite with a redundant trigger.
+
+        Returns:
+            scheduler.SuiteDefinition: Suite definition.
+
+        """
+        joboutdir = "/tmp/host1/job/"
+        ecf_files = "/tmp/host1/test_graph/ecf/"
+        os.makedirs(ecf_files, exist_ok=True)
+        defs = scheduler.SuiteDefinition("test_graph", joboutdir, ecf_files, "env_submit.json")
+        task_a = scheduler.EcflowSuiteTask("A", defs.suite)
+        trigger_a = scheduler.EcflowSuiteTriggers(scheduler.EcflowSuiteTrigger(task_a))
+        task_b = scheduler.EcflowSuiteTask("B", defs.suite, triggers=trigger_a)
+        family = scheduler.EcflowSuiteFamily("Family", defs.suite, triggers=trigger_a)
+        trigger_ab = scheduler.EcflowSuiteTriggers([scheduler.EcflowSuiteTrigger(task_a),
+                                                    scheduler.EcflowSuiteTrigger(task_b)])
+        scheduler.EcflowSuiteTask("C", defs.suite, triggers=trigger_ab)
+        scheduler.EcflowSuiteTask("D", family, triggers=trigger_a)
+        return defs
+
+    def test_redundant_triggers(self):
+        """Test transitive reduction."""
+        defs = self.get_suite()
+        graph = scheduler.TriggerGraph(defs)
+        graph.check()
+        self.assertEqual(sorted(graph.redundant_triggers()),
+                         [("/test_graph/C", "/test_graph/A"),
+                          ("/test_graph/Family/D", "/test_graph/A")])
+        graph.remove_redundant_triggers()
+        nodes = {node.path: node for node in graph.nodes}
+        self.assertEqual(nodes["/test_graph/C"].triggers.trigger_string,
+                         "/test_graph/B == complete")
+        self.assertIsNone(nodes["/test_graph/Family/D"].triggers)
+        self.assertEqual(graph.redundant_triggers(), [])
+
+    def test_critical_path(self):
+        """Test the critical path."""
+        defs = self.get_suite()
+        graph = scheduler.TriggerGraph(defs)
+        length, chain = graph.critical_path({"/test_graph/A": 10.0, "/test_graph/Family/D": 30.0})
+        self.assertEqual(length, 40.0)
+        self.assertEqual(chain, ["/test_graph/A", "/test_graph/Family/D"])
+
+    def test_cycle(self):
+        """Test cycle detection."""
+        defs = self.get_suite()
+        family = scheduler.EcflowSuiteFamily("Cycle", defs.suite)
+        triggers = scheduler.EcflowSuiteTriggers(scheduler.NodeState("/test_graph/Cycle"))
+        scheduler.EcflowSuiteTask("E", family, triggers=triggers)
+        graph = scheduler.TriggerGraph(defs)
+        self.assertEqual(len(graph.find_cycles()), 1)
+        with self.assertRaises(Exception):
+            graph.check()
+        with self.assertRaises(Exception):
+            defs.finalize(dry_run=True)
@@ -0,0 +1,97 @@
+"""Test the start-up time of the command line tools."""
+import unittest
+import os
+import sys
+import subprocess
+import json
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ["ECF_submit", "ECF_kill", "ECF_status", "ECF_daemon", "ECF_bulk_kill"]
+# Import budget in seconds. Override with ECF_IMPORT_BUDGET on slow machines.
+IMPORT_BUDGET = float(os.environ.get("ECF_IMPORT_BUDGET", "0.5"))
+
+
+def import_times(script, args=None):
+    """Run a script with -X importtime.
+
+    Args:
+        script (str): Script.
+        args (list, optional): Arguments. Defaults to ["--version"].
+
+    Returns:
+        dict: Cumulative import time in microseconds of the top level imports.
+
+    """
+    if args is None:
+        args = ["--version"]
+    env = dict(os.environ)
+    env.update({"PYTHONPATH": ROOT + os.pathsep + env.get("PYTHONPATH", "")})
+    env.pop("ECF_SUBMISSION_SOCKET", None)
+    process = subprocess.run([sys.executable, "-X", "importtime", script] + args,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                             check=True)
+    times = {}
+    for line in process.stderr.decode("utf-8").splitlines():
+        if not line.startswith("import time:") or line.find("cumulative") > 0:
+            continue
+        __, cumulative, module = line.split("|")
+        # Nested imports are indented
+        if not module.startswith("  "):
+            times.update({module.strip(): int(cumulative)})
+    return times
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "Lazy imports need python 3.7")
+class ImportTimeTest(unittest.TestCase):
+    """Test import times of the bin entry points."""
+
+    def test_entry_points(self):
+        """The entry points do not load ecflow or unused modules and stay in budget."""
+        for entry_point in ENTRY_POINTS:
+            times = import_times(os.path.join(ROOT, "bin", entry_point))
+            logging.info("%s imports: %s", entry_point, times)
+            for module in ["ecflow", "scheduler.scheduler", "scheduler.suites",
+                           "scheduler.submission"]:
+                self.assertNotIn(module, times, msg=entry_point)
+            self.assert_budget(times, entry_point)
+
+    def test_dry_run(self):
+        """A status or kill which does not contact the server does not load ecflow."""
+        env_submit = "/tmp/unittest_import_time_env_submit.json"
+        with open(env_submit, mode="w", encoding="utf-8") as file_handler:
+            json.dump({"submit_types": ["background"], "default_submit_type": "background",
+                       "background": {"HOST": "0"}}, file_handler)
+        env_server = "/tmp/unittest_import_time_server.json"
+        with open(env_server, mode="w", encoding="utf-8") as file_handler:
+            json.dump({"ECF_HOST": "localhost"}, file_handler)
+        args = ["-sub", env_submit, "-dir", "/tmp/host0/job", "-server", env_server,
+                "--log", "/tmp/unittest_import_time.log", "-ecf_name", "/test_import/Task",
+                "-ecf_tryno", "1", "-ecf_pass", "dummy_password", "-submission_id", "1",
+                "--dry-run"]
+        server = scheduler.EcflowServerFromFile(env_server, "/tmp/unittest_import_time.log")
+        self.assertIsNone(server.client)
+        for entry_point in ["ECF_status", "ECF_kill"]:
+            times = import_times(os.path.join(ROOT, "bin", entry_point), args=args)
+            logging.info("%s --dry-run imports: %s", entry_point, times)
+            self.assertNotIn("ecflow", times, msg=entry_point)
+            self.assert_budget(times, entry_point)
+
+    def assert_budget(self, times, entry_point):
+        """Check that the imports of the package stay in budget.
+
+        Args:
+            times (dict): Cumulative import times of the top level imports.
+            entry_point (str): Entry point.
+
+        """
+        modules = list(times.keys())
+        self.assertIn("scheduler", modules)
+        # Only count the imports from the package on, not the interpreter start-up
+        total = sum(times[module] for module in modules[modules.index("scheduler"):])
+        self.assertLess(total, IMPORT_BUDGET * 1e6, msg=entry_point)
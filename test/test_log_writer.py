@@ -0,0 +1,78 @@
+"""Test the buffered server log writer."""
+import unittest
+import os
+import re
+import time
+import logging
+from scheduler.log_writer import BufferedLogWriter
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class LogWriterTest(unittest.TestCase):
+    """Test the buffered log writer."""
+
+    def setUp(self):
+        """Remove old logs."""
+        self.logfile = f"/tmp/unittest_log_writer_{os.getpid()}.log"
+        for fname in [self.logfile, self.logfile + ".1"]:
+            if os.path.exists(fname):
+                os.unlink(fname)
+
+    def read(self):
+        """Read the log."""
+        with open(self.logfile, mode="r", encoding="utf-8") as file_handler:
+            return file_handler.read()
+
+    def test_buffering(self):
+        """Records are written on flush in the time stamped format."""
+        writer = BufferedLogWriter(self.logfile, flush_interval=60)
+        writer.write("/suite/family/task")
+        writer.write(12345)
+        self.assertFalse(os.path.exists(self.logfile))
+        writer.flush()
+        lines = self.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertRegex(lines[0], r"^\[\d\d:\d\d:\d\d \d\d\.\d\d\.\d{4}\] /suite/family/task$")
+        self.assertTrue(lines[1].endswith("] 12345"))
+        writer.close()
+
+    def test_flush_interval(self):
+        """Records are flushed after the flush interval."""
+        writer = BufferedLogWriter(self.logfile, flush_interval=0.1)
+        writer.write("record")
+        content = ""
+        for __ in range(100):
+            if os.path.exists(self.logfile):
+                content = self.read()
+                if content.endswith("\n"):
+                    break
+            time.sleep(0.05)
+        self.assertTrue(re.search("record", content))
+        writer.close()
+
+    def test_rotation(self):
+        """The log is rotated when it exceeds the maximum size."""
+        writer = BufferedLogWriter(self.logfile, buffer_size=1, max_bytes=100)
+        for number in range(0, 10):
+            writer.write(f"record {number}")
+        writer.close()
+        self.assertTrue(os.path.exists(self.logfile + ".1"))
+        self.assertLess(os.path.getsize(self.logfile), 100)
+
+    def test_rotation_by_other_process(self):
+        """A writer reopens the log after another process rotated it."""
+        other = BufferedLogWriter(self.logfile, buffer_size=1, max_bytes=100)
+        writer = BufferedLogWriter(self.logfile, buffer_size=1, max_bytes=100)
+        writer.write("first record")
+        for number in range(0, 5):
+            other.write(f"record {number} of the other process")
+        self.assertTrue(os.path.exists(self.logfile + ".1"))
+        writer.write("second record")
+        writer.close()
+        other.close()
+        self.assertTrue(self.read().endswith("] second record\n"))
+        with open(self.logfile + ".1", mode="r", encoding="utf-8") as file_handler:
+            self.assertNotIn("second record", file_handler.read())
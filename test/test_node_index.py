@@ -0,0 +1,67 @@
+"""Test the path index of suite definitions."""
+import unittest
+import os
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class NodeIndexTest(unittest.TestCase):
+    """Test the path index of suite definitions."""
+
+    @staticmethod
+    def get_suite():
+        """Create a suite with a family and two tasks.
+
+        Returns:
+            scheduler.SuiteDefinition: Suite definition.
+
+        """
+        ecf_files = "/tmp/host1/test_node_index/ecf/"
+        os.makedirs(ecf_files, exist_ok=True)
+        defs = scheduler.SuiteDefinition("test_node_index", "/tmp/host1/job/", ecf_files,
+                                         "env_submit.json")
+        family = scheduler.EcflowSuiteFamily("Family", defs.suite)
+        scheduler.EcflowSuiteTask("Task1", family)
+        scheduler.EcflowSuiteTask("Task2", family)
+        return defs
+
+    def test_lookup(self):
+        """Test attaching triggers, variables and limits by path."""
+        defs = self.get_suite()
+        task2 = defs.get_node("/test_node_index/Family/Task2")
+        self.assertEqual(task2.name, "Task2")
+        self.assertIs(defs.get_node("/test_node_index"), defs.suite)
+        with self.assertRaises(Exception):
+            defs.get_node("/test_node_index/Task3")
+
+        trigger = scheduler.EcflowSuiteTrigger("/test_node_index/Family/Task1")
+        defs.add_triggers("/test_node_index/Family/Task2", scheduler.EcflowSuiteTriggers(trigger))
+        self.assertEqual(task2.triggers.trigger_string,
+                         "/test_node_index/Family/Task1 == complete")
+        defs.add_triggers("/test_node_index/Family/Task2", scheduler.EcflowSuiteTriggers(
+            scheduler.NodeState("/other_suite/Task")))
+        self.assertEqual(len(task2.part_triggers), 1)
+
+        defs.add_variables("/test_node_index/Family", scheduler.EcflowSuiteVariable("VALUE", 1))
+        defs.add_limit("/test_node_index", "serial", 1)
+        defs.add_inlimit("/test_node_index/Family", "serial", "/test_node_index")
+        self.assertEqual(defs.missing_references(), [])
+        defs.finalize()
+
+    def test_missing(self):
+        """Test that all missing references are reported together."""
+        defs = self.get_suite()
+        defs.add_triggers("/test_node_index/Family/Task1", scheduler.EcflowSuiteTriggers(
+            [scheduler.EcflowSuiteTrigger("/test_node_index/Task3"),
+             scheduler.EcflowSuiteTrigger("/test_node_index/Family/Task2")]))
+        defs.add_inlimit("/test_node_index/Family/Task2", "serial", "/test_node_index/Limits")
+        self.assertEqual(defs.missing_references(), [
+            ("/test_node_index/Family/Task1", "/test_node_index/Task3"),
+            ("/test_node_index/Family/Task2", "/test_node_index/Limits")
+        ])
+        with self.assertRaises(Exception):
+            defs.save_as_defs("/tmp/host1/test_node_index/test_node_index.def")
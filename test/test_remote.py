@@ -0,0 +1,70 @@
+"""Test pooled remote connections."""
+import unittest
+import os
+import time
+import subprocess
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class RemoteTest(unittest.TestCase):
+    """Test the ssh connection pool."""
+
+    def test_ssh_command(self):
+        """Test that ssh commands use the master connection."""
+        pool = scheduler.SSHConnectionPool(control_dir="/tmp/unittest_ecf_control", persist=60)
+        cmd = pool.command("ssh -p 22 user@localhost")
+        self.assertEqual(cmd, "ssh -o ControlMaster=auto "
+                              "-o ControlPath=/tmp/unittest_ecf_control/%C "
+                              "-o ControlPersist=60 -p 22 user@localhost")
+        self.assertTrue(pool.control_cmd("ssh user@localhost",
+                                         "check").startswith("ssh -O check "))
+        self.assertEqual(pool.command("rsh localhost"), "rsh localhost")
+        self.assertEqual(pool.evict_idle(max_idle=3600), [])
+
+    def test_maintain(self):
+        """Test that idle and lost connections are removed from the pool."""
+        pool = scheduler.SSHConnectionPool(control_dir="/tmp/unittest_ecf_control", persist=60)
+        pool.command("ssh user@idle.invalid")
+        pool.command("ssh user@lost.invalid")
+        pool.last_used.update({"ssh user@idle.invalid": time.time() - 120})
+        self.assertEqual(pool.maintain(), ["ssh user@idle.invalid", "ssh user@lost.invalid"])
+        self.assertEqual(pool.last_used, {})
+
+    def test_local_transport(self):
+        """Test the local stand-in transport."""
+        pool = scheduler.get_ssh_pool(transport="local")
+        self.assertTrue(pool.check("ssh user@localhost"))
+        env_submit = {
+            "submit_types": ["background"],
+            "default_submit_type": "background",
+            "background": {
+                "HOST": "0",
+                "SSH": "ssh user@localhost",
+                "SSH_MULTIPLEX": 60
+            }
+        }
+        os.environ.update({"ECF_SSH_TRANSPORT": "local"})
+        try:
+            task = scheduler.EcflowTask("/test_remote/Task", 1, "dummy_password",
+                                        ecf_rid=int(os.getpid()))
+            task_settings = scheduler.TaskSettings(task, env_submit, {"0": "/tmp/host0/job"})
+        finally:
+            del os.environ["ECF_SSH_TRANSPORT"]
+        cmd = scheduler.BatchSubmission.set_remote_cmd("echo hello",
+                                                       task_settings.remote_submit_cmd)
+        self.assertEqual(os.popen(cmd).read(), "hello\n")
+
+        process = subprocess.Popen(["sleep", "60"])
+        task.submission_id = str(process.pid)
+        os.makedirs("/tmp/host0/job/test_remote", exist_ok=True)
+        sub = scheduler.get_submission_object(task, task_settings, None)
+        self.assertEqual(sub.remote_kill_cmd, "sh -c")
+        self.assertEqual(sub.remote_status_cmd, "sh -c")
+        sub.set_kill_cmd()
+        sub.kill_job()
+        self.assertEqual(process.wait(timeout=10), -9)
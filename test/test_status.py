@@ -0,0 +1,92 @@
+"""Test the batch system status cache."""
+import unittest
+import os
+import time
+import logging
+import scheduler
+from scheduler import status
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class StatusTest(unittest.TestCase):
+    """Test the status cache."""
+
+    def test_parse_slurm(self):
+        """Test parsing of squeue."""
+        jobs = status.parse_slurm_status("101 RUNNING\n102_[0-2,5] PENDING\n103_1 RUNNING\n")
+        self.assertEqual(jobs["101"], "RUNNING")
+        self.assertEqual(jobs["102_2"], "PENDING")
+        self.assertEqual(jobs["102_5"], "PENDING")
+        self.assertNotIn("102_3", jobs)
+        self.assertEqual(jobs["103_1"], "RUNNING")
+
+    def test_parse_grid_engine(self):
+        """Test parsing of SGE qstat."""
+        output = "job-ID  prior   name       user  state submit/start at     queue  slots\n" \
+                 "-------------------------------------------------------------------------\n" \
+                 "  12345 0.55500 Forecast   user  r     01/01/2022 00:00:00 all.q  1\n"
+        self.assertEqual(status.parse_grid_engine_status(output), {"12345": "r"})
+
+    def test_parse_pbs(self):
+        """Test parsing of PBS qstat with truncated job ids."""
+        output = "Job ID          Username Queue    Jobname    " \
+            "SessID NDS TSK Memory Time  S Time\n" \
+            "--------------- -------- -------- ---------- ------ --- --- ------ ----- - -----\n" \
+            "12345.pbsserve* user     workq    Forecast     4242   1   1    --  01:00 R 00:01\n"
+        self.assertEqual(status.parse_pbs_status(output), {"12345": "R"})
+
+    def test_cache(self):
+        """Test that the bulk query is shared within the time-to-live."""
+        cache_file = f"/tmp/unittest_status_{os.getpid()}/status.json"
+        counter = cache_file + ".count"
+        cmd = f"echo x >> {counter}; echo '101 RUNNING'"
+        cache = scheduler.StatusCache(cache_file, cmd, status.parse_slurm_status, ttl=60)
+        self.assertEqual(cache.lookup("101"), "RUNNING")
+        self.assertIsNone(cache.lookup("102"))
+
+        # A new cache object (e.g. another process) uses the shared table
+        status.STATUS_TABLES.clear()
+        cache = scheduler.StatusCache(cache_file, cmd, status.parse_slurm_status, ttl=60)
+        self.assertEqual(cache.lookup("101"), "RUNNING")
+        with open(counter, mode="r", encoding="utf-8") as file_handler:
+            self.assertEqual(len(file_handler.readlines()), 1)
+
+        # Expired table is refreshed
+        cache = scheduler.StatusCache(cache_file, cmd, status.parse_slurm_status, ttl=0.01)
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup("101"), "RUNNING")
+        with open(counter, mode="r", encoding="utf-8") as file_handler:
+            self.assertEqual(len(file_handler.readlines()), 2)
+
+    def test_remote_bulk_status(self):
+        """Test the cached status of slurm and PBS jobs on a remote host."""
+        joboutdir = f"/tmp/unittest_status_{os.getpid()}/job"
+        os.makedirs(joboutdir + "/test_status", exist_ok=True)
+        remote = {"HOST": "0", "SSH": "ssh user@localhost", "SSH_MULTIPLEX": 60,
+                  "STATUS_CACHE_TTL": 60}
+        env_submit = {
+            "submit_types": ["slurm", "pbs"],
+            "default_submit_type": "slurm",
+            "slurm": dict(remote, SUBMIT_TYPE="slurm"),
+            "pbs": dict(remote, SUBMIT_TYPE="pbs", tasks=["PBSTask"])
+        }
+        jobs = [("SlurmTask", "slurm.12345", "RUNNING"),
+                ("PBSTask", "12345.pbsserver.example.com", "R")]
+        environ = dict(os.environ)
+        os.environ.update({"ECF_SSH_TRANSPORT": "local", "USER": os.environ.get("USER") or "user"})
+        try:
+            for name, job_id, state in jobs:
+                task = scheduler.EcflowTask(f"/test_status/{name}", 1, "dummy_password",
+                                            ecf_rid=int(os.getpid()), submission_id=job_id)
+                task_settings = scheduler.TaskSettings(task, env_submit, {"0": joboutdir})
+                sub = scheduler.get_submission_object(task, task_settings, None)
+                self.assertTrue(sub.cached_status())
+                with open(task.create_status_log(joboutdir), mode="r",
+                          encoding="utf-8") as file_handler:
+                    self.assertEqual(file_handler.read(), f"Job {job_id} is {state} (cached)\n")
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
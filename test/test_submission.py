@@ -1,6 +1,8 @@
 """Test job submission."""
 import unittest
 import os
+import json
+import subprocess
 import logging
 import scheduler
 
@@ -132,6 +134,7 @@ class TestSubmit(unittest.TestCase):
         sub.set_submit_cmd()
         sub.submit_job()
         sub.set_jobid()
+        sub.join_logs()
         self.assertEqual(sub.job_id, "slurm.12345")
         if not os.path.exists("/tmp/host0/job/" + exp + "/Forecasting/Forecast.job1.sub"):
             raise Exception("Expected sub file mot found")
@@ -192,6 +195,7 @@ class TestSubmit(unittest.TestCase):
         sub.set_submit_cmd()
         sub.submit_job()
         sub.set_jobid()
+        sub.join_logs()
         self.assertEqual(sub.job_id, "pbs.12345")
         if not os.path.exists("/tmp/host0/job/" + exp + "/Forecasting/Forecast.job1.sub"):
             raise Exception("Expected sub file mot found")
@@ -258,6 +262,7 @@ class TestSubmit(unittest.TestCase):
         sub.set_submit_cmd()
         sub.submit_job()
         sub.set_jobid()
+        sub.join_logs()
         self.assertEqual(sub.job_id, "sge.12345")
         if not os.path.exists("/tmp/host0/job/" + exp + "/Forecasting/Forecast.job1.sub"):
             raise Exception("Expected sub file mot found")
@@ -272,3 +277,422 @@ class TestSubmit(unittest.TestCase):
         sub.kill()
         if not os.path.exists("/tmp/host0/job/" + exp + "/Forecasting/Forecast.job1.kill"):
             raise Exception("Expected kill file mot found")
+
+
+class TestTaskSettingsIndex(unittest.TestCase):
+    """Test the compiled task settings index."""
+
+    env_submit = {
+        "submit_types": ["background", "scalar"],
+        "default_submit_type": "scalar",
+        "background": {
+            "HOST": "0",
+            "tasks": [
+                "InitRun",
+                "LogProgress"
+            ]
+        },
+        "scalar": {
+            "HOST": "1",
+            "SUBMIT_TYPE": "slurm",
+            "tasks": [
+                "LogProgress"
+            ]
+        },
+        "task_exceptions": {
+            "Forecast": {
+                "WRAPPER": "mpirun"
+            }
+        }
+    }
+
+    def test_lookup(self):
+        """Test lookup of task settings."""
+        index = scheduler.TaskSettingsIndex(self.env_submit)
+        self.assertEqual(index.lookup("InitRun"), {"HOST": "0"})
+        # Last submit type wins
+        self.assertEqual(index.lookup("LogProgress"), {"HOST": "1", "SUBMIT_TYPE": "slurm"})
+        self.assertEqual(index.lookup("Forecast"), {"HOST": "1", "SUBMIT_TYPE": "slurm",
+                                                    "WRAPPER": "mpirun"})
+
+        task = scheduler.EcflowTask("/test_index/Forecasting/Forecast", 1, "dummy_password",
+                                    ecf_rid=int(os.getpid()))
+        task_settings = scheduler.TaskSettings(task, index, {"0": "/tmp/host0/job",
+                                                             "1": "/tmp/host1/job"})
+        self.assertEqual(task_settings.submit_type, "slurm")
+        self.assertEqual(task_settings.wrapper, "mpirun")
+
+    def test_from_file(self):
+        """Test persisted index."""
+        env_submit_file = "/tmp/unittest_index_env_submit.json"
+        index_file = scheduler.TaskSettingsIndex.get_index_file(env_submit_file)
+        if os.path.exists(index_file):
+            os.unlink(index_file)
+        with open(env_submit_file, mode="w", encoding="utf-8") as file_handler:
+            json.dump(self.env_submit, file_handler)
+
+        index = scheduler.TaskSettingsIndex.from_file(env_submit_file)
+        self.assertTrue(os.path.exists(index_file))
+        self.assertEqual(index.lookup("InitRun"), {"HOST": "0"})
+        self.assertEqual(scheduler.TaskSettingsIndex.from_file(env_submit_file).as_dict(),
+                         index.as_dict())
+
+        env_submit = dict(self.env_submit)
+        env_submit.update({"default_submit_type": "background"})
+        with open(env_submit_file, mode="w", encoding="utf-8") as file_handler:
+            json.dump(env_submit, file_handler)
+        index = scheduler.TaskSettingsIndex.from_file(env_submit_file)
+        self.assertEqual(index.lookup("Forecast"), {"HOST": "0", "WRAPPER": "mpirun"})
+
+
+class TestWriteJob(unittest.TestCase):
+    """Test writing of job files."""
+
+    def test_write_job(self):
+        """Test that the job file is rewritten in place."""
+        joboutdirs = {"0": "/tmp/host0/job"}
+        env_file = "/tmp/host0/Env_write_job"
+        os.makedirs("/tmp/host0/job/test_write_job/Forecasting/", exist_ok=True)
+        with open(env_file, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("print(\"Oh my environment\")\n")
+        job_file = "/tmp/host0/job/test_write_job/Forecasting/Forecast.job1"
+        with open(job_file, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("host = \"@HOST_TO_BE_SUBSTITUTED@\"\n")
+            file_handler.write("wrapper = \"@WRAPPER_TO_BE_SUBSTITUTED@\"\n")
+
+        task = scheduler.EcflowTask("/test_write_job/Forecasting/Forecast", 1, "dummy_password",
+                                    ecf_rid=int(os.getpid()))
+        env_submit = {
+            "submit_types": ["background"],
+            "default_submit_type": "background",
+            "background": {
+                "HOST": "0",
+                "WRAPPER": "time",
+                "BATCH": "#SBATCH -n 1",
+                "TRAILER": "print(\"trailer\")"
+            }
+        }
+        submit = scheduler.EcflowSubmitTask(task, env_submit, None, joboutdirs, env_file=env_file)
+        submit.write_job()
+
+        with open(job_file, mode="r", encoding="utf-8") as file_handler:
+            content = file_handler.read()
+        self.assertTrue(content.startswith("#!/usr/bin/env python3\n"))
+        self.assertIn("#SBATCH -n 1\n", content)
+        self.assertIn("print(\"Oh my environment\")\n", content)
+        self.assertIn("host = \"0\"\n", content)
+        self.assertIn("wrapper = \"time\"\n", content)
+        self.assertTrue(content.endswith("print(\"trailer\")\n"))
+        self.assertTrue(os.access(job_file, os.X_OK))
+        self.assertEqual(os.listdir(os.path.dirname(job_file)), ["Forecast.job1"])
+
+
+class TestSlurmArrayBatcher(unittest.TestCase):
+    """Test batching of slurm tasks in job arrays."""
+
+    def test_array_script(self):
+        """Test that ensemble members share a batch and an array script."""
+        joboutdirs = {"0": "/tmp/host0/job", "1": "/tmp/host1/job"}
+        env_submit = {
+            "submit_types": ["scalar"],
+            "default_submit_type": "scalar",
+            "scalar": {
+                "HOST": "1",
+                "SUBMIT_TYPE": "slurm",
+                "ARRAY_WINDOW": 1,
+                "NTASKS": "#SBATCH -n 1"
+            }
+        }
+        submit_tasks = []
+        for mbr in range(0, 3):
+            ecf_name = f"/test_array/mbr00{mbr}/Forecast"
+            task = scheduler.EcflowTask(ecf_name, 1, "dummy_password", ecf_rid=int(os.getpid()))
+            submit_task = scheduler.EcflowSubmitTask(task, env_submit, None, joboutdirs,
+                                                     ensmbr=mbr)
+            submit_task.task_settings.header.update({"OUTPUT": submit_task.sub.set_output()})
+            submit_task.task_settings.header.update({"NAME": submit_task.sub.set_job_name()})
+            submit_tasks.append(submit_task)
+
+        batcher = scheduler.SlurmArrayBatcher()
+        self.assertTrue(batcher.accepts(submit_tasks[0]))
+        keys = set([batcher.batch_key(submit_task) for submit_task in submit_tasks])
+        self.assertEqual(len(keys), 1)
+
+        script, script_at_host = batcher.write_array_script(submit_tasks)
+        self.assertTrue(script_at_host.startswith("/tmp/host1/job/arrays/"))
+        with open(script, mode="r", encoding="utf-8") as file_handler:
+            content = file_handler.read()
+        self.assertIn("#SBATCH -n 1\n", content)
+        self.assertIn("  2) exec /tmp/host1/job//test_array/mbr002/Forecast.job1 > "
+                      "/tmp/host1/job//test_array/mbr002/Forecast.1 2>&1 ;;\n", content)
+
+    def test_single_task(self):
+        """Test that a batch with one task submits its written job file once."""
+        joboutdirs = {"0": "/tmp/host0/job"}
+        os.makedirs("/tmp/host0/job/test_single_array/Forecasting/", exist_ok=True)
+        job_file = "/tmp/host0/job/test_single_array/Forecasting/Forecast.job1"
+        with open(job_file, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("print(\"job\")\n")
+        env_submit = {
+            "submit_types": ["scalar"],
+            "default_submit_type": "scalar",
+            "scalar": {
+                "HOST": "0",
+                "SUBMIT_TYPE": "slurm",
+                "ARRAY_WINDOW": 60,
+                "NTASKS": "#SBATCH -n 1",
+                "TRAILER": "print(\"trailer\")"
+            }
+        }
+        task = scheduler.EcflowTask("/test_single_array/Forecasting/Forecast", 1,
+                                    "dummy_password", ecf_rid=int(os.getpid()))
+        server = RecordingServer()
+        batcher = scheduler.SlurmArrayBatcher(wait=False)
+        submit_task = scheduler.EcflowSubmitTask(task, env_submit, server, joboutdirs,
+                                                 batcher=batcher)
+        submit_task.submit()
+        self.assertEqual(server.submission_ids, [])
+        batcher.flush_all()
+
+        self.assertEqual(server.submission_ids, ["slurm.12345"])
+        self.assertEqual(server.aborted, [])
+        with open(job_file, mode="r", encoding="utf-8") as file_handler:
+            content = file_handler.read()
+        self.assertEqual(content.count("#!/usr/bin/env python3\n"), 1)
+        self.assertEqual(content.count("#SBATCH -n 1\n"), 1)
+        self.assertEqual(content.count("print(\"job\")\n"), 1)
+        self.assertEqual(content.count("print(\"trailer\")\n"), 1)
+
+    def test_submit_variables(self):
+        """Test that the array job exports the submit variables of the batch."""
+        joboutdirs = {"0": "/tmp/host0/job"}
+        env_submit = {
+            "submit_types": ["scalar"],
+            "default_submit_type": "scalar",
+            "scalar": {
+                "HOST": "0",
+                "SUBMIT_TYPE": "slurm",
+                "ARRAY_WINDOW": 60,
+                "SUBMIT_VARIABLES": {"OMP_NUM_THREADS": 4}
+            }
+        }
+        server = RecordingServer()
+        batcher = scheduler.SlurmArrayBatcher(wait=False)
+        for mbr in range(0, 2):
+            job_file = f"/tmp/host0/job/test_export_array/mbr00{mbr}/Forecast.job1"
+            os.makedirs(os.path.dirname(job_file), exist_ok=True)
+            with open(job_file, mode="w", encoding="utf-8") as file_handler:
+                file_handler.write("print(\"job\")\n")
+            task = scheduler.EcflowTask(f"/test_export_array/mbr00{mbr}/Forecast", 1,
+                                        "dummy_password", ecf_rid=int(os.getpid()))
+            submit_task = scheduler.EcflowSubmitTask(task, env_submit, server, joboutdirs,
+                                                     ensmbr=mbr, batcher=batcher)
+            submit_task.submit()
+        batcher.flush_all()
+
+        self.assertEqual(server.submission_ids, ["slurm.12345_0", "slurm.12345_1"])
+        commands = [line for line in server.log if line.startswith("ECF_JOB_CMD: ")]
+        self.assertEqual(len(commands), 1)
+        self.assertIn("--array=0-1 ", commands[0])
+        self.assertIn("--export OMP_NUM_THREADS=4 ", commands[0])
+
+    def test_failed_submission(self):
+        """Test that a failed batch submission is reported to the submitting task."""
+        joboutdirs = {"0": "/tmp/host0/job"}
+        job_file = "/tmp/host0/job/test_failed_array/Forecast.job1"
+        os.makedirs(os.path.dirname(job_file), exist_ok=True)
+        with open(job_file, mode="w", encoding="utf-8") as file_handler:
+            file_handler.write("print(\"job\")\n")
+        env_submit = {
+            "submit_types": ["scalar"],
+            "default_submit_type": "scalar",
+            "scalar": {
+                "HOST": "0",
+                "SUBMIT_TYPE": "slurm",
+                "ARRAY_WINDOW": 0.1
+            }
+        }
+        task = scheduler.EcflowTask("/test_failed_array/Forecast", 1, "dummy_password",
+                                    ecf_rid=int(os.getpid()))
+        server = RecordingServer()
+        submit_task = scheduler.EcflowSubmitTask(task, env_submit, server, joboutdirs,
+                                                 batcher=scheduler.SlurmArrayBatcher())
+        submit_task.sub.batch_sub = "false"
+        with self.assertRaises(SystemExit):
+            submit_task.submit()
+        self.assertEqual(server.aborted, ["/test_failed_array/Forecast"])
+        with open(task.create_submission_log("/tmp/host0/job"), mode="r",
+                  encoding="utf-8") as file_handler:
+            self.assertIn("Batch submission failed", file_handler.read())
+
+
+class TestEcflowTask(unittest.TestCase):
+    """Test the names derived by a task."""
+
+    def test_names(self):
+        """Test the family names and the job file names."""
+        task = scheduler.EcflowTask("/suite/Family1/Family2/Task", 2, "dummy_password", None)
+        self.assertEqual(task.ecf_task, "Task")
+        self.assertEqual(task.ecf_families, ["suite", "Family1", "Family2"])
+        self.assertEqual(task.family1, "Family2")
+        self.assertEqual(task.create_submission_log("/tmp/host0/job"),
+                         "/tmp/host0/job//suite/Family1/Family2/Task.job2.sub")
+        self.assertEqual(task.create_kill_log("/tmp/host1/job"),
+                         "/tmp/host1/job//suite/Family1/Family2/Task.job2.kill")
+        self.assertEqual(sorted(task.job_bases.keys()), ["/tmp/host0/job", "/tmp/host1/job"])
+
+        task = scheduler.EcflowTask("/Task", 1, "dummy_password", None)
+        self.assertIsNone(task.ecf_families)
+        self.assertIsNone(task.family1)
+
+
+class RecordingServer(object):
+    """Server recording the calls of a submission."""
+
+    def __init__(self):
+        """Construct the server."""
+        self.submission_ids = []
+        self.aborted = []
+        self.log = []
+
+    def update_log(self, text):
+        """Record a log record."""
+        self.log.append(text)
+
+    def update_submission_id(self, task):
+        """Record the submission id."""
+        self.submission_ids.append(task.submission_id)
+
+    def force_aborted(self, task):
+        """Record an aborted task."""
+        self.aborted.append(task.ecf_name)
+
+    def force_aborted_tasks(self, tasks):
+        """Record aborted tasks."""
+        self.aborted.extend(task.ecf_name for task in tasks)
+
+
+class TestParseJobId(unittest.TestCase):
+    """Test parsing of job ids from the submit commands."""
+
+    def setUp(self):
+        """Set up task and settings."""
+        env_submit = {
+            "submit_types": ["background"],
+            "default_submit_type": "background",
+            "background": {
+                "HOST": "0"
+            }
+        }
+        self.task = scheduler.EcflowTask("/test_parse/Forecasting/Forecast", 1, "dummy_password",
+                                         ecf_rid=int(os.getpid()))
+        self.task_settings = scheduler.TaskSettings(self.task, env_submit,
+                                                    {"0": "/tmp/host0/job"})
+
+    def test_slurm(self):
+        """Slurm."""
+        sub = scheduler.SlurmSubmission(self.task, self.task_settings, None)
+        self.assertEqual(sub.parse_job_id("12345\n"), "12345")
+        self.assertEqual(sub.parse_job_id("12345;cluster\n"), "12345")
+        self.assertEqual(sub.parse_job_id("Submitted batch job 12345\n"), "12345")
+        with self.assertRaises(Exception):
+            sub.parse_job_id("sbatch: error: Batch job submission failed\n")
+
+    def test_pbs(self):
+        """PBS."""
+        sub = scheduler.PBSSubmission(self.task, self.task_settings, None)
+        self.assertEqual(sub.parse_job_id("12345.server\n"), "12345.server")
+
+    def test_grid_engine(self):
+        """SGE."""
+        sub = scheduler.GridEngineSubmission(self.task, self.task_settings, None)
+        self.assertEqual(sub.parse_job_id("12345\n"), "12345")
+        self.assertEqual(sub.parse_job_id("Your job 12345 (\"Forecast\") has been submitted\n"),
+                         "12345")
+
+    def test_parsable_output(self):
+        """The job id is taken directly if the backend prints parsable output."""
+        sub = scheduler.SlurmSubmission(self.task, self.task_settings, None)
+        parsed = []
+
+        def parse_job_id(output):
+            parsed.append(output)
+            return "parsed"
+
+        sub.parse_job_id = parse_job_id
+        self.task_settings.submit_type = "slurm"
+        self.assertEqual(sub.get_job_id("12345;cluster\n"), "12345")
+        self.assertEqual(parsed, [])
+        self.assertEqual(sub.get_job_id("Submitted batch job 12345\n"), "parsed")
+
+        # No parsable_output capability
+        self.task_settings.submit_type = "background"
+        self.assertEqual(sub.get_job_id("12345\n"), "parsed")
+        self.assertEqual(len(parsed), 2)
+
+
+class TestBulkKill(unittest.TestCase):
+    """Test killing of several jobs with one command."""
+
+    def test_kill_jobs(self):
+        """Kill background processes with one kill command."""
+        joboutdirs = {"0": "/tmp/host0/job"}
+        env_submit = {
+            "submit_types": ["background"],
+            "default_submit_type": "background",
+            "background": {
+                "HOST": "0"
+            }
+        }
+        os.makedirs("/tmp/host0/job/test_bulk_kill/", exist_ok=True)
+        processes = []
+        subs = []
+        for number in range(0, 3):
+            process = subprocess.Popen(["sleep", "60"])
+            processes.append(process)
+            task = scheduler.EcflowTask(f"/test_bulk_kill/Task{number}", 1, "dummy_password",
+                                        ecf_rid=int(os.getpid()), submission_id=str(process.pid))
+            task_settings = scheduler.TaskSettings(task, env_submit, joboutdirs)
+            subs.append(scheduler.get_submission_object(task, task_settings, None))
+
+        self.assertEqual(len(set(sub.bulk_kill_key() for sub in subs)), 1)
+        subs[0].kill_jobs(subs)
+        for process in processes:
+            self.assertEqual(process.wait(timeout=10), -9)
+        self.assertTrue(os.path.exists("/tmp/host0/job/test_bulk_kill/Task2.job1.kill"))
+
+    def test_kill_tasks_with_failure(self):
+        """A task that can not be killed does not stop the kill of the others."""
+        joboutdirs = {"0": "/tmp/host0/job"}
+        env_submit = {
+            "submit_types": ["background", "broken"],
+            "default_submit_type": "background",
+            "background": {
+                "HOST": "0"
+            },
+            "broken": {
+                "HOST": "0",
+                "SUBMIT_TYPE": "nonexisting",
+                "tasks": ["Broken"]
+            }
+        }
+        os.makedirs("/tmp/host0/job/test_bulk_kill_failure/", exist_ok=True)
+        processes = []
+        tasks = []
+        for number in range(0, 2):
+            process = subprocess.Popen(["sleep", "60"])
+            processes.append(process)
+            tasks.append(scheduler.EcflowTask(f"/test_bulk_kill_failure/Task{number}", 1,
+                                              "dummy_password", ecf_rid=int(os.getpid()),
+                                              submission_id=str(process.pid)))
+        tasks.append(scheduler.EcflowTask("/test_bulk_kill_failure/Broken", 1, "dummy_password",
+                                          ecf_rid=int(os.getpid()), submission_id="1"))
+
+        server = RecordingServer()
+        result = scheduler.kill_tasks(tasks, env_submit, joboutdirs, server)
+        for process in processes:
+            self.assertEqual(process.wait(timeout=10), -9)
+        self.assertEqual([task.ecf_name for task in result["failed"]],
+                         ["/test_bulk_kill_failure/Broken"])
+        self.assertEqual(server.aborted, ["/test_bulk_kill_failure/Task0",
+                                          "/test_bulk_kill_failure/Task1"])
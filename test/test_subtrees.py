@@ -0,0 +1,95 @@
+"""Test building suite subtrees in parallel."""
+import unittest
+import os
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+def add_member(parent, member, ecf_files=None):
+    """Add the family of a member."""
+    triggers = None
+    if member > 0:
+        triggers = scheduler.EcflowSuiteTriggers(
+            scheduler.EcflowSuiteTrigger(f"{parent.path}/Mbr{member - 1}/Task2"))
+    family = scheduler.EcflowSuiteFamily(f"Mbr{member}", parent, triggers=triggers,
+                                         variables=scheduler.EcflowSuiteVariable("ENSMBR",
+                                                                                 member))
+    task1 = scheduler.EcflowSuiteTask("Task1", family, def_status="complete", ecf_files=ecf_files)
+    task2 = scheduler.EcflowSuiteTask("Task2", family, triggers=scheduler.EcflowSuiteTriggers(
+        scheduler.EcflowSuiteTrigger(task1)))
+    task2.add_part_trigger(scheduler.EcflowSuiteTriggers(
+        scheduler.EcflowSuiteTrigger(task1, "aborted")), mode=False)
+
+
+class SubtreesTest(unittest.TestCase):
+    """Test building suite subtrees in parallel."""
+
+    def setUp(self):
+        """Create the ecf_files directory."""
+        self.directory = "/tmp/host1/test_subtrees"
+        os.makedirs(self.directory, exist_ok=True)
+
+    def build(self, processes, stream_file=None):
+        """Build a suite with three members.
+
+        Args:
+            processes (int): Worker processes. None to build in this process.
+            stream_file (str, optional): Stream file. Defaults to None.
+
+        Returns:
+            scheduler.SuiteDefinition: Suite definition.
+
+        """
+        defs = scheduler.SuiteDefinition("test_subtrees", self.directory, self.directory,
+                                         "env_submit.json", stream_file=stream_file)
+        family = scheduler.EcflowSuiteFamily("Members", defs.suite)
+        if processes is None:
+            for member in range(3):
+                add_member(family, member, self.directory)
+        else:
+            nodes = scheduler.build_subtrees(family, [(add_member, (member, self.directory))
+                                                      for member in range(3)],
+                                             processes=processes)
+            self.assertEqual([node.name for node in nodes], ["Mbr0", "Mbr1", "Mbr2"])
+        return defs
+
+    def read(self, def_file):
+        """Read a def file."""
+        with open(def_file, mode="r", encoding="utf-8") as file_handler:
+            return file_handler.read()
+
+    def test_stream(self):
+        """Test that a parallel build streams the same definition."""
+        serial = self.directory + "/serial.def"
+        self.build(None, serial).save_as_defs(serial)
+        parallel = self.directory + "/parallel.def"
+        defs = self.build(2, parallel)
+        if os.path.islink(self.directory + "/Task1.py"):
+            os.unlink(self.directory + "/Task1.py")
+        defs.save_as_defs(parallel)
+        self.assertTrue(os.path.islink(self.directory + "/Task1.py"))
+        self.assertEqual(self.read(serial), self.read(parallel))
+        self.assertIn("    family Mbr1\n"
+                      "      edit ENSMBR '1'\n"
+                      "      trigger /test_subtrees/Members/Mbr0/Task2 == complete\n",
+                      self.read(parallel))
+
+    def test_merge(self):
+        """Test that subtrees are merged into the node index."""
+        defs = self.build(2)
+        task2 = defs.get_node("/test_subtrees/Members/Mbr2/Task2")
+        self.assertIs(task2.parent, defs.get_node("/test_subtrees/Members/Mbr2"))
+        self.assertEqual(len(task2.part_triggers), 1)
+        self.assertEqual([node.name for node in task2.parent.parent.children],
+                         ["Mbr0", "Mbr1", "Mbr2"])
+        defs.finalize()
+
+        serial = self.directory + "/serial_memory.def"
+        self.build(None).save_as_defs(serial)
+        parallel = self.directory + "/parallel_memory.def"
+        defs.save_as_defs(parallel)
+        self.assertEqual(self.read(serial), self.read(parallel))
@@ -0,0 +1,159 @@
+"""Test incremental suite updates."""
+import unittest
+import os
+import logging
+import scheduler
+from scheduler import suite_diff
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class RecordingClient(object):
+    """Ecflow client recording the update calls."""
+
+    def __init__(self):
+        """Construct the client."""
+        self.calls = []
+
+    def replace(self, path, *args):
+        """Record a replace."""
+        self.calls.append(("replace", path))
+
+    def alter(self, path, *args):
+        """Record an alter."""
+        self.calls.append(("alter", path))
+
+    def delete(self, path):
+        """Record a delete."""
+        self.calls.append(("delete", path))
+
+
+class UpdateServer(scheduler.EcflowServer):
+    """Server with a given suite and a recording client."""
+
+    def __init__(self, server_node):
+        """Construct the server.
+
+        Args:
+            server_node (ecflow.Node): Suite on the server. None if not on the server.
+
+        """
+        scheduler.EcflowServer.__init__(self, "localhost", 3141, "/tmp/host1/test_suite_diff.log")
+        self.server_node = server_node
+        self.client = RecordingClient()
+
+    def get_server_node(self, path):
+        """Get the suite on the server."""
+        return self.server_node
+
+
+class SuiteDiffTest(unittest.TestCase):
+    """Test incremental suite updates."""
+
+    @staticmethod
+    def get_suite(value="1", trigger=True, extra_task=False, extra_family=False):
+        """Create a suite.
+
+        Args:
+            value (str, optional): Value of a variable. Defaults to "1".
+            trigger (bool, optional): Trigger Task2 on Task1. Defaults to True.
+            extra_task (bool, optional): Add Task3. Defaults to False.
+            extra_family (bool, optional): Add a family. Defaults to False.
+
+        Returns:
+            scheduler.SuiteDefinition: Suite definition.
+
+        """
+        joboutdir = "/tmp/host1/job/"
+        ecf_files = "/tmp/host1/test_suite_diff/ecf/"
+        os.makedirs(ecf_files, exist_ok=True)
+        defs = scheduler.SuiteDefinition("test_suite_diff", joboutdir, ecf_files,
+                                         "env_submit.json")
+        family = scheduler.EcflowSuiteFamily(
+            "Family", defs.suite, variables=scheduler.EcflowSuiteVariable("VALUE", value))
+        task1 = scheduler.EcflowSuiteTask("Task1", family)
+        triggers = None
+        if trigger:
+            triggers = scheduler.EcflowSuiteTriggers(scheduler.EcflowSuiteTrigger(task1))
+        scheduler.EcflowSuiteTask("Task2", family, triggers=triggers)
+        if extra_task:
+            scheduler.EcflowSuiteTask("Task3", family)
+        if extra_family:
+            scheduler.EcflowSuiteFamily("Other", defs.suite)
+        return defs
+
+    @staticmethod
+    def snapshot(defs):
+        """Take the snapshot of a suite."""
+        return suite_diff.NodeSnapshot(defs.suite.ecf_node)
+
+    def test_diff(self):
+        """Test the changes between definitions."""
+        server = self.snapshot(self.get_suite(extra_family=True))
+        self.assertEqual(suite_diff.diff_nodes(self.snapshot(self.get_suite(extra_family=True)),
+                                               server), [])
+
+        changes = suite_diff.diff_nodes(self.snapshot(self.get_suite(value="2", trigger=False,
+                                                                     extra_task=True)), server)
+        self.assertEqual(sorted(changes), [
+            ("alter", "/test_suite_diff/Family", ("change", "variable", "VALUE", "2")),
+            ("alter", "/test_suite_diff/Family/Task2", ("delete", "trigger")),
+            ("delete", "/test_suite_diff/Other", ()),
+            ("replace", "/test_suite_diff/Family/Task3", ())
+        ])
+
+        server = self.snapshot(self.get_suite(trigger=False))
+        changes = suite_diff.diff_nodes(self.snapshot(self.get_suite()), server)
+        self.assertEqual(changes, [("replace", "/test_suite_diff/Family/Task2", ())])
+
+    def test_runtime_variables(self):
+        """Test that variables set while the suite runs are kept on the server."""
+        server = self.get_suite()
+        task2 = server.get_node("/test_suite_diff/Family/Task2")
+        task2.ecf_node.add_variable("SUBMISSION_ID", "slurm.12345")
+        self.assertEqual(suite_diff.diff_nodes(self.snapshot(self.get_suite()),
+                                               self.snapshot(server)), [])
+
+        task2.ecf_node.add_time("10:00")
+        self.assertEqual(suite_diff.diff_nodes(self.snapshot(self.get_suite()),
+                                               self.snapshot(server)),
+                         [("replace", "/test_suite_diff/Family/Task2", ())])
+
+    def test_unchanged(self):
+        """Test that an unchanged suite is not sent."""
+        defs = self.get_suite()
+        def_file = "/tmp/host1/test_suite_diff/test_suite_diff.def"
+        suite_diff.write_digest(def_file + ".sha1", self.snapshot(defs).digest,
+                                "localhost:3141")
+        server = UpdateServer(self.get_suite().suite.ecf_node)
+        self.assertEqual(server.update_suite(defs, def_file), [])
+        self.assertEqual(server.client.calls, [])
+
+    def test_deleted_on_server(self):
+        """Test that a suite deleted on the server is deployed again."""
+        defs = self.get_suite()
+        def_file = "/tmp/host1/test_suite_diff/test_suite_diff.def"
+        suite_diff.write_digest(def_file + ".sha1", self.snapshot(defs).digest,
+                                "localhost:3141")
+        server = UpdateServer(None)
+        self.assertEqual(server.update_suite(defs, def_file), [("replace", "/test_suite_diff", ())])
+        self.assertEqual(server.client.calls, [("replace", "/test_suite_diff")])
+
+        server = UpdateServer(self.get_suite(value="2").suite.ecf_node)
+        self.assertEqual(server.update_suite(defs, def_file), [
+            ("alter", "/test_suite_diff/Family", ("change", "variable", "VALUE", "1"))])
+
+    def test_digest_per_server(self):
+        """Test that the digests of several servers are kept."""
+        hash_file = f"/tmp/unittest_suite_diff_{os.getpid()}.sha1"
+        if os.path.exists(hash_file):
+            os.unlink(hash_file)
+        self.assertIsNone(suite_diff.read_digest(hash_file, "host1:3141"))
+        suite_diff.write_digest(hash_file, "digest1", "host1:3141")
+        suite_diff.write_digest(hash_file, "digest2", "host2:3141")
+        suite_diff.write_digest(hash_file, "digest3", "host1:3141")
+        self.assertEqual(suite_diff.read_digest(hash_file, "host1:3141"), "digest3")
+        self.assertEqual(suite_diff.read_digest(hash_file, "host2:3141"), "digest2")
+        self.assertIsNone(suite_diff.read_digest(hash_file, "host3:3141"))
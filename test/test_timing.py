@@ -0,0 +1,76 @@
+"""Test the timing spans."""
+import unittest
+import os
+import json
+import shutil
+import threading
+import logging
+from scheduler import timing
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class TimingTest(unittest.TestCase):
+    """Test the timing spans."""
+
+    def setUp(self):
+        """Create an empty output directory."""
+        self.directory = f"/tmp/unittest_timing_{os.getpid()}"
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+
+    def test_disabled(self):
+        """Spans are no-ops when timing is disabled."""
+        if timing.get_tracer() is not None:
+            self.skipTest("Timing is enabled in the environment")
+        self.assertIs(timing.span("write_job"), timing.NULL_SPAN)
+        timings = {}
+        with timing.span("write_job", timings=timings):
+            pass
+        self.assertIn("write_job", timings)
+
+    def test_tracer(self):
+        """Spans are written as JSON lines and summed in the Prometheus textfile."""
+        tracer = timing.Tracer(self.directory)
+        for __ in range(2):
+            with timing.Span(tracer, "submit_cmd", attributes={"task": "/suite/Task"}):
+                pass
+            with self.assertRaises(RuntimeError):
+                with timing.Span(tracer, "job_id"):
+                    raise RuntimeError("Failed")
+            tracer.flush()
+
+        with open(self.directory + "/spans.jsonl", mode="r", encoding="utf-8") as file_handler:
+            records = [json.loads(line) for line in file_handler]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0]["task"], "/suite/Task")
+        self.assertTrue(records[1]["error"])
+
+        metrics = timing.read_textfile(self.directory + "/scheduler.prom")
+        self.assertEqual(metrics[("ecf_stage_duration_seconds_count", "submit_cmd")], 2)
+        self.assertEqual(metrics[("ecf_stage_duration_seconds_count", "job_id")], 2)
+
+    def test_request_timing(self):
+        """The spans of a request are recorded by the tracer of the request only."""
+        process_tracer = timing.get_tracer()
+        tracers = []
+        with timing.RequestTiming(self.directory) as request:
+            self.assertIs(timing.get_tracer(), request.tracer)
+            thread = threading.Thread(target=lambda: tracers.append(timing.get_tracer()))
+            thread.start()
+            thread.join()
+            with timing.span("status_cmd"):
+                pass
+        self.assertEqual(tracers, [process_tracer])
+        self.assertIs(timing.get_tracer(), process_tracer)
+        with open(self.directory + "/spans.jsonl", mode="r", encoding="utf-8") as file_handler:
+            records = [json.loads(line) for line in file_handler]
+        self.assertEqual([record["stage"] for record in records], ["status_cmd"])
+
+    def test_process_age(self):
+        """The process age is available on linux."""
+        age = timing.process_age()
+        if age is not None:
+            self.assertGreaterEqual(age, 0)
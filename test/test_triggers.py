@@ -0,0 +1,47 @@
+"""Test trigger expressions."""
+import unittest
+import logging
+import scheduler
+
+
+logging.basicConfig(format='%(asctime)s %(levelname)s %(pathname)s:%(lineno)s %(message)s',
+                    level=logging.DEBUG)
+
+
+class TriggerTest(unittest.TestCase):
+    """Test trigger expressions."""
+
+    def test_render(self):
+        """Test flattening, deduplication and parentheses."""
+        task1 = scheduler.NodeState("/suite/task1")
+        task2 = scheduler.NodeState("/suite/task2")
+        task3 = scheduler.NodeState("/suite/task3", "aborted")
+
+        expression = scheduler.And(task1, scheduler.And(task2, task1),
+                                   scheduler.Or(task3, scheduler.Or(task1, task3)))
+        self.assertEqual(expression.render(),
+                         "/suite/task1 == complete AND /suite/task2 == complete AND "
+                         "(/suite/task3 == aborted OR /suite/task1 == complete)")
+        self.assertEqual(scheduler.Not(task1).render(), "!(/suite/task1 == complete)")
+        self.assertEqual(scheduler.Or(task1, task2).render(enclose=True),
+                         "(/suite/task1 == complete OR /suite/task2 == complete)")
+        self.assertEqual(scheduler.combine_triggers([task1, None, task1]), task1)
+        self.assertIsNone(scheduler.combine_triggers([None]))
+        self.assertEqual(scheduler.And(task1, task2), scheduler.And(task1, task2))
+        self.assertNotEqual(scheduler.And(task1, task2), scheduler.Or(task1, task2))
+
+    def test_triggers(self):
+        """Test EcflowSuiteTriggers."""
+        task1 = scheduler.NodeState("/suite/task1")
+        task2 = scheduler.NodeState("/suite/task2")
+
+        triggers = scheduler.EcflowSuiteTriggers([task1, task2])
+        nested = scheduler.EcflowSuiteTriggers([triggers, task1, None])
+        self.assertEqual(nested.trigger_string, triggers.trigger_string)
+        nested.add_triggers([task2, scheduler.NodeState("/suite/task3")], mode="OR")
+        self.assertEqual(nested.trigger_string,
+                         "(/suite/task1 == complete AND /suite/task2 == complete) OR "
+                         "/suite/task2 == complete OR /suite/task3 == complete")
+        self.assertIsNone(scheduler.EcflowSuiteTriggers([None]).trigger_string)
+        with self.assertRaises(Exception):
+            scheduler.EcflowSuiteTriggers([task1], mode="XOR")